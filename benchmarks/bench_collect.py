@@ -0,0 +1,33 @@
+import os
+
+from insights import collect
+
+
+def manifest(root):
+    specs = ["messages", "machine_id", "redhat_release"]
+    configs = []
+    for s in specs:
+        configs.append({"name": "insights.specs.Specs.%s" % s, "enabled": True})
+        configs.append({"name": "insights.specs.default.DefaultSpecs.%s" % s, "enabled": True})
+    return {
+        "version": 0,
+        "client": {
+            "context": {"class": "insights.core.context.HostContext", "args": {"root": root, "timeout": 10}},
+            "blacklist": {"files": [], "commands": [], "patterns": [], "keywords": []},
+            "persist": [{"name": "insights.specs.Specs", "enabled": True}],
+            "run_strategy": {"name": "serial"},
+        },
+        "plugins": {
+            "default_component_enabled": False,
+            "packages": ["insights.specs.default"],
+            "configs": configs,
+        },
+    }
+
+
+def bench_collect(benchmark, tmp_path_factory, archive, enabled):
+    def setup():
+        return (manifest(archive), str(tmp_path_factory.mktemp("collect"))), {}
+
+    output = benchmark.pedantic(collect.collect, setup=setup, rounds=3)
+    assert os.path.isdir(os.path.join(output, "data", "var", "log"))
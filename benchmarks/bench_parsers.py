@@ -0,0 +1,31 @@
+import pytest
+
+from insights.core.context import Context
+from insights.parsers.installed_rpms import InstalledRpms
+from insights.parsers.ls_dev import LsDev
+from insights.parsers.messages import Messages
+from insights.parsers.ps import PsAuxww
+from benchmarks import synthetic
+
+# Messages defers its work to queries, so the benchmark includes a typical one.
+PARSERS = [
+    (InstalledRpms, "installed_rpms", synthetic.installed_rpms, None),
+    (Messages, "messages", synthetic.messages, lambda m: m.get("sshd")),
+    (LsDev, "ls_dev", synthetic.ls_lanR, None),
+    (PsAuxww, "ps_auxww", synthetic.ps_auxww, None),
+]
+
+
+@pytest.mark.parametrize("parser,name,generate,query", PARSERS, ids=[p[1] for p in PARSERS])
+def bench_parser(benchmark, scale, parser, name, generate, query):
+    count = synthetic.sizes(scale)[name]
+    benchmark.extra_info["lines"] = count
+    context = Context(content=list(generate(count)), path=synthetic.ARCHIVE_FILES[name][0])
+
+    def parse():
+        result = parser(context)
+        if query is not None:
+            query(result)
+        return result
+
+    benchmark(parse)
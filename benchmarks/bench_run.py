@@ -0,0 +1,17 @@
+import insights
+from insights.core.hydration import initialize_broker
+from insights.parsers.installed_rpms import InstalledRpms
+from insights.parsers.ls_dev import LsDev
+from insights.parsers.messages import Messages
+from insights.parsers.ps import PsAuxww
+
+
+def bench_initialize_broker(benchmark, archive):
+    benchmark(initialize_broker, archive)
+
+
+def bench_run(benchmark, archive):
+    insights.load_default_plugins()
+    broker = benchmark.pedantic(insights.run, kwargs={"root": archive}, rounds=3, warmup_rounds=1)
+    for parser in (InstalledRpms, LsDev, Messages, PsAuxww):
+        assert parser in broker, broker.exceptions.get(parser)
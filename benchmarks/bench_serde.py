@@ -0,0 +1,39 @@
+import pytest
+
+import insights
+from insights.core import dr
+from insights.core.plugins import datasource
+from insights.core.serde import Hydration
+
+
+@pytest.fixture(scope="module")
+def evaluated(archive):
+    insights.load_default_plugins()
+    return insights.run(root=archive)
+
+
+def _datasources(broker):
+    return [c for c in broker.instances if isinstance(dr.get_delegate(c), datasource)]
+
+
+def _dehydrate(root, broker, comps):
+    h = Hydration(root)
+    for c in comps:
+        h.dehydrate(c, broker)
+    return h
+
+
+def bench_dehydrate(benchmark, tmp_path_factory, evaluated):
+    comps = _datasources(evaluated)
+
+    def setup():
+        return (str(tmp_path_factory.mktemp("dehydrate")), evaluated, comps), {}
+
+    benchmark.pedantic(_dehydrate, setup=setup, rounds=5)
+
+
+def bench_hydrate(benchmark, tmp_path_factory, evaluated):
+    root = str(tmp_path_factory.mktemp("hydrate"))
+    _dehydrate(root, evaluated, _datasources(evaluated))
+    broker = benchmark(Hydration(root).hydrate)
+    assert broker.instances
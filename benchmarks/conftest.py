@@ -0,0 +1,31 @@
+import pytest
+
+from insights.core import dr
+from benchmarks.synthetic import make_archive
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-scale", type=float, default=0.1,
+                     help="Size of the synthetic archive relative to benchmarks.synthetic.DEFAULT_SIZES.")
+
+
+@pytest.fixture(scope="session")
+def scale(request):
+    return request.config.getoption("--bench-scale")
+
+
+@pytest.fixture(scope="session")
+def archive(tmp_path_factory, scale):
+    """ An extracted synthetic archive shared by every benchmark. """
+    return make_archive(str(tmp_path_factory.mktemp("archive")), scale=scale)
+
+
+@pytest.fixture
+def enabled():
+    """ Restores component enablement changed by collection manifests. """
+    factory, saved = dr.ENABLED.default_factory, dict(dr.ENABLED)
+    yield
+    dr.ENABLED.clear()
+    dr.ENABLED.update(saved)
+    dr.ENABLED.default_factory = factory
+    dr.invalidate_plans()
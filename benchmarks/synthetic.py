@@ -0,0 +1,136 @@
+"""
+Generators for synthetic insights archives.
+
+The content is random but deterministic for a given seed, and follows the
+formats the parsers for each spec expect. Sizes are given in lines or
+entries, and :func:`make_archive` scales the defaults, which approximate a
+large production host, by a single factor.
+"""
+import os
+import random
+
+DEFAULT_SIZES = {
+    "installed_rpms": 50000,
+    "messages": 1000000,
+    "ls_dev": 100000,
+    "ps_auxww": 10000,
+}
+"""Number of lines or entries per spec at scale 1.0."""
+
+_MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+_DAEMONS = ["kernel", "systemd", "sshd", "crond", "NetworkManager", "rsyslogd", "dbus-daemon", "chronyd"]
+_WORDS = ["started", "stopped", "session", "opened", "closed", "for", "user", "root", "link", "up",
+          "down", "connection", "from", "port", "accepted", "failed", "reached", "target", "device"]
+_ARCHES = ["x86_64", "noarch", "i686"]
+
+
+def _name(rng, parts=2):
+    return "-".join("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8)))
+                    for _ in range(parts))
+
+
+def installed_rpms(count, seed=0):
+    """ Lines of ``rpm -qa`` output in name-version-release.arch form. """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield "%s%d-%d.%d.%d-%d.el7.%s" % (_name(rng, rng.randint(1, 3)), i,
+                                            rng.randint(0, 9), rng.randint(0, 30), rng.randint(0, 99),
+                                            rng.randint(1, 40), rng.choice(_ARCHES))
+
+
+def messages(count, seed=0, hostname="bench.example.com"):
+    """ Lines of ``/var/log/messages`` in syslog format. """
+    rng = random.Random(seed)
+    for i in range(count):
+        daemon = rng.choice(_DAEMONS)
+        pid = "" if daemon == "kernel" else "[%d]" % rng.randint(1, 65535)
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14)))
+        yield "%s %2d %02d:%02d:%02d %s %s%s: %s" % (_MONTHS[(i // 100000) % 12], rng.randint(1, 28),
+                                                   rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59),
+                                                   hostname, daemon, pid, text)
+
+
+def ls_lanR(count, seed=0, root="/dev", per_dir=200):
+    """ Output of ``ls -lanR`` with ``count`` entries spread over directories. """
+    rng = random.Random(seed)
+    dirs = [root]
+    emitted = 0
+    while emitted < count and dirs:
+        path = dirs.pop(0)
+        n = min(per_dir, count - emitted)
+        yield "%s:" % path
+        yield "total %d" % (n * 4)
+        yield "drwxr-xr-x. %d 0 0 %d Mar  4 16:19 ." % (rng.randint(2, 20), n * 20)
+        yield "drwxr-xr-x. %d 0 0 %d Mar  4 16:19 .." % (rng.randint(2, 20), 4096)
+        for _ in range(n):
+            name = _name(rng, 1) + str(emitted)
+            if rng.random() < 0.05:
+                yield "drwxr-xr-x. 2 0 0 %d Mar  4 16:19 %s" % (rng.randint(40, 4096), name)
+                dirs.append(path.rstrip("/") + "/" + name)
+            elif rng.random() < 0.3:
+                yield "crw-rw----. 1 0 %d %d, %d Mar  4 16:19 %s" % (rng.randint(0, 10), rng.randint(1, 254),
+                                                                    rng.randint(0, 255), name)
+            elif rng.random() < 0.2:
+                yield "lrwxrwxrwx. 1 0 0 %d Mar  4 16:19 %s -> ../%s" % (rng.randint(4, 40), name, _name(rng, 1))
+            else:
+                yield "-rw-r--r--. 1 0 0 %d Mar  4 16:19 %s" % (rng.randint(0, 1 << 20), name)
+            emitted += 1
+        yield ""
+        if not dirs and emitted < count:
+            dirs.append(root.rstrip("/") + "/more%d" % emitted)
+
+
+def ps_auxww(count, seed=0):
+    """ Output of ``ps auxww`` with ``count`` processes. """
+    rng = random.Random(seed)
+    yield "USER       PID %CPU %MEM    VSZ   RSS TTY      STAT START   TIME COMMAND"
+    for pid in range(1, count + 1):
+        cmd = "/usr/bin/%s --%s=%d" % (_name(rng, 1), rng.choice(_WORDS), rng.randint(0, 1000))
+        yield "%-8s %5d %4.1f %4.1f %6d %5d ?        Ss   Mar04   %d:%02d %s" % (
+            rng.choice(["root", "apache", "postgres", "nobody"]), pid, rng.random() * 10, rng.random() * 5,
+            rng.randint(1000, 900000), rng.randint(100, 90000), rng.randint(0, 99), rng.randint(0, 59), cmd)
+
+
+ARCHIVE_FILES = {
+    "installed_rpms": ("insights_commands/rpm_-qa_--qf_name", installed_rpms),
+    "messages": ("var/log/messages", messages),
+    "ls_dev": ("insights_commands/ls_-lanR_.dev", ls_lanR),
+    "ps_auxww": ("insights_commands/ps_auxww", ps_auxww),
+}
+"""Spec name -> (path relative to the archive root, generator)."""
+
+
+def _write(path, lines):
+    d = os.path.dirname(path)
+    if not os.path.isdir(d):
+        os.makedirs(d)
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+
+
+def sizes(scale=1.0, **overrides):
+    """ Returns :data:`DEFAULT_SIZES` multiplied by ``scale``. """
+    result = dict((k, max(1, int(v * scale))) for k, v in DEFAULT_SIZES.items())
+    result.update(overrides)
+    return result
+
+
+def make_archive(root, scale=1.0, seed=0, **overrides):
+    """
+    Writes an extracted insights archive under ``root`` and returns ``root``.
+
+    Args:
+        root (str): directory to create the archive in.
+        scale (float): multiplier applied to :data:`DEFAULT_SIZES`.
+        seed (int): seed for the random content.
+        overrides: exact sizes for individual specs, e.g. ``messages=10``.
+    """
+    for name, count in sizes(scale, **overrides).items():
+        relative, generate = ARCHIVE_FILES[name]
+        _write(os.path.join(root, relative), generate(count, seed=seed))
+    _write(os.path.join(root, "insights_commands/hostname_-f"), ["bench.example.com"])
+    _write(os.path.join(root, "etc/machine-id"), ["dc194312-8cdd-4e75-8cf1-2094bf666f45"])
+    _write(os.path.join(root, "etc/redhat-release"), ["Red Hat Enterprise Linux Server release 7.9 (Maipo)"])
+    return root
@@ -29,12 +29,13 @@ from .core import FileListing, LegacyItemAccess, SysconfigOptions  # noqa: F401
 from .core import YAMLParser, JSONParser, XMLParser, CommandParser  # noqa: F401
 from .core import AttributeDict  # noqa: F401
 from .core import Syslog  # noqa: F401
-from .core import taglang
-from .core.archives import COMPRESSION_TYPES, extract, InvalidArchive, InvalidContentType  # noqa: F401
+from .core import manifest, serde, taglang
+from .core.archives import COMPRESSION_TYPES, extract, open_archive, InvalidArchive, InvalidContentType  # noqa: F401
 from .core import dr  # noqa: F401
 from .core.context import ClusterArchiveContext, HostContext, HostArchiveContext, SerializedArchiveContext, ExecutionContext  # noqa: F401
 from .core.dr import SkipComponent  # noqa: F401
 from .core.hydration import create_context, initialize_broker  # noqa: F401
+from .core.profiling import Profiler
 from .core.plugins import combiner, fact, metadata, parser, rule  # noqa: F401
 from .core.plugins import datasource, condition, incident  # noqa: F401
 from .core.plugins import make_response, make_metadata, make_fingerprint  # noqa: F401
@@ -85,8 +86,27 @@ def add_status(name, nvr, commit=None):
 add_status(package_info["NAME"], get_nvr(), package_info["COMMIT"])
 
 
-def process_dir(broker, root, graph, context, inventory=None):
-    ctx, broker = initialize_broker(root, context=context, broker=broker)
+def _single_group(graph):
+    single = dr.COMPONENTS[dr.GROUPS.single]
+    if graph is single:
+        # keep the group itself so dr can reuse its cached execution plan
+        return graph
+    return dict((k, v) for k, v in graph.items() if k in single)
+
+
+def _evaluate(graph, broker, targets=None, prior=None):
+    graph = _single_group(graph)
+    if prior is not None:
+        # what's reused from prior is already as cheap as leaving it out
+        return dr.run(graph, broker=broker, prior=prior)
+    if targets is not None:
+        return dr.run_lazy([t for t in targets if t in graph], broker=broker)
+    return dr.run(graph, broker=broker)
+
+
+def process_dir(broker, root, graph, context, inventory=None, targets=None, index=None, prior=None):
+    # only what the graph needs is loaded from a serialized archive
+    ctx, broker = initialize_broker(root, context=context, broker=broker, index=index, components=graph)
     log.debug("Processing %s with %s" % (root, ctx))
 
     if isinstance(ctx, ClusterArchiveContext):
@@ -94,12 +114,10 @@ def process_dir(broker, root, graph, context, inventory=None):
         archives = [f for f in ctx.all_files if f.endswith(COMPRESSION_TYPES)]
         return process_cluster(graph, archives, broker=broker, inventory=inventory)
 
-    graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
-    broker = dr.run(graph, broker=broker)
-    return broker
+    return _evaluate(graph, broker, targets, prior=prior)
 
 
-def _run(broker, graph=None, root=None, context=None, inventory=None):
+def _run(broker, graph=None, root=None, context=None, inventory=None, targets=None, prior=None):
     """
     run is a general interface that is meant for stand alone scripts to use
     when executing insights components.
@@ -113,6 +131,12 @@ def _run(broker, graph=None, root=None, context=None, inventory=None):
         component (function or class): The component to execute. Will only execute
             the component and its dependency graph. If None, all components with
             met dependencies will execute.
+        targets (list): If not None, only these components and the
+            dependencies they need are evaluated. See :func:`insights.core.dr.run_lazy`.
+        prior (Broker): broker of an earlier evaluation, such as one from
+            :func:`insights.core.serde.load_snapshot`. Components whose inputs
+            haven't changed since are reused from it instead of evaluated.
+            ``targets`` is ignored when it's given. See :func:`insights.core.dr.run`.
 
     Returns:
         broker: object containing the result of the evaluation.
@@ -121,14 +145,14 @@ def _run(broker, graph=None, root=None, context=None, inventory=None):
     if not root:
         context = context or HostContext
         broker[context] = context()
-        graph = dict((k, v) for k, v in graph.items() if k in dr.COMPONENTS[dr.GROUPS.single])
-        return dr.run(graph, broker=broker)
+        return _evaluate(graph, broker, targets, prior=prior)
 
     if os.path.isdir(root):
-        return process_dir(broker, root, graph, context, inventory=inventory)
+        return process_dir(broker, root, graph, context, inventory=inventory, targets=targets, prior=prior)
     else:
-        with extract(root) as ex:
-            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory)
+        with open_archive(root) as ex:
+            return process_dir(broker, ex.tmp_dir, graph, context, inventory=inventory, targets=targets,
+                               index=ex.index, prior=prior)
 
 
 def load_default_plugins():
@@ -171,9 +195,8 @@ def apply_default_enabled(config):
     for k in dr.ENABLED:
         dr.ENABLED[k] = default_enabled
 
-    enabled = defaultdict(lambda: default_enabled)
-    enabled.update(dr.ENABLED)
-    dr.ENABLED = enabled
+    dr.ENABLED.default_factory = lambda: default_enabled
+    dr.invalidate_plans()
 
 
 def apply_configs(config):
@@ -200,11 +223,29 @@ def apply_configs(config):
                 timeout sets the class level timeout attribute of any component
                 so long as the attribute already exists.
 
+                time_budget is the number of wall-clock seconds the component
+                may run before it's interrupted. See
+                :func:`insights.core.dr.set_timeout`.
+
                 metadata is any dictionary that you want to attach to the
                 component. The dictionary can be retrieved by the component at
                 runtime.
+
+            time_budgets (dict, optional): wall-clock budgets in seconds for
+                every component of a type. Keys are type names like
+                ``parser``, ``combiner``, or ``rule``, or the fully qualified
+                name of any ComponentType.
     """
     default_enabled = config.get("default_component_enabled", True)
+    for name, seconds in config.get("time_budgets", {}).items():
+        if "." not in name:
+            name = "insights.core.plugins." + name
+        _type = dr.get_component(name)
+        if _type is None:
+            log.warning("Unknown component type for time budget: %s", name)
+        else:
+            dr.set_timeout(_type, seconds)
+
     delegate_keys = sorted(dr.DELEGATES, key=dr.get_name)
     for comp_cfg in config.get("configs", []):
         name = comp_cfg.get("name")
@@ -223,6 +264,9 @@ def apply_configs(config):
                 if hasattr(c, "timeout"):
                     c.timeout = comp_cfg.get("timeout", c.timeout)
 
+                if "time_budget" in comp_cfg:
+                    dr.set_timeout(c, comp_cfg["time_budget"])
+
                 if hasattr(delegate, "links"):
                     delegate.links = comp_cfg.get("links", delegate.links)
             if cname == name:
@@ -238,8 +282,29 @@ def _load_context(path):
     return dr.get_component(path)
 
 
+def _select_from_manifest(plugins, args):
+    """
+    Returns the names of the components in ``plugins`` that pass the package
+    query and tag expressions in ``args`` if the component manifest covers
+    every plugin, so only their modules need to be imported. Returns ``None``
+    if the manifest can't be used or nothing matches.
+    """
+    if not plugins or not manifest.load() or not all(manifest.covers(p) for p in plugins):
+        return None
+    pkg_pred = taglang.parse(args.pkg_query) if args.pkg_query else None
+    tag_pred = taglang.parse(args.tags) if args.tags else None
+
+    def pred(e):
+        if pkg_pred and not pkg_pred([e["module"]]):
+            return False
+        return not tag_pred or tag_pred(set(e["tags"]))
+
+    return manifest.select(plugins, pred) or None
+
+
 def run(component=None, root=None, print_summary=False,
-        context=None, inventory=None, print_component=None):
+        context=None, inventory=None, print_component=None, lazy=False,
+        profile=None, snapshot=None, profile_memory=False):
 
     load_default_plugins()
 
@@ -260,11 +325,24 @@ def run(component=None, root=None, print_summary=False,
         p.add_argument("-i", "--inventory", help="Ansible inventory file for cluster analysis.")
         p.add_argument("-k", "--pkg-query", help="Expression to select rules by package.")
         p.add_argument("-v", "--verbose", help="Verbose output.", action="store_true")
-        p.add_argument("-f", "--format", help="Output format.", default="insights.formats.text")
+        p.add_argument("-f", "--format", help="Output format. Defaults to text, or json with --batch.")
         p.add_argument("-s", "--syslog", help="Log results to syslog.", action="store_true")
         p.add_argument("--tags", help="Expression to select rules by tag.")
         p.add_argument("-D", "--debug", help="Verbose debug output.", action="store_true")
         p.add_argument("--context", help="Execution Context. Defaults to HostContext if an archive isn't passed.")
+        p.add_argument("--lazy", action="store_true",
+                       help="Only evaluate the dependencies the selected components need.")
+        p.add_argument("--batch", metavar="DIR|FILE",
+                       help="Analyze every archive in DIR, or listed one per line in FILE, and write a record per archive.")
+        p.add_argument("-j", "--jobs", type=int, help="Number of worker processes for --batch. Defaults to the number of CPUs.")
+        p.add_argument("--max-per-worker", type=int, default=50, metavar="K",
+                       help="Replace --batch workers after they analyze K archives. 0 never replaces them.")
+        p.add_argument("--profile", metavar="FILE",
+                       help="Write a Chrome trace of component evaluation to FILE and collapsed stacks to FILE.folded.")
+        p.add_argument("--profile-memory", action="store_true",
+                       help="Also record the bytes each component allocates with --profile. Slows evaluation down.")
+        p.add_argument("--snapshot", metavar="DIR",
+                       help="Reuse results saved in DIR by an earlier run whose inputs haven't changed, then save this run's there.")
         p.add_argument("--color", default="auto", choices=["always", "auto", "never"], metavar="[=WHEN]",
                        help="Choose if and how the color encoding is outputted. When is 'always', 'auto', or 'never'.")
 
@@ -277,6 +355,8 @@ def run(component=None, root=None, print_summary=False,
         global _COLOR
         _COLOR = args.color
         p = argparse.ArgumentParser(parents=[p])
+        if args.format is None:
+            args.format = "json" if args.batch else "insights.formats.text"
         args.format = "insights.formats._json" if args.format == "json" else args.format
         args.format = "insights.formats._yaml" if args.format == "yaml" else args.format
         fmt = args.format if "." in args.format else "insights.formats." + args.format
@@ -284,6 +364,10 @@ def run(component=None, root=None, print_summary=False,
         if not Formatter or not isinstance(Formatter, FormatterClass):
             dr.load_components(fmt, continue_on_error=False)
             Formatter = get_formatter(fmt)
+        if args.batch:
+            from insights import batch
+            if Formatter.__module__ not in batch.FORMATS:
+                p.error("--batch needs one of these formats: %s" % ", ".join(batch.FORMATS))
         Formatter.configure(p)
         p.parse_args(namespace=args)
         formatter = Formatter(args)
@@ -302,14 +386,20 @@ def run(component=None, root=None, print_summary=False,
         logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO if args.verbose else logging.ERROR)
         context = _load_context(args.context) or context
         inventory = args.inventory
+        lazy = args.lazy or lazy
+        profile = args.profile or profile
+        profile_memory = args.profile_memory or profile_memory
+        snapshot = args.snapshot or snapshot
 
         root = args.archive or root
         if root:
             root = os.path.realpath(root)
 
         plugins = parse_plugins(args.plugins)
-        for p in plugins:
-            dr.load_components(p, continue_on_error=False)
+        selected = _select_from_manifest(plugins, args) if not args.config else None
+        if selected is None:
+            for p in plugins:
+                dr.load_components(p, continue_on_error=False)
 
         if args.config:
             with open(args.config) as f:
@@ -319,7 +409,9 @@ def run(component=None, root=None, print_summary=False,
                 apply_default_enabled(config)
                 apply_configs(config)
 
-        if component is None:
+        if component is None and selected:
+            component = manifest.load_components(selected)
+        elif component is None:
             component = []
             plugins = tuple(plugins)
             for c in dr.DELEGATES:
@@ -347,8 +439,19 @@ def run(component=None, root=None, print_summary=False,
         graph = {}
         for c in component:
             graph.update(dr.get_dependency_graph(c))
+        targets = component if lazy else None
     else:
         graph = dr.COMPONENTS[dr.GROUPS.single]
+        targets = [c for c in dr.get_components_of_type(rule) or [] if c in graph] if lazy else None
+
+    if args and args.batch:
+        from insights import batch
+        archives = batch.find_archives(args.batch)
+        failed = batch.run_batch(archives, graph, formatters[0], context=context, targets=targets,
+                                 jobs=args.jobs, max_per_worker=args.max_per_worker)
+        if failed:
+            log.error("%d of %d archives could not be analyzed." % (failed, len(archives)))
+        return
 
     broker = dr.Broker()
 
@@ -361,31 +464,42 @@ def run(component=None, root=None, print_summary=False,
         broker[ExecutionContext] = ctx
         for spec, content in specs.items():
             broker[spec] = content if dr.DELEGATES[spec].multi_output else content[-1]
+
+    prior = None
+    if snapshot:
+        prior = serde.load_snapshot(snapshot) if os.path.isdir(snapshot) else dr.Broker()
+
+    profiler = broker.profiler = Profiler(trace_memory=profile_memory) if profile else None
     try:
         if formatters:
             for formatter in formatters:
                 formatter.preprocess(broker)
 
             if args and args.bare:
-                broker = dr.run(graph, broker=broker)
+                broker = _evaluate(graph, broker, targets, prior=prior)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              prior=prior)
 
             for formatter in formatters:
                 formatter.postprocess(broker)
         elif print_component:
             if args and args.bare:
-                broker = dr.run(graph, broker=broker)
+                broker = _evaluate(graph, broker, targets, prior=prior)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              prior=prior)
 
             broker.print_component(print_component)
         else:
             if args and args.bare:
-                broker = dr.run(graph, broker=broker)
+                broker = _evaluate(graph, broker, targets, prior=prior)
             else:
-                broker = _run(broker, graph, root, context=context, inventory=inventory)
+                broker = _run(broker, graph, root, context=context, inventory=inventory, targets=targets,
+                              prior=prior)
 
+        if snapshot:
+            serde.save_snapshot(broker, snapshot)
         return broker
     except (InvalidContentType, InvalidArchive):
         if args and args.archive:
@@ -394,6 +508,10 @@ def run(component=None, root=None, print_summary=False,
             log.error(msg.format(p=path))
         else:
             raise
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.dump(profile)
 
 
 def parse_specs(specs):
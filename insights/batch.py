@@ -0,0 +1,153 @@
+"""
+Analyzes many archives in one invocation with a pool of worker processes.
+
+The pool is forked after plugins are loaded and the dependency graph is
+built, so workers start with a warm component registry instead of paying for
+interpreter startup and plugin imports per archive. Each worker extracts or
+opens an archive, evaluates the graph against it and hands back one
+serialized record, which the parent writes as soon as it arrives. Workers are
+replaced after a fixed number of archives so memory held by parsers or
+leaked by plugins can't accumulate.
+
+Records are JSON objects, one per line, or YAML documents separated by
+``---``. Each has an ``archive`` key with the path it came from, and an
+``error`` key instead of the usual results if the archive couldn't be
+analyzed.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import traceback
+
+import yaml
+
+from insights.core import dr
+from insights.core.archives import COMPRESSION_TYPES
+from insights.core.spec_factory import ContentProvider
+from insights.formats import get_response_of_types
+
+log = logging.getLogger(__name__)
+
+FORMATS = ("insights.formats._json", "insights.formats._yaml")
+"""Formatters that can produce batch records."""
+
+# set in the parent before the pool forks so workers inherit them
+_STATE = {}
+
+
+def find_archives(source):
+    """
+    Returns the archives to analyze. ``source`` is either a directory, whose
+    archives and extracted archive directories are analyzed in name order, or
+    a file with one path per line. Blank lines and lines starting with ``#``
+    are ignored.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isdir(path) or name.endswith(COMPRESSION_TYPES):
+                paths.append(path)
+        return paths
+
+    with open(source) as f:
+        return [l.strip() for l in f if l.strip() and not l.lstrip().startswith("#")]
+
+
+def _serialize(record, fmt):
+    if fmt == "insights.formats._yaml":
+        return yaml.dump(record, explicit_start=True)
+    return json.dumps(record) + "\n"
+
+
+def _release(broker):
+    # unmaps the large files of an archive before the worker moves on
+    for value in list(broker.instances.values()):
+        for v in (value if isinstance(value, list) else [value]):
+            if isinstance(v, ContentProvider):
+                v.release()
+
+
+def analyze(path):
+    """
+    Evaluates the graph set up by :func:`run_batch` against one archive and
+    returns a ``(failed, record)`` tuple with the record serialized.
+    """
+    from insights import _run
+
+    formatter = _STATE["formatter"]
+    fmt = _STATE["format"]
+    broker = dr.Broker()
+    try:
+        evaluator = formatter.Impl(broker, formatter.missing, formatter.show_rules)
+        evaluator.preprocess()
+        _run(broker, _STATE["graph"], os.path.realpath(path), context=_STATE["context"],
+             targets=_STATE["targets"])
+        record = get_response_of_types(evaluator.get_response(), formatter.missing, formatter.show_rules)
+        record["archive"] = path
+        failed = False
+    except Exception as ex:
+        log.debug(traceback.format_exc())
+        record = {"archive": path, "error": "%s: %s" % (type(ex).__name__, ex)}
+        failed = True
+    finally:
+        _release(broker)
+    return failed, _serialize(record, fmt)
+
+
+def _get_pool(jobs, max_per_worker):
+    try:
+        ctx = multiprocessing.get_context("fork")
+    except (AttributeError, ValueError):
+        ctx = multiprocessing
+    return ctx.Pool(processes=jobs, maxtasksperchild=max_per_worker or None)
+
+
+def run_batch(archives, graph, formatter, context=None, targets=None,
+              jobs=None, max_per_worker=50, stream=None):
+    """
+    Analyzes ``archives`` in a pool of forked workers and writes a record for
+    each to ``stream`` in the order they finish.
+
+    Args:
+        archives (list): paths of archives or extracted archive directories.
+        graph (dict): the dependency graph to evaluate for each archive.
+        formatter (EvaluatorFormatterAdapter): the configured formatter from
+            one of the modules in :data:`FORMATS`. It decides the format of
+            the records and which results they include.
+
+    Keyword Args:
+        context: the context to use instead of detecting it per archive.
+        targets (list): components to evaluate lazily, as with
+            :func:`insights.run`.
+        jobs (int): number of workers. Defaults to the number of CPUs.
+        max_per_worker (int): archives a worker analyzes before it's
+            replaced. 0 or ``None`` keeps workers for the whole batch.
+        stream: where records are written. Defaults to ``sys.stdout``.
+
+    Returns:
+        int: the number of archives that couldn't be analyzed.
+    """
+    fmt = type(formatter).__module__
+    if fmt not in FORMATS:
+        raise ValueError("Batch mode needs one of these formats: %s" % ", ".join(FORMATS))
+
+    stream = stream or sys.stdout
+    _STATE.update(graph=graph, formatter=formatter, format=fmt, context=context, targets=targets)
+    failed = 0
+    pool = _get_pool(jobs or multiprocessing.cpu_count(), max_per_worker)
+    try:
+        for error, record in pool.imap_unordered(analyze, archives):
+            failed += error
+            stream.write(record)
+            stream.flush()
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        _STATE.clear()
+    return failed
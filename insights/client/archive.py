@@ -5,8 +5,7 @@ from __future__ import absolute_import
 import time
 import os
 import shutil
-import subprocess
-import shlex
+import tarfile
 import logging
 import tempfile
 import re
@@ -14,6 +13,7 @@ import atexit
 
 from .utilities import determine_hostname, _expand_paths, write_data_to_file
 from .insights_spec import InsightsFile, InsightsCommand
+from insights.core.archives import create_tar
 
 logger = logging.getLogger(__name__)
 
@@ -156,11 +156,10 @@ class InsightsArchive(object):
         ext = "" if self.compressor == "none" else ".%s" % self.compressor
         tar_file_name = tar_file_name + ".tar" + ext
         logger.debug("Tar File: " + tar_file_name)
-        return_code = subprocess.call(shlex.split("tar c%sfS %s -C %s ." % (
-            self.get_compression_flag(self.compressor),
-            tar_file_name, self.tmp_dir)),
-            stderr=subprocess.PIPE)
-        if (self.compressor in ["bz2", "xz"] and return_code != 0):
+        try:
+            # files are removed as they're added, the directories afterwards
+            create_tar(self.tmp_dir, tar_file_name, self.compressor, arcname=".", remove=True)
+        except tarfile.CompressionError:
             logger.error("ERROR: %s compressor is not installed, cannot compress file", self.compressor)
             return None
         self.delete_archive_dir()
@@ -52,7 +52,10 @@ class CoreCollector(DataCollector):
         manifest = collect.default_manifest
         if hasattr(self.config, 'manifest') and self.config.manifest:
             manifest = self.config.manifest
-        collected_data_path = collect.collect(manifest=manifest, tmp_path=self.archive.tmp_dir, rm_conf=core_blacklist, client_timeout=self.config.cmd_timeout)
+        collection_stats = {}
+        collected_data_path = collect.collect(manifest=manifest, tmp_path=self.archive.tmp_dir, rm_conf=core_blacklist,
+                                              client_timeout=self.config.cmd_timeout,
+                                              collection_stats=collection_stats)
 
         # update the archive dir with the reported data location from Insights Core
         if not collected_data_path:
@@ -86,4 +89,5 @@ class CoreCollector(DataCollector):
         self._write_tags()
         self._write_blacklist_report(blacklist_report)
         self._write_egg_release()
+        self._write_collection_stats(collection_stats)
         logger.debug('Metadata collection finished.')
@@ -16,6 +16,7 @@ from subprocess import Popen, PIPE, STDOUT
 from tempfile import NamedTemporaryFile
 
 from insights.util import mangle
+from insights.util.filtering import FilterNotSupported, LineFilter, compile_ere
 from ..contrib.soscleaner import SOSCleaner
 from .utilities import _expand_paths, get_version_info, systemd_notify_init_thread, get_tags
 from .constants import InsightsConstants as constants
@@ -31,6 +32,217 @@ SOSCLEANER_LOGGER.setLevel(logging.ERROR)
 SOSCLEANER_LOGGER = logging.getLogger('insights-client.soscleaner')
 SOSCLEANER_LOGGER.setLevel(logging.ERROR)
 
+# files redacted at once
+REDACTION_WORKERS = 4
+
+
+def _bracket_end(regex, i):
+    # index after the bracket expression starting at regex[i]
+    j = i + 1
+    if regex[j:j + 1] == '^':
+        j += 1
+    if regex[j:j + 1] == ']':
+        j += 1
+    while j < len(regex) and regex[j] != ']':
+        if regex.startswith(('[:', '[.', '[='), j):
+            end = regex.find(regex[j + 1] + ']', j + 2)
+            j = end + 2 if end > 0 else len(regex)
+        else:
+            j += 1
+    return j + 1
+
+
+def _atom(regex, i):
+    # (kind, value, end) of the atom of an extended regular expression
+    # starting at regex[i], where kind is "literal", "group", "alternation"
+    # or "other"
+    c = regex[i]
+    if c == '\\':
+        e = regex[i + 1:i + 2]
+        if e and not e.isalnum():
+            return 'literal', e, i + 2
+        return 'other', None, i + 2
+    if c == '[':
+        return 'other', None, _bracket_end(regex, i)
+    if c == '(':
+        j = i + 1
+        while j < len(regex) and regex[j] != ')':
+            j = _atom(regex, j)[2]
+        return 'group', regex[i + 1:j], j + 1
+    if c == '|':
+        return 'alternation', None, i + 1
+    if c in '.^$)':
+        return 'other', None, i + 1
+    return 'literal', c, i + 1
+
+
+def _literal_runs(regex):
+    '''
+    Returns strings every match of the extended regular expression "regex"
+    contains, or an empty list if none can be worked out
+    '''
+    runs, run = [], []
+    i = 0
+    while i < len(regex):
+        kind, value, i = _atom(regex, i)
+        if kind == 'alternation':
+            return []
+        quantified = False
+        while i < len(regex) and regex[i] in '*?+{':
+            quantified = True
+            i = regex.find('}', i) + 1 if regex[i] == '{' else i + 1
+            if i == 0:
+                return []
+        if kind == 'literal' and not quantified:
+            run.append(value)
+            continue
+        if run:
+            runs.append(''.join(run))
+            run = []
+        if kind == 'group' and not quantified:
+            runs.extend(_literal_runs(value))
+    if run:
+        runs.append(''.join(run))
+    return runs
+
+
+def _split_substitution(command):
+    # the regex, replacement and flags of a sed "s" command, or None
+    if len(command) < 4 or command[0] != 's' or command[1].isalnum() or command[1] in '\\ ':
+        return None
+    delim = command[1]
+    fields, field = [], []
+    i = 2
+    while i < len(command):
+        c = command[i]
+        if c == '\\':
+            field.append(command[i:i + 2])
+            i += 2
+            continue
+        if c == '[' and not fields:
+            # GNU sed doesn't end the regex inside a bracket expression
+            end = _bracket_end(command, i)
+            field.append(command[i:end])
+            i = end
+            continue
+        if c == delim:
+            fields.append(''.join(field))
+            field = []
+        else:
+            field.append(c)
+        i += 1
+    fields.append(''.join(field))
+    return fields if len(fields) == 3 else None
+
+
+def _sed_literals(sed_file):
+    '''
+    Returns, for each substitution in the "sed -r" script sed_file, a string
+    every line it changes contains. Returns None if the script does anything
+    else or a substitution can match without a literal, so sed must run on
+    every file.
+    '''
+    try:
+        with open(sed_file, 'rb') as f:
+            script = f.read().decode('utf-8')
+    except (IOError, OSError, UnicodeDecodeError):
+        return None
+    literals = []
+    for command in script.splitlines():
+        command = command.strip()
+        if not command or command.startswith('#'):
+            continue
+        fields = _split_substitution(command)
+        if fields is None or not re.match(r'^[g0-9]*$', fields[2]):
+            return None
+        runs = _literal_runs(fields[0])
+        if not runs:
+            return None
+        literals.append(max(runs, key=len).encode('utf-8'))
+    return literals
+
+
+class _Redactor(object):
+    '''
+    Redacts files in process with the same result as the sed and grep
+    pipeline of _process_content_redaction. Lines are read one at a time,
+    and a file is only left to sed if one of its lines contains what a
+    substitution of the sed script needs to match.
+    '''
+    def __init__(self, exclude, regex):
+        self.sed_literals = _sed_literals(constants.default_sed_file)
+        self.exclude = exclude
+        self.regex = regex
+        self.reject = None
+        self.unsupported = None
+        if self.sed_literals is None:
+            self.unsupported = 'the sed script can\'t be checked'
+        elif exclude:
+            try:
+                self.reject = compile_ere(exclude) if regex else LineFilter(patterns=exclude).reject
+            except FilterNotSupported as ex:
+                self.unsupported = str(ex)
+            if self.reject is None and not self.unsupported:
+                self.unsupported = 'Empty pattern'
+
+    def _rejected(self, line):
+        if b'\0' in line:
+            raise FilterNotSupported('Binary content')
+        try:
+            # grep -E depends on the locale outside of ASCII, grep -F doesn't
+            text = line.decode('ascii' if self.regex else 'utf-8')
+        except UnicodeDecodeError:
+            raise FilterNotSupported('Not %s' % ('ASCII' if self.regex else 'UTF-8'))
+        return bool(self.reject.search(text if self.regex else line))
+
+    def redact(self, filepath):
+        '''
+        Returns the redacted contents of filepath, or None if redaction
+        doesn't change them
+
+        Raises FilterNotSupported if the pipeline has to run instead
+        '''
+        if self.unsupported:
+            raise FilterNotSupported(self.unsupported)
+        kept = []
+        removed = False
+        with open(filepath, 'rb') as f:
+            for line in f:
+                for literal in self.sed_literals:
+                    if literal in line:
+                        raise FilterNotSupported('sed changes it')
+                if self.reject is None:
+                    continue
+                if self._rejected(line.rstrip(b'\n')):
+                    removed = True
+                else:
+                    kept.append(line)
+        if self.reject is None:
+            return None
+        # grep terminates every line it prints
+        if kept and not kept[-1].endswith(b'\n'):
+            kept[-1] += b'\n'
+        elif not removed:
+            return None
+        return b''.join(kept)
+
+
+# redactors by sed script, its modification time, and patterns
+_REDACTORS = {}
+
+
+def _redactor(exclude, regex):
+    try:
+        mtime = os.path.getmtime(constants.default_sed_file)
+    except OSError:
+        mtime = None
+    key = (constants.default_sed_file, mtime, tuple(exclude or []), regex)
+    redactor = _REDACTORS.get(key)
+    if redactor is None:
+        _REDACTORS.clear()
+        redactor = _REDACTORS[key] = _Redactor(exclude, regex)
+    return redactor
+
 
 def _process_content_redaction(filepath, exclude, regex=False):
     '''
@@ -45,6 +257,16 @@ def _process_content_redaction(filepath, exclude, regex=False):
     '''
     logger.debug('Processing %s...', filepath)
 
+    try:
+        redacted = _redactor(exclude, regex).redact(filepath)
+    except FilterNotSupported as ex:
+        logger.debug('Redacting %s with sed and grep: %s', filepath, ex)
+    else:
+        if redacted is None:
+            with open(filepath, 'rb') as f:
+                redacted = f.read()
+        return redacted
+
     # password removal
     sedcmd = Popen(['sed', '-rf', constants.default_sed_file, filepath], stdout=PIPE)
     # patterns removal
@@ -67,6 +289,18 @@ def _process_content_redaction(filepath, exclude, regex=False):
     return stdout
 
 
+def _unchanged_by_redaction(filepath, exclude, regex=False):
+    '''
+    Returns True if _process_content_redaction would return the contents
+    of filepath as they are, which is checked without running sed and
+    grep, and False if it wouldn't or that can't be told without them
+    '''
+    try:
+        return _redactor(exclude, regex).redact(filepath) is None
+    except FilterNotSupported:
+        return False
+
+
 class DataCollector(object):
     '''
     Run commands and collect files
@@ -435,6 +669,7 @@ class DataCollector(object):
         else:
             searchpath = self.archive.archive_dir
 
+        paths = []
         for dirpath, dirnames, filenames in os.walk(searchpath):
             for f in filenames:
                 fullpath = os.path.join(dirpath, f)
@@ -443,9 +678,26 @@ class DataCollector(object):
                    fullpath.endswith('insights_commands/subscription-manager_identity')):
                     # do not redact the ID files
                     continue
-                redacted_contents = _process_content_redaction(fullpath, exclude, regex)
-                with open(fullpath, 'wb') as dst:
-                    dst.write(redacted_contents)
+                paths.append(fullpath)
+
+        def redact_file(fullpath):
+            # files redaction doesn't change aren't rewritten
+            if _unchanged_by_redaction(fullpath, exclude, regex):
+                return
+            redacted_contents = _process_content_redaction(fullpath, exclude, regex)
+            with open(fullpath, 'wb') as dst:
+                dst.write(redacted_contents)
+
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            logger.debug('concurrent.futures is unavailable. Redacting serially.')
+            for fullpath in paths:
+                redact_file(fullpath)
+        else:
+            with ThreadPoolExecutor(max_workers=REDACTION_WORKERS) as pool:
+                # list() raises the first failure, like the serial loop
+                list(pool.map(redact_file, paths))
 
     def done(self, conf, rm_conf):
         """
@@ -19,7 +19,10 @@ from datetime import datetime
 
 from insights import apply_configs, apply_default_enabled, dr
 from insights.core import blacklist, filters
+from insights.core.archives import create_tar
+from insights.core.governor import Governor, set_governor
 from insights.core.serde import Hydration
+from insights.core.spec_factory import DatasourceCache, prefetch_commands, set_datasource_cache
 from insights.util import fs
 from insights.util.subproc import call, CalledProcessError
 
@@ -49,6 +52,47 @@ client:
         class: insights.core.context.HostContext
         args:
             timeout: 10 # timeout in seconds for commands. Doesn't apply to files.
+            # set it to run commands ahead of time, at most this many at
+            # once, e.g. 4. null runs them one at a time when needed.
+            command_workers: null
+
+    # output of slow but rarely changing datasources kept between collections
+    # on this host. Set path to a directory, e.g.
+    # /var/cache/insights/datasources, to use it. Datasources are cached for
+    # ttl seconds, 0 meaning not at all, unless a spec overrides it. Specs
+    # are matched by name prefix, later entries overriding previous ones, and
+    # can list paths to watch: a change to them invalidates the output.
+    # Commands running rpm watch the rpm database.
+    cache:
+        path: null
+        ttl: 0
+        specs:
+            - name: insights.specs.default.DefaultSpecs.installed_rpms
+              ttl: 86400
+            - name: insights.specs.default.DefaultSpecs.ls_usr_lib64
+              ttl: 86400
+              watch: [/usr/lib64]
+            - name: insights.specs.default.DefaultSpecs.dmidecode
+              ttl: 3600
+            - name: insights.specs.default.DefaultSpecs.lspci_vmmkn
+              ttl: 3600
+
+    # limits on what collection takes from a busy host. Commands run under
+    # nice and ionice (scheduling class 1, 2 or 3 for idle), at most
+    # max_commands at once. Datasources that haven't run deadline seconds
+    # after collection starts are skipped unless an essential entry matches
+    # the start of their name or of the spec they implement. The client
+    # lists what was skipped in collection_stats. null means no limit.
+    governor:
+        nice: null
+        ionice: null
+        max_commands: null
+        deadline: null
+        essential:
+            - insights.specs.Specs.hostname
+            - insights.specs.Specs.machine_id
+            - insights.specs.Specs.redhat_release
+            - insights.specs.Specs.uname
 
     # commands and files to ignore
     blacklist:
@@ -65,6 +109,22 @@ client:
         - name: insights.specs.Specs
           enabled: true
 
+    # persisted components are saved to a json file each in meta_data, or
+    # with pack: true to a single indexed meta_data.pack file that analysis
+    # loads just the components it needs from. Tools that read meta_data
+    # directly, like obfuscation and the client's large file check, need the
+    # json files. Each component is saved as soon as it's evaluated, unless
+    # writers is set, e.g. to 4, to save them in that many background
+    # threads while collection goes on, with at most max_pending of them
+    # waiting.
+    serialization:
+        pack: false
+        compress: true
+        writers: 0
+        max_pending: null
+
+    # serial, parallel (disjoint subgraphs run concurrently), or dag (each
+    # component runs as soon as its dependencies have been tried)
     run_strategy:
         name: serial
         args:
@@ -304,14 +364,10 @@ def create_archive(path, remove_path=True):
     """
     Creates a tar.gz of the path using the path basename + "tar.gz"
     The resulting file is in the parent directory of the original path, and
-    the original path is removed.
+    the original path is removed. Files are removed as they're archived so
+    the collection doesn't need twice its size on disk.
     """
-    root_path = os.path.dirname(path)
-    relative_path = os.path.basename(path)
-    archive_path = path + ".tar.gz"
-
-    cmd = [["tar", "-C", root_path, "-czf", archive_path, relative_path]]
-    call(cmd, env=SAFE_ENV)
+    archive_path = create_tar(path, path + ".tar.gz", remove=remove_path)
     if remove_path:
         fs.remove(path)
     return archive_path
@@ -336,7 +392,8 @@ def get_pool(parallel, kwargs):
         yield None
 
 
-def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=None, client_timeout=None):
+def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=None, client_timeout=None,
+            collection_stats=None):
     """
     This is the collection entry point. It accepts a manifest, a temporary
     directory in which to store output, and a boolean for optional compression.
@@ -354,6 +411,9 @@ def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=No
             "commands", "files", and "keywords", to be injected
             into the manifest blacklist.
         client_timeout (int): Client-provided command timeout value
+        collection_stats (dict): if given, the deadline of the manifest's
+            governor and the datasources it skipped are added to it under
+            "governor".
     Returns:
         The full path to the created tar.gz or workspace.
     """
@@ -387,7 +447,11 @@ def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=No
     to_persist = get_to_persist(client.get("persist", set()))
 
     try:
+        # a prebuilt index of the same filters already has every
+        # datasource's filters resolved
         filters.load()
+        if not filters.load_index():
+            filters.compile_index()
     except IOError as e:
         # could not load filters file
         log.debug("No filters available: %s", str(e))
@@ -411,12 +475,40 @@ def collect(manifest=default_manifest, tmp_path=None, compress=False, rm_conf=No
     ctx = create_context(client.get("context", {}))
     broker[ctx.__class__] = ctx
 
-    parallel = run_strategy.get("name") == "parallel"
+    strategy = run_strategy.get("name")
+    parallel = strategy in ("parallel", "dag")
     pool_args = run_strategy.get("args", {})
-    with get_pool(parallel, pool_args) as pool:
-        h = Hydration(output_path, pool=pool)
-        broker.add_observer(h.make_persister(to_persist))
-        dr.run_all(broker=broker, pool=pool)
+    command_pool = getattr(ctx, "command_pool", None)
+    cache = client.get("cache") or {}
+    serialization = client.get("serialization") or {}
+    governor = Governor(**(client.get("governor") or {}))
+    try:
+        set_governor(governor)
+        if cache.get("path"):
+            set_datasource_cache(DatasourceCache(cache["path"], ttl=cache.get("ttl"), specs=cache.get("specs")))
+        if command_pool is not None:
+            prefetch_commands(broker)
+        with get_pool(parallel, pool_args) as pool:
+            h = Hydration(output_path, pool=pool, pack=serialization.get("pack", False),
+                          compress=serialization.get("compress", True),
+                          writers=serialization.get("writers", 0),
+                          max_pending=serialization.get("max_pending"))
+            broker.add_observer(h.make_persister(to_persist))
+            try:
+                if strategy == "dag":
+                    dr.run_parallel(broker=broker, pool=pool)
+                else:
+                    dr.run_all(broker=broker, pool=pool)
+            finally:
+                h.close()
+    finally:
+        set_datasource_cache(None)
+        if command_pool is not None:
+            command_pool.shutdown()
+        set_governor(None)
+
+    if collection_stats is not None:
+        collection_stats["governor"] = governor.stats()
 
     if compress:
         return create_archive(output_path)
@@ -26,6 +26,7 @@ from insights.parsr import (Char, EOF, EOL, EndTagName, Forward, FS, GT, InSet,
 from insights.parsers.httpd_conf import HttpdConf, dict_deep_merge, ParsedData
 from insights.specs import Specs
 from insights.util import deprecated
+from insights.util.lines import MappedLines
 
 
 @combiner(HttpdConf)
@@ -335,7 +336,7 @@ class DocParser(object):
 
 def parse_doc(content, ctx=None):
     """ Parse a configuration document into a tree that can be queried. """
-    if isinstance(content, list):
+    if isinstance(content, (list, MappedLines)):
         content = "\n".join(content)
     parse = DocParser(ctx)
     result = parse(content)[0]
@@ -350,7 +351,7 @@ class _HttpdConf(ConfigParser):
         super(_HttpdConf, self).__init__(*args, **kwargs)
 
     def parse_doc(self, content):
-        if isinstance(content, list):
+        if isinstance(content, (list, MappedLines)):
             content = "\n".join(content)
         result = self.parse(content)[0]
         return Entry(children=result, src=self)
@@ -23,6 +23,7 @@ from insights.parsr import (AnyChar, Choice, EOF, EOL, Forward, LeftCurly,
         LineEnd, Literal, Many, Number, OneLineComment, Opt, PosMarker,
         QuotedString, RightCurly, skip_none, String, WS, WSChar)
 from insights.parsr.query import Directive, Entry, Section
+from insights.util.lines import MappedLines
 
 
 @combiner(LogrotateConf)
@@ -191,7 +192,7 @@ class DocParser(object):
 
 def parse_doc(content, ctx=None):
     """ Parse a configuration document into a tree that can be queried. """
-    if isinstance(content, list):
+    if isinstance(content, (list, MappedLines)):
         content = "\n".join(content)
     parse = DocParser(ctx)
     result = parse(content)
@@ -11,6 +11,7 @@ import yaml
 
 from collections import OrderedDict
 from fnmatch import fnmatch
+from itertools import chain
 
 from insights.contrib.ConfigParser import NoOptionError, NoSectionError
 from insights.core import ls_parser
@@ -20,6 +21,7 @@ from insights.parsers import ParseException, SkipException
 from insights.parsr import iniparser
 from insights.parsr.query import Directive, Entry, Result, Section, compile_queries
 from insights.util import deprecated
+from insights.util.lines import MappedLines
 
 try:
     from yaml import CSafeLoader as SafeLoader
@@ -77,6 +79,14 @@ class Parser(object):
         'content.conf'
     """
 
+    streaming = False
+    """
+    bool: Set to ``True`` by parsers whose ``parse_content`` reads the content
+    once from start to end. They're passed an iterator over
+    ``context.stream()`` instead of the list of lines, so a large file is
+    parsed without reading all of its lines into memory first.
+    """
+
     def __init__(self, context):
         self.file_path = os.path.join("/", context.relative_path) if context.relative_path is not None else None
         """str: Full context path of the input file."""
@@ -91,7 +101,7 @@ class Parser(object):
         self._handle_content(context)
 
     def _handle_content(self, context):
-        self.parse_content(context.content)
+        self.parse_content(context.stream() if self.streaming else context.content)
 
     def parse_content(self, content):
         """This method must be implemented by classes based on this class."""
@@ -106,9 +116,7 @@ class StreamParser(Parser):
     efficient. The only difference between StreamParser and Parser is that
     StreamParser.parse_content will receive a generator instead of a list.
     """
-
-    def _handle_content(self, context):
-        self.parse_content(context.stream())
+    streaming = True
 
 
 @serializer(Parser)
@@ -572,7 +580,7 @@ class CommandParser(Parser):
 
         if results:
             bad_lines = bad_lines if len(results) > 1 else bad_single_lines
-            if any(bl in rl.lower() for bl in bad_lines for rl in results):
+            if any(bl in rl for rl in (r.lower() for r in results) for bl in bad_lines):
                 return False
         return True
 
@@ -588,15 +596,47 @@ class CommandParser(Parser):
                 `self.__bad_single_lines` and `self.__bad_lines`.
         """
         extra_bad_lines = [] if extra_bad_lines is None else extra_bad_lines
-        valid_lines = self.validate_lines(context.content, self.__bad_single_lines, self.__bad_lines)
-        if valid_lines and extra_bad_lines:
-            valid_lines = self.validate_lines(context.content, extra_bad_lines, extra_bad_lines)
-        if not valid_lines:
-            first = context.content[0] if context.content else "<no content>"
-            name = self.__class__.__name__
-            raise ContentException(name + ": " + first)
+        if self.streaming:
+            # the lines are checked as they're read in _handle_content
+            self._extra_bad_lines = extra_bad_lines
+        else:
+            valid_lines = self.validate_lines(context.content, self.__bad_single_lines, self.__bad_lines)
+            if valid_lines and extra_bad_lines:
+                valid_lines = self.validate_lines(context.content, extra_bad_lines, extra_bad_lines)
+            if not valid_lines:
+                first = context.content[0] if context.content else "<no content>"
+                name = self.__class__.__name__
+                raise ContentException(name + ": " + first)
         super(CommandParser, self).__init__(context)
 
+    def _handle_content(self, context):
+        if self.streaming:
+            extra_bad_lines = self.__dict__.pop("_extra_bad_lines", [])
+            self.parse_content(self._validated(context.stream(), extra_bad_lines))
+        else:
+            super(CommandParser, self)._handle_content(context)
+
+    def _validated(self, lines, extra_bad_lines):
+        """
+        Yields `lines` for a streaming parser, raising ContentException when
+        a line is found that `validate_lines` would have rejected. Whether the
+        output is a single line is only known once the second line has been
+        read, so the first line is held back until then.
+        """
+        first = next(lines, None)
+        if first is None:
+            return
+        second = next(lines, None)
+        if second is None:
+            lines, bad_lines = [first], self.__bad_single_lines + extra_bad_lines
+        else:
+            lines, bad_lines = chain([first, second], lines), self.__bad_lines + extra_bad_lines
+        for line in lines:
+            lowered = line.lower()
+            if any(bl in lowered for bl in bad_lines):
+                raise ContentException(self.__class__.__name__ + ": " + first)
+            yield line
+
 
 class XMLParser(LegacyItemAccess, Parser):
     """
@@ -723,7 +763,7 @@ class YAMLParser(Parser, LegacyItemAccess):
     """
     def parse_content(self, content):
         try:
-            if type(content) is list:
+            if isinstance(content, (list, MappedLines)):
                 self.data = yaml.load('\n'.join(content), Loader=SafeLoader)
             else:
                 self.data = yaml.load(content, Loader=SafeLoader)
@@ -968,7 +1008,22 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         strings in the given list.
         """
         search_by_expression = self._valid_search(s)
-        return any(search_by_expression(l) for l in self.lines)
+        return any(search_by_expression(l) for l in self._candidates(s))
+
+    def _candidates(self, s, check=all, reverse=False):
+        """
+        Returns the lines that may contain `s`, in reverse order if `reverse`
+        is ``True``. When the lines are a
+        :class:`insights.util.lines.MappedLines`, they're narrowed down by
+        searching the file for `s` or, with ``check=all``, its first string.
+        """
+        search = getattr(self.lines, "search", None)
+        if search is not None:
+            if isinstance(s, six.string_types):
+                return search(s, reverse)
+            if isinstance(s, list) and s and check is all:
+                return search(s[0], reverse)
+        return reversed(self.lines) if reverse else self.lines
 
     def _parse_line(self, line):
         """
@@ -1013,9 +1068,10 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
             raise TypeError('Required numbers must be given as a integer')
         ret = []
         search_by_expression = self._valid_search(s, check)
-        lines = self.lines[::-1] if reverse else self.lines
-        for l in lines:
-            if (num is None or len(ret) < num) and search_by_expression(l):
+        for l in self._candidates(s, check, reverse):
+            if num is not None and len(ret) >= num:
+                break
+            if search_by_expression(l):
                 ret.append(self._parse_line(l))
         # re-sort to original order
         return ret[::-1] if reverse else ret
@@ -1058,7 +1114,7 @@ class LogFileOutput(six.with_metaclass(ScanMeta, Parser)):
         """
         def _scan(self):
             search_by_expression = self._valid_search(token, check)
-            return any(search_by_expression(l) for l in self.lines)
+            return any(search_by_expression(l) for l in self._candidates(token, check))
 
         cls.scan(result_key, _scan)
 
@@ -1376,7 +1432,7 @@ class Syslog(LogFileOutput):
         Yields:
             (dict): The parsed syslog messages produced by that process or facility
         """
-        for line in self.lines:
+        for line in self._candidates(proc):
             l = self._parse_line(line)
             procid = l.get('procname', '')
             if proc == procid or proc == procid.split('[')[0]:
@@ -1,11 +1,19 @@
 #!/usr/bin/env python
 
+import fnmatch
 import logging
 import os
+import posixpath
+import stat
+import tarfile
 import tempfile
+import zipfile
+import zlib
 from contextlib import contextmanager
 from insights.util import fs, subproc, which
 from insights.util.content_type import from_file as content_type_from_file
+from insights.util.paths import ArchiveIndex
+from insights.util.seekable_gzip import SeekableGzip
 
 logger = logging.getLogger(__name__)
 
@@ -77,9 +85,98 @@ class TarExtractor(object):
 
 
 class Extraction(object):
-    def __init__(self, tmp_dir, content_type):
+    def __init__(self, tmp_dir, content_type, index=None):
         self.tmp_dir = tmp_dir
         self.content_type = content_type
+        self.index = index
+
+
+def _member_name(name):
+    # the path tar would extract a member to, or None if it wouldn't
+    name = posixpath.normpath(name.lstrip("/"))
+    if name == "." or name.split("/")[0] == ".." or fnmatch.fnmatch(name, "*/dev/null"):
+        return None
+    return name
+
+
+class TarMembers(object):
+    """
+    Reads the members of a tar archive in place. Gzipped archives are read
+    through a :class:`insights.util.seekable_gzip.SeekableGzip`, so reading
+    a member doesn't decompress the archive from the start again.
+    """
+    def __init__(self, path, gzipped=False):
+        self._f = SeekableGzip(path) if gzipped else open(path, "rb")
+        try:
+            self._tar = tarfile.open(fileobj=self._f, mode="r:")
+        except Exception:
+            self._f.close()
+            raise
+
+    def members(self):
+        for m in self._tar.getmembers():
+            name = _member_name(m.name)
+            if name is None:
+                continue
+            if m.isdir():
+                yield name, "dir", None
+            elif m.issym():
+                yield name, "link", m.linkname
+            elif m.isfile() or m.islnk():
+                yield name, "file", m
+
+    def open(self, member):
+        return self._tar.extractfile(member)
+
+    def close(self):
+        self._tar.close()
+        self._f.close()
+
+
+class ZipMembers(object):
+    """ Reads the members of a zip archive in place. """
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path)
+
+    def members(self):
+        seen = set()
+        for info in self._zip.infolist():
+            name = _member_name(info.filename)
+            # unzip -n keeps the first of members with the same name
+            if name is None or name in seen:
+                continue
+            seen.add(name)
+            mode = info.external_attr >> 16
+            if info.filename.endswith("/") or stat.S_ISDIR(mode):
+                yield name, "dir", None
+            elif stat.S_ISLNK(mode):
+                yield name, "link", self._zip.read(info).decode("utf-8", "surrogateescape")
+            else:
+                yield name, "file", info
+
+    def open(self, info):
+        return self._zip.open(info)
+
+    def close(self):
+        self._zip.close()
+
+
+def open_members(path, content_type):
+    """
+    Returns a :class:`TarMembers` or :class:`ZipMembers` for the archive at
+    ``path``, or ``None`` if its members can't be read in place and it has
+    to be extracted.
+    """
+    try:
+        if content_type == "application/zip":
+            return ZipMembers(path)
+        if content_type == "application/x-tar":
+            return TarMembers(path)
+        if content_type in ("application/x-gzip", "application/gzip"):
+            return TarMembers(path, gzipped=True)
+    except (EnvironmentError, tarfile.TarError, zipfile.BadZipfile, zlib.error) as ex:
+        logger.debug("Extracting %s instead of reading it in place: %s", path, ex)
+    return None
 
 
 @contextmanager
@@ -106,3 +203,98 @@ def extract(path, timeout=None, extract_dir=None, content_type=None):
     finally:
         if extractor.created_tmp_dir:
             fs.remove(extractor.tmp_dir, chmod=True)
+
+
+@contextmanager
+def open_archive(path, timeout=None, extract_dir=None, content_type=None):
+    """
+    Like :func:`extract`, but tar, gzipped tar and zip archives aren't
+    extracted. Their members are listed once and an
+    :class:`insights.util.paths.ArchiveIndex` over them is yielded as the
+    ``index`` of the extraction, which writes members into the temporary
+    path only when they're read. Other archives are extracted and have no
+    ``index``.
+
+    xz and bzip2 streams can't be resumed from the middle, so there's no
+    cheap way to read their members out of order and they're still
+    extracted.
+    """
+    content_type = content_type or content_type_from_file(path)
+    members = open_members(path, content_type)
+    if members is None:
+        with extract(path, timeout=timeout, extract_dir=extract_dir, content_type=content_type) as ex:
+            yield ex
+        return
+
+    tmp_dir = None
+    try:
+        try:
+            tmp_dir = tempfile.mkdtemp(prefix="insights-", dir=extract_dir)
+            index = ArchiveIndex(tmp_dir, members.members(), members.open)
+        except (EnvironmentError, tarfile.TarError, zlib.error) as ex:
+            raise InvalidArchive("Unable to read %s: %s" % (path, ex))
+        yield Extraction(tmp_dir, content_type, index=index)
+    finally:
+        members.close()
+        if tmp_dir:
+            fs.remove(tmp_dir, chmod=True)
+
+
+# tarfile modes for the compressors InsightsArchive accepts
+_TAR_MODES = {
+    "gz": "w:gz",
+    "xz": "w:xz",
+    "bz2": "w:bz2",
+    "none": "w",
+}
+
+
+def _add_tree(tar, path, name, remove):
+    info = tar.gettarinfo(path, name)
+    if info is None:
+        # sockets and the like can't be archived
+        logger.debug("Skipping %s: unsupported file type", path)
+        return
+    if info.isreg():
+        try:
+            f = open(path, "rb")
+        except EnvironmentError as ex:
+            logger.warning("Skipping %s: %s", path, ex)
+            return
+        with f:
+            tar.addfile(info, f)
+    elif info.isdir():
+        tar.addfile(info)
+        for n in sorted(os.listdir(path)):
+            _add_tree(tar, os.path.join(path, n), posixpath.join(name, n), remove)
+        return
+    else:
+        tar.addfile(info)
+    if remove:
+        os.remove(path)
+
+
+def create_tar(path, archive_path, compressor="gz", arcname=None, remove=False):
+    """
+    Writes the directory at ``path`` to a tar file at ``archive_path``
+    without running ``tar``. Member names start with ``arcname``, the
+    basename of ``path`` by default, and ``compressor`` is one of ``gz``,
+    ``xz``, ``bz2`` or ``none``, with anything else meaning ``gz``.
+
+    The tar stream is compressed as it's written. With ``remove``, each file
+    and link is deleted as soon as it's in the archive, so the collected
+    files and the archive never both take up their full size on disk.
+    Directories are left for the caller to remove.
+
+    Raises:
+        tarfile.CompressionError: if the module for the compressor isn't
+            available. Nothing's been removed in that case.
+    """
+    mode = _TAR_MODES.get(compressor, "w:gz")
+    # tar's defaults: gzip -6 is much faster than tarfile's 9 for about the
+    # same size, and tarfile already matches xz -6 and bzip2 -9
+    kwargs = {"compresslevel": 6} if mode == "w:gz" else {}
+    arcname = os.path.basename(path) if arcname is None else arcname
+    with tarfile.open(archive_path, mode, **kwargs) as tar:
+        _add_tree(tar, path, arcname, remove)
+    return archive_path
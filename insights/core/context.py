@@ -3,6 +3,7 @@ import os
 import six
 from contextlib import contextmanager
 from insights.util import streams, subproc
+from insights.util.paths import PathResolver
 
 log = logging.getLogger(__name__)
 GLOBAL_PRODUCTS = []
@@ -156,6 +157,21 @@ class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
         self.timeout = timeout
         self.all_files = all_files or []
 
+    @property
+    def path_resolver(self):
+        """
+        :class:`insights.util.paths.PathResolver` shared by the datasources
+        that find and check files with this context.
+        """
+        resolver = self.__dict__.get("_path_resolver")
+        if resolver is None:
+            resolver = self._path_resolver = PathResolver()
+        return resolver
+
+    @path_resolver.setter
+    def path_resolver(self, resolver):
+        self._path_resolver = resolver
+
     @classmethod
     def handles(cls, files):
         if cls.marker is None or not files:
@@ -222,8 +238,23 @@ class ExecutionContext(six.with_metaclass(ExecutionContextMeta)):
 
 @fs_root
 class HostContext(ExecutionContext):
-    def __init__(self, root='/', timeout=30, all_files=None):
+    """
+    Context for collecting from the running host.
+
+    Args:
+        command_workers (int): if given, commands of datasources can be started
+            ahead of time in a :class:`insights.util.subproc.CommandPool`
+            running at most this many at once. See
+            :func:`insights.core.spec_factory.prefetch_commands`.
+    """
+    def __init__(self, root='/', timeout=30, all_files=None, command_workers=None):
         super(HostContext, self).__init__(root=root, timeout=timeout, all_files=all_files)
+        self.command_pool = None
+        if command_workers:
+            try:
+                self.command_pool = subproc.CommandPool(command_workers)
+            except ImportError:
+                log.debug("concurrent.futures is unavailable. Commands will run serially.")
 
 
 @fs_root
@@ -48,19 +48,23 @@ instead of at the end.
 """
 from __future__ import print_function
 
+import hashlib
+import heapq
 import inspect
 import logging
 import json
 import os
 import pkgutil
 import re
+import signal
 import six
 import sys
+import threading
 import time
 import traceback
 
 from collections import defaultdict
-from functools import reduce as _reduce
+from functools import partial, reduce as _reduce
 
 from insights.contrib import importlib
 from insights.contrib.toposort import toposort_flatten
@@ -83,7 +87,27 @@ COMPONENTS = defaultdict(lambda: defaultdict(set))
 DELEGATES = {}
 HIDDEN = set()
 IGNORE = defaultdict(set)
-ENABLED = defaultdict(lambda: True)
+
+
+class _EnabledDict(defaultdict):
+    """
+    Tracks whether components are enabled. Looking up a component doesn't add
+    it, and any change invalidates cached :class:`ExecutionPlan` instances.
+    """
+    def __missing__(self, key):
+        return self.default_factory()
+
+    def __setitem__(self, key, value):
+        super(_EnabledDict, self).__setitem__(key, value)
+        invalidate_plans()
+
+
+ENABLED = _EnabledDict(lambda: True)
+
+_PLANS = {}
+_PLAN_GENERATION = 0
+
+TIMEOUTS = {}
 
 
 def set_enabled(component, enabled=True):
@@ -124,6 +148,41 @@ def is_enabled(component):
     return ENABLED[component]
 
 
+def set_timeout(component, seconds):
+    """
+    Set the wall-clock budget for a component or for every component of a
+    :class:`ComponentType`. A component that runs longer than its budget is
+    interrupted, a :class:`TimeoutSkip` is recorded for it in
+    ``Broker.exceptions``, and its dependents continue as if it had failed.
+
+    Args:
+        component (callable): a component or a ComponentType like ``parser``.
+        seconds (float): the budget in seconds. ``None`` removes the budget.
+
+    Returns:
+        None
+    """
+    if seconds is None:
+        TIMEOUTS.pop(component, None)
+    else:
+        TIMEOUTS[component] = seconds
+
+
+def get_timeout(component):
+    """
+    Return the wall-clock budget in seconds for a component. A budget set on
+    the component itself wins over one set on its type or any of the type's
+    base classes. Returns ``None`` if the component has no budget.
+    """
+    if component in TIMEOUTS:
+        return TIMEOUTS[component]
+    delegate = DELEGATES.get(component)
+    if delegate is not None:
+        for t in delegate.type.__mro__:
+            if t in TIMEOUTS:
+                return TIMEOUTS[t]
+
+
 def get_delegate(component):
     return DELEGATES.get(component)
 
@@ -238,6 +297,19 @@ class SkipComponent(Exception):
     pass
 
 
+class TimeoutSkip(BaseException):
+    """
+    Raised inside a component that exceeds its budget from
+    :func:`set_timeout`. It derives from ``BaseException`` so handlers in
+    components that catch ``Exception`` don't swallow it.
+    """
+    def __init__(self, component, seconds):
+        self.component = component
+        self.seconds = seconds
+        msg = "%s exceeded its %s second budget." % (get_name(component), seconds)
+        super(TimeoutSkip, self).__init__(msg)
+
+
 def get_name(component):
     """
     Attempt to get the string name of component, including module and class if
@@ -499,6 +571,7 @@ def _register_component(delegate):
 
     MODULE_NAMES[component] = get_module_name(component)
     BASE_MODULE_NAMES[component] = get_base_module_name(component)
+    invalidate_plans()
 
 
 class ComponentType(object):
@@ -670,7 +743,7 @@ class ComponentType(object):
         Gets required and at-least-one dependencies not provided by the broker.
         """
         missing_required = [r for r in self.requires if r not in broker]
-        missing_at_least_one = [d for d in self.at_least_one if not set(d).intersection(broker)]
+        missing_at_least_one = [d for d in self.at_least_one if not any(i in broker for i in d)]
         if missing_required or missing_at_least_one:
             return (missing_required, missing_at_least_one)
 
@@ -697,6 +770,7 @@ class ComponentType(object):
 
         DEPENDENCIES[self.component].add(dep)
         COMPONENTS[group][self.component].add(dep)
+        invalidate_plans()
 
 
 class Broker(object):
@@ -729,17 +803,47 @@ class Broker(object):
             :func:`time.time`. For components that produce multiple instances,
             the execution time here is the sum of their individual execution
             times.
+        lazy (bool): if ``True``, getting a component that hasn't been tried
+            yet evaluates it with :func:`Broker.resolve` instead of raising a
+            ``KeyError``.
+        tried (set): components evaluated by :func:`Broker.resolve`.
+        profiler (insights.core.profiling.Profiler): if set, records a span
+            for every component the broker evaluates.
+        digests (dict): component -> hex digest of its inputs, recorded by
+            :func:`run` when it's given a ``prior`` broker.
+        reused (set): components whose values :func:`run` copied from the
+            ``prior`` broker instead of evaluating them.
+        pending (dict): components added with :func:`Broker.add_pending`
+            that haven't been loaded yet, and the functions that load them.
     """
-    def __init__(self, seed_broker=None):
+    def __init__(self, seed_broker=None, lazy=False):
         self.instances = dict(seed_broker.instances) if seed_broker else {}
+        self.pending = dict(seed_broker.pending) if seed_broker is not None else {}
+        self._pending_lock = threading.Lock()
+        # pending component -> the lock held while it's loading
+        self._pending_locks = {}
+        self._loading = set()
         self.missing_requirements = {}
         self.exceptions = defaultdict(list)
         self.tracebacks = {}
         self.exec_times = {}
+        self.lazy = lazy or (seed_broker is not None and seed_broker.lazy)
+        self.tried = set()
+        self.profiler = seed_broker.profiler if seed_broker is not None else None
+        self.digests = dict(seed_broker.digests) if seed_broker is not None else {}
+        self.reused = set()
+
+        # component type -> {component: instance}
+        self._by_type = defaultdict(dict)
+        # component type -> observers that fire for it. Cleared by add_observer
+        self._dispatch = {}
 
         self.observers = defaultdict(set)
         if seed_broker is not None:
-            self.observers.update(seed_broker.observers)
+            for k, v in seed_broker.observers.items():
+                self.observers[k] = set(v)
+            for k, v in seed_broker._by_type.items():
+                self._by_type[k] = dict(v)
         else:
             self.observers[ComponentType] = set()
             for k, v in TYPE_OBSERVERS.items():
@@ -778,19 +882,28 @@ class Broker(object):
         """
 
         self.observers[component_type].add(o)
+        self._dispatch.clear()
+
+    def _get_observers(self, _type):
+        observers = self._dispatch.get(_type)
+        if observers is None:
+            observers = []
+            for k, v in self.observers.items():
+                if issubclass(_type, k):
+                    observers.extend(v)
+            self._dispatch[_type] = observers
+        return observers
 
     def fire_observers(self, component):
         _type = get_component_type(component)
         if not _type:
             return
 
-        for k, v in self.observers.items():
-            if issubclass(_type, k):
-                for o in v:
-                    try:
-                        o(component, self)
-                    except Exception as e:
-                        log.exception(e)
+        for o in self._get_observers(_type):
+            try:
+                o(component, self)
+            except Exception as e:
+                log.exception(e)
 
     def add_exception(self, component, ex, tb=None):
         if isinstance(ex, MissingRequirements):
@@ -799,49 +912,145 @@ class Broker(object):
             self.exceptions[component].append(ex)
             self.tracebacks[ex] = tb
 
+    def add_pending(self, component, load):
+        """
+        Adds a component whose value isn't loaded until the broker is first
+        asked for it or whether it has it. ``load`` is called then and
+        returns the value, or ``None`` if there isn't one after all, in which
+        case the broker doesn't have the component.
+        """
+        if component in self.instances or component in self.pending:
+            raise KeyError("Already exists in broker with key: %s" % get_name(component))
+        self.pending[component] = load
+
+    def _load(self, component):
+        # holding the component's lock while loading makes other threads
+        # asking for it wait for it, but not those asking for anything else.
+        # It stays pending until it's set so they know to wait.
+        with self._pending_lock:
+            if component not in self.pending:
+                return
+            lock = self._pending_locks.get(component)
+            if lock is None:
+                lock = self._pending_locks[component] = threading.RLock()
+        with lock:
+            load = self.pending.get(component)
+            if load is None or component in self._loading:
+                return
+            self._loading.add(component)
+            try:
+                value = load()
+                if value is not None:
+                    self._set(component, value)
+            finally:
+                self._loading.discard(component)
+                self.pending.pop(component, None)
+                self._pending_locks.pop(component, None)
+
+    def _load_all(self):
+        for component in list(self.pending):
+            self._load(component)
+
     def __iter__(self):
+        self._load_all()
         return iter(self.instances)
 
     def keys(self):
+        self._load_all()
         return self.instances.keys()
 
     def items(self):
+        self._load_all()
         return self.instances.items()
 
     def values(self):
+        self._load_all()
         return self.instances.values()
 
     def get_by_type(self, _type):
         """
         Return all of the instances of :class:`ComponentType` ``_type``.
         """
-        r = {}
-        for k, v in self.items():
-            if get_component_type(k) is _type:
-                r[k] = v
-        return r
+        for component in list(self.pending):
+            if get_component_type(component) is _type:
+                self._load(component)
+        return dict(self._by_type.get(_type, {}))
 
     def __contains__(self, component):
+        if component not in self.instances and component in self.pending:
+            self._load(component)
         return component in self.instances
 
     def __setitem__(self, component, instance):
         msg = "Already exists in broker with key: %s"
-        if component in self.instances:
+        if component in self.instances or component in self.pending:
             raise KeyError(msg % get_name(component))
+        self._set(component, instance)
 
+    def _set(self, component, instance):
         self.instances[component] = instance
+        self._by_type[get_component_type(component)][component] = instance
 
     def __delitem__(self, component):
+        self.pending.pop(component, None)
         if component in self.instances:
             del self.instances[component]
+            self._by_type[get_component_type(component)].pop(component, None)
             return
 
     def __getitem__(self, component):
+        if component not in self.instances and component in self.pending:
+            self._load(component)
         if component in self.instances:
             return self.instances[component]
 
+        if self.lazy and component not in self.tried and component in DELEGATES:
+            self.resolve(component)
+            if component in self.instances:
+                return self.instances[component]
+
         raise KeyError("Unknown component: %s" % get_name(component))
 
+    def resolve(self, component):
+        """
+        Evaluates a component after recursively evaluating only the
+        dependencies it needs. Required dependencies are tried first. If one of
+        them can't be satisfied, the component's remaining dependencies aren't
+        evaluated, and the component is recorded as missing requirements
+        without trying them. Each component is tried at most once per broker.
+
+        Args:
+            component: the component to evaluate.
+
+        Returns:
+            The value of the component or ``None`` if it couldn't be evaluated.
+        """
+        if component in self or component in self.tried or component not in DELEGATES:
+            return self.instances.get(component)
+
+        self.tried.add(component)
+        delegate = DELEGATES[component] if is_enabled(component) else None
+        if delegate is not None and not any(i in self for i in IGNORE.get(component, [])):
+            if self._resolve_all(delegate.requires):
+                if all(self._resolve_any(group) for group in delegate.at_least_one):
+                    self._resolve_all(delegate.optional, stop_early=False)
+
+        _try(component, delegate, self)
+        return self.instances.get(component)
+
+    def _resolve_all(self, components, stop_early=True):
+        for c in components:
+            self.resolve(c)
+            if stop_early and c not in self.instances:
+                return False
+        return True
+
+    def _resolve_any(self, components):
+        # all of them are resolved since each one is passed to the component
+        for c in components:
+            self.resolve(c)
+        return any(c in self.instances for c in components)
+
     def get(self, component, default=None):
         try:
             return self[component]
@@ -937,54 +1146,369 @@ def _determine_components(components):
         return COMPONENTS[components]
 
 
-def run(components=None, broker=None):
+class ExecutionPlan(object):
+    """
+    A compiled form of a dependency graph that can be evaluated any number of
+    times. It holds the order in which components are tried, the delegate of
+    each component that should execute, and the dependencies and dependents of
+    each component as indexes into that order. A plan holds no evaluation
+    state, so it can be shared by many brokers.
+
+    Registering components, adding dependencies, and enabling or disabling
+    components make existing plans stale. :func:`run` and
+    :func:`run_parallel` recompile a stale plan before using it.
+
+    Args:
+        components: Can be one of a dependency graph, a single component, a
+            component group, or a component type.
+
+    Attributes:
+        graph (dict): the dependency graph the plan was compiled from.
+        order (list): components in an order that satisfies their
+            dependencies.
+        delegates (list): the delegate for each component in ``order``, or
+            ``None`` if the component isn't in the graph, isn't registered, or
+            is disabled.
+        dependencies (list): tuples of indexes into ``order`` of each
+            component's dependencies.
+        dependents (list): tuples of indexes into ``order`` of each
+            component's dependents.
+    """
+    def __init__(self, components=None):
+        self.components = components
+        self.compile()
+
+    def compile(self):
+        graph = _determine_components(self.components or COMPONENTS[GROUPS.single])
+        order = run_order(graph)
+        index = dict((c, i) for i, c in enumerate(order))
+
+        delegates = []
+        dependencies = []
+        dependents = [[] for _ in order]
+        for i, c in enumerate(order):
+            runnable = c in graph and c in DELEGATES and is_enabled(c)
+            delegates.append(DELEGATES[c] if runnable else None)
+            deps = tuple(index[d] for d in graph.get(c, []) if d in index)
+            dependencies.append(deps)
+            for d in deps:
+                dependents[d].append(i)
+
+        self.graph = graph
+        self.order = order
+        self.delegates = delegates
+        self.dependencies = dependencies
+        self.dependents = [tuple(d) for d in dependents]
+        self.generation = _PLAN_GENERATION
+
+    @property
+    def stale(self):
+        return self.generation != _PLAN_GENERATION
+
+    def __len__(self):
+        return len(self.order)
+
+
+def invalidate_plans():
+    """
+    Marks all compiled :class:`ExecutionPlan` instances as stale and clears
+    the plan cache. Called automatically when the registry changes.
+    """
+    global _PLAN_GENERATION
+    _PLAN_GENERATION += 1
+    _PLANS.clear()
+
+
+def _plan_key(components):
+    if not components:
+        return ("group", GROUPS.single)
+    if isinstance(components, dict):
+        for group, graph in COMPONENTS.items():
+            if components is graph:
+                return ("group", group)
+        return None
+    if isinstance(components, (list, set)):
+        if all(hashable(c) for c in components):
+            return ("components", frozenset(components))
+        return None
+    if hashable(components):
+        return ("component", components)
+
+
+def get_plan(components=None):
+    """
+    Returns an :class:`ExecutionPlan` for components. Plans for component
+    groups, types, single components, and lists of components are cached
+    until the registry changes. Arbitrary dependency graphs are compiled on
+    each call since they can be modified by the caller.
+
+    Args:
+        components: Can be one of an :class:`ExecutionPlan`, a dependency
+            graph, a single component, a component group, or a component type.
+
+    Returns:
+        ExecutionPlan: a plan that is current with the registry.
+    """
+    if isinstance(components, ExecutionPlan):
+        if components.stale:
+            components.compile()
+        return components
+
+    key = _plan_key(components)
+    if key is None:
+        return ExecutionPlan(components)
+
+    plan = _PLANS.get(key)
+    if plan is None or plan.stale:
+        plan = _PLANS[key] = ExecutionPlan(components)
+    return plan
+
+
+# If a component swallows TimeoutSkip, it's raised again at this interval.
+_TIMEOUT_REPEAT = 0.5
+
+
+def _arm_timeout(component, seconds):
+    """
+    Arms a SIGALRM timer that raises :class:`TimeoutSkip` in the running
+    component. Returns the previous handler, or ``None`` if the timer couldn't
+    be armed because there's no budget, the platform doesn't support it, we
+    aren't on the main thread, or another timer is already active.
+    """
+    if not seconds or not hasattr(signal, "setitimer"):
+        return None
+
+    if signal.getitimer(signal.ITIMER_REAL)[0]:
+        log.debug("Can't enforce budget for %s: ITIMER_REAL in use." % get_name(component))
+        return None
+
+    def handler(signum, frame):
+        raise TimeoutSkip(component, seconds)
+
+    try:
+        old = signal.signal(signal.SIGALRM, handler)
+    except ValueError:
+        # signal handlers can only be installed from the main thread.
+        return None
+    signal.setitimer(signal.ITIMER_REAL, seconds, _TIMEOUT_REPEAT)
+    return old or signal.SIG_DFL
+
+
+def _disarm_timeout(old):
+    if old is not None:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old)
+
+
+def _process(component, broker, delegate):
+    """
+    Executes a single component without storing its result in the broker.
+    Returns a ``(result, exception, traceback, exec_time)`` tuple so the
+    caller can record the outcome from a single thread.
+    """
+    start = time.time()
+    old = None
+    try:
+        log.info("Trying %s" % get_name(component))
+        old = _arm_timeout(component, get_timeout(component))
+        try:
+            if broker.profiler is None:
+                result = delegate.process(broker)
+            else:
+                with broker.profiler.span(component):
+                    result = delegate.process(broker)
+        finally:
+            _disarm_timeout(old)
+        return (result, None, None, time.time() - start)
+    except SkipComponent as sc:
+        return (None, sc, None, time.time() - start)
+    except TimeoutSkip as ts:
+        if old is None or ts.component is not component:
+            # the budget of a component this one is evaluated on behalf of
+            # ran out, so it's that component that's interrupted
+            raise
+        # the timer may have fired again before the finally block disarmed it.
+        _disarm_timeout(old)
+        return (None, ts, traceback.format_exc(), time.time() - start)
+    except Exception as ex:
+        return (None, ex, traceback.format_exc(), time.time() - start)
+
+
+def _record(component, broker, result, ex, tb):
+    if ex is None:
+        broker[component] = result
+    elif isinstance(ex, MissingRequirements):
+        if log.isEnabledFor(logging.DEBUG):
+            name = get_name(component)
+            reqs = stringify_requirements(ex.requirements)
+            log.debug("%s missing requirements %s" % (name, reqs))
+        broker.add_exception(component, ex)
+    elif not isinstance(ex, SkipComponent):
+        log.warning(tb)
+        broker.add_exception(component, ex, tb)
+
+
+def _try(component, delegate, broker):
+    start = time.time()
+    # a pending component is left for whatever needs it to load
+    if delegate is not None and component not in broker.pending and component not in broker:
+        result, ex, tb, exec_time = _process(component, broker, delegate)
+        _record(component, broker, result, ex, tb)
+    else:
+        exec_time = time.time() - start
+    broker.exec_times[component] = exec_time
+    broker.fire_observers(component)
+
+
+def _hash(parts):
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(("%s\0" % p).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _input_digest(component, delegate, broker):
+    """
+    Digest of a component's name and the digests of its dependencies. It's
+    ``None`` if a dependency that has a value doesn't have a digest.
+    """
+    parts = [get_name(component)]
+    for dep in sorted(delegate.get_dependencies(), key=get_name):
+        # a pending dependency isn't loaded just for its digest
+        if dep in broker.instances or dep in broker.pending:
+            digest = broker.digests.get(dep)
+            if digest is None:
+                return None
+        else:
+            digest = "-"
+        parts.extend([get_name(dep), digest])
+    return _hash(parts)
+
+
+def _content_digest(value):
+    """
+    Digest of a datasource value from the ``digest`` of the content providers
+    it contains, or ``None`` if it isn't made of content providers.
+    """
+    values = value if isinstance(value, list) else [value]
+    digests = [getattr(v, "digest", None) for v in values]
+    if not digests or not all(isinstance(d, six.string_types) for d in digests):
+        return None
+    return _hash(digests) if isinstance(value, list) else digests[0]
+
+
+def _evaluate_pending(component, delegate, broker):
+    # loads a component _try_incremental added to the broker as pending
+    result, ex, tb, exec_time = _process(component, broker, delegate)
+    broker.exec_times[component] = exec_time
+    if ex is not None:
+        _record(component, broker, None, ex, tb)
+        return None
+    return result
+
+
+def _try_incremental(component, delegate, broker, prior, needed=False):
+    digest = None
+    if delegate is not None and component not in broker.pending and component not in broker:
+        digest = _input_digest(component, delegate, broker)
+
+    unchanged = digest is not None and prior.digests.get(component) == digest
+    if unchanged and (component in prior or component in prior.exceptions or
+                      component in prior.missing_requirements):
+        # the outcome in prior is reused whether it's a value or a failure
+        if component in prior:
+            broker[component] = prior[component]
+        for ex in prior.exceptions.get(component, []):
+            broker.add_exception(component, ex, prior.tracebacks.get(ex))
+        if component in prior.missing_requirements:
+            broker.missing_requirements[component] = prior.missing_requirements[component]
+        broker.exec_times[component] = 0.0
+        broker.reused.add(component)
+        broker.fire_observers(component)
+    elif unchanged and needed:
+        # unchanged, but nothing about it was kept, e.g. because its value
+        # couldn't be saved: it's only evaluated if a component that changed
+        # needs it
+        broker.add_pending(component, partial(_evaluate_pending, component, delegate, broker))
+        broker.exec_times[component] = 0.0
+    else:
+        _try(component, delegate, broker)
+        if digest is None and component in broker:
+            digest = _content_digest(broker[component])
+
+    if digest is not None:
+        broker.digests[component] = digest
+
+
+def run(components=None, broker=None, prior=None):
     """
     Executes components in an order that satisfies their dependency
     relationships.
 
     Keyword Args:
-        components: Can be one of a dependency graph, a single component, a
-            component group, or a component type. If it's anything other than a
-            dependency graph, the appropriate graph is built for you and before
-            evaluation.
+        components: Can be one of an :class:`ExecutionPlan`, a dependency
+            graph, a single component, a component group, or a component type.
+            If it's anything other than a plan, the appropriate plan is
+            compiled or fetched from the plan cache before evaluation.
         broker (Broker): Optionally pass a broker to use for evaluation. One is
             created by default, but it's often useful to seed a broker with an
             initial dependency.
+        prior (Broker): the broker from an earlier run over similar data.
+            Datasources whose values are content providers get a digest of
+            their content, and every other component a digest of its
+            dependencies' digests. A component whose digest matches the one
+            in ``prior`` isn't evaluated. Its value or the errors it raised are
+            copied from ``prior`` instead. If ``prior`` has neither, a
+            component that others depend on is evaluated only when one that
+            did change needs it, and any other component is evaluated. Pass
+            an empty :class:`Broker` to only record digests. See
+            :func:`insights.core.serde.save_snapshot` to keep one between
+            processes.
     Returns:
         Broker: The broker after evaluation.
     """
-    components = components or COMPONENTS[GROUPS.single]
-    components = _determine_components(components)
+    plan = get_plan(components)
     broker = broker or Broker()
 
-    for component in run_order(components):
-        start = time.time()
-        try:
-            if (component not in broker and component in components and
-               component in DELEGATES and
-               is_enabled(component)):
-                log.info("Trying %s" % get_name(component))
-                result = DELEGATES[component].process(broker)
-                broker[component] = result
-        except MissingRequirements as mr:
-            if log.isEnabledFor(logging.DEBUG):
-                name = get_name(component)
-                reqs = stringify_requirements(mr.requirements)
-                log.debug("%s missing requirements %s" % (name, reqs))
-            broker.add_exception(component, mr)
-        except SkipComponent:
-            pass
-        except Exception as ex:
-            tb = traceback.format_exc()
-            log.warning(tb)
-            broker.add_exception(component, ex, tb)
-        finally:
-            broker.exec_times[component] = time.time() - start
-            broker.fire_observers(component)
+    if prior is not None:
+        for component, delegate, dependents in zip(plan.order, plan.delegates, plan.dependents):
+            _try_incremental(component, delegate, broker, prior, needed=bool(dependents))
+        return broker
+
+    for component, delegate in zip(plan.order, plan.delegates):
+        _try(component, delegate, broker)
 
     return broker
 
 
+def run_lazy(targets, broker=None):
+    """
+    Evaluates only the target components and the dependencies they need,
+    using :func:`Broker.resolve`. Unlike :func:`run`, components that no
+    target depends on aren't evaluated, and optional or "at least one"
+    dependencies of a component aren't evaluated if its required
+    dependencies aren't met.
+
+    The broker is left in lazy mode, so getting any other component from it
+    afterward evaluates that component on demand.
+
+    Args:
+        targets (list): the components to evaluate.
+
+    Keyword Args:
+        broker (Broker): Optionally pass a broker to use for evaluation. One is
+            created by default, but it's often useful to seed a broker with an
+            initial dependency.
+    Returns:
+        Broker: The broker after evaluation.
+    """
+    broker = broker or Broker()
+    broker.lazy = True
+    for t in targets:
+        broker.resolve(t)
+    return broker
+
+
 def generate_incremental(components=None, broker=None):
     components = components or COMPONENTS[GROUPS.single]
     components = _determine_components(components)
@@ -1017,6 +1541,121 @@ def run_incremental(components=None, broker=None):
         yield run(graph, broker=_broker)
 
 
+def run_parallel(components=None, broker=None, pool=None, max_workers=None):
+    """
+    Executes components concurrently while still satisfying their dependency
+    relationships. A component is submitted to the pool as soon as everything
+    it depends on in the graph has been tried, so independent datasources,
+    parsers, and rules don't wait on each other.
+
+    Results, exceptions, missing requirements, and execution times are
+    recorded in the broker just like :func:`run`, and observers are fired from
+    the calling thread. A component's observers always fire after those of its
+    dependencies, but components without a dependency relationship may
+    complete in any order.
+
+    Worker threads can't be interrupted, so a component that exceeds its
+    budget from :func:`set_timeout` is abandoned instead: a
+    :class:`TimeoutSkip` is recorded, its dependents proceed, and its result
+    is discarded whenever its thread finishes.
+
+    Keyword Args:
+        components: Can be one of an :class:`ExecutionPlan`, a dependency
+            graph, a single component, a component group, or a component type.
+            If it's anything other than a plan, the appropriate plan is
+            compiled or fetched from the plan cache before evaluation.
+        broker (Broker): Optionally pass a broker to use for evaluation. One is
+            created by default, but it's often useful to seed a broker with an
+            initial dependency.
+        pool (Executor): a ``concurrent.futures`` executor to run components.
+            Components share the broker, so it must be a thread based executor.
+            If not provided, a ``ThreadPoolExecutor`` is created for the run.
+        max_workers (int): the number of threads in the pool created when one
+            isn't passed. Defaults to the ``ThreadPoolExecutor`` default.
+    Returns:
+        Broker: The broker after evaluation.
+    """
+    plan = get_plan(components)
+    broker = broker or Broker()
+
+    if pool is None:
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            log.debug("concurrent.futures isn't available. Running serially.")
+            return run(plan, broker=broker)
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            return run_parallel(plan, broker=broker, pool=pool)
+        finally:
+            # don't wait on components abandoned for exceeding their budgets
+            pool.shutdown(wait=False)
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    order = plan.order
+    waiting = [len(d) for d in plan.dependencies]
+
+    def finish(i, exec_time):
+        broker.exec_times[order[i]] = exec_time
+        broker.fire_observers(order[i])
+        for d in plan.dependents[i]:
+            waiting[d] -= 1
+            if not waiting[d]:
+                heapq.heappush(ready, d)
+
+    # worker threads can't be interrupted, so budgets are enforced here by
+    # abandoning components that run too long. Their results are discarded.
+    budgets = {}
+    started = {}
+
+    def work(i, component, delegate):
+        started[i] = time.time()
+        return _process(component, broker, delegate)
+
+    def next_deadline():
+        now = time.time()
+        return min(started.get(i, now) + budgets[i] - now for i in budgets)
+
+    # ready holds indexes into the plan's order so dispatch order matches
+    # serial order. It's already sorted, so it's a valid heap.
+    ready = [i for i, w in enumerate(waiting) if not w]
+    running = {}
+    while ready or running:
+        while ready:
+            i = heapq.heappop(ready)
+            component, delegate = order[i], plan.delegates[i]
+            start = time.time()
+            if delegate is not None and component not in broker:
+                running[pool.submit(work, i, component, delegate)] = i
+                budget = get_timeout(component)
+                if budget:
+                    budgets[i] = budget
+            else:
+                finish(i, time.time() - start)
+
+        if running:
+            timeout = max(next_deadline(), 0) if budgets else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                budgets.pop(i, None)
+                result, ex, tb, exec_time = future.result()
+                _record(order[i], broker, result, ex, tb)
+                finish(i, exec_time)
+
+            now = time.time()
+            for future, i in list(running.items()):
+                if i in budgets and now - started.get(i, now) >= budgets[i]:
+                    future.cancel()
+                    del running[future]
+                    ex = TimeoutSkip(order[i], budgets.pop(i))
+                    _record(order[i], broker, None, ex, str(ex))
+                    finish(i, now - started[i])
+
+    return broker
+
+
 def run_all(components=None, broker=None, pool=None):
     if pool:
         futures = []
@@ -22,7 +22,13 @@ def get_simple_module_name(obj):
 
 
 class Evaluator(Formatter):
-    def __init__(self, broker=None, stream=sys.stdout, incremental=False):
+    lazy_targets = [combiner_hostname]
+    """
+    Components the evaluator reads in its observer that are evaluated along
+    with rules in lazy mode.
+    """
+
+    def __init__(self, broker=None, stream=sys.stdout, incremental=False, lazy=False):
         super(Evaluator, self).__init__(broker or dr.Broker(), stream)
         self.results = defaultdict(list)
         self.rule_skips = []
@@ -30,6 +36,7 @@ class Evaluator(Formatter):
         self.metadata = {}
         self.metadata_keys = {}
         self.incremental = incremental
+        self.lazy = lazy
         self.context_cls = None
 
     def observer(self, comp, broker):
@@ -57,6 +64,12 @@ class Evaluator(Formatter):
         for _ in dr.run_incremental(graph or dr.COMPONENTS[dr.GROUPS.single], broker=self.broker):
             pass
 
+    def run_lazy(self, graph=None):
+        graph = graph or dr.COMPONENTS[dr.GROUPS.single]
+        targets = [c for c in graph if plugins.is_rule(c)]
+        targets.extend(c for c in self.lazy_targets if c in graph)
+        dr.run_lazy(targets, broker=self.broker)
+
     def format_response(self, response):
         """
         To be overridden by subclasses to format the response sent back to the
@@ -72,7 +85,9 @@ class Evaluator(Formatter):
 
     def process(self, graph=None):
         with self:
-            if self.incremental:
+            if self.lazy:
+                self.run_lazy(graph)
+            elif self.incremental:
                 self.run_incremental(graph)
             else:
                 self.run_serial(graph)
@@ -141,8 +156,12 @@ class SingleEvaluator(Evaluator):
 
 
 class InsightsEvaluator(SingleEvaluator):
-    def __init__(self, broker=None, system_id=None, stream=sys.stdout, incremental=False):
-        super(InsightsEvaluator, self).__init__(broker, stream=stream, incremental=incremental)
+    lazy_targets = SingleEvaluator.lazy_targets + [
+        Specs.machine_id, Specs.redhat_release, Specs.metadata_json, BranchInfo
+    ]
+
+    def __init__(self, broker=None, system_id=None, stream=sys.stdout, incremental=False, lazy=False):
+        super(InsightsEvaluator, self).__init__(broker, stream=stream, incremental=incremental, lazy=lazy)
         self.system_id = system_id
         self.branch_info = {}
         self.product = "rhel"
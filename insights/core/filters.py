@@ -35,9 +35,22 @@ for those classes.
 Filtering can be disabled globally by setting the environment variable
 ``INSIGHTS_FILTERS_ENABLED=False``. This means that no datasources will be
 filtered even if filters are defined for them.
+
+Once every filter has been added, :func:`compile_index` computes the filters
+of each datasource a single time and freezes them into an index that
+:func:`get_filters` and :func:`get_matcher` answer from directly. The index
+can be written with :func:`dump_index` at build time and read back with
+:func:`load_index` instead of walking the dependency graph again. The index
+records a digest of the filters it was compiled from, and it's only loaded
+if the filters loaded now are the same. Datasources it doesn't know about are
+resolved from the filters as usual. Adding a filter discards the index.
 """
+import hashlib
+import json
+import logging
 import os
 import pkgutil
+import re
 import six
 import yaml as ser
 from collections import defaultdict
@@ -46,7 +59,13 @@ import insights
 from insights.core import dr, plugins
 from insights.util import parse_bool
 
+log = logging.getLogger(__name__)
+
 _CACHE = {}
+_EMPTY = frozenset()
+_INDEX = None
+_INDEX_SOURCE = None
+_MATCHERS = {}
 FILTERS = defaultdict(set)
 ENABLED = parse_bool(os.environ.get("INSIGHTS_FILTERS_ENABLED"), default=True)
 
@@ -67,9 +86,6 @@ def add_filter(component, patterns):
             add to the datasource's filters.
     """
     def inner(component, patterns):
-        if component in _CACHE:
-            del _CACHE[component]
-
         types = six.string_types + (list, set)
         if not isinstance(patterns, types):
             raise TypeError("Filter patterns must be of type string, list, or set.")
@@ -85,8 +101,12 @@ def add_filter(component, patterns):
 
         FILTERS[component] |= patterns
 
+    # filters of a datasource are part of those of the datasources that
+    # depend on it, so any cached set could be stale now
+    _invalidate()
+
     if not plugins.is_datasource(component):
-        for dep in dr.run_order(dr.get_dependency_graph(component)):
+        for dep in dr.get_dependency_graph(component):
             if plugins.is_datasource(dep):
                 d = dr.get_delegate(dep)
                 if d.filterable:
@@ -106,6 +126,13 @@ def add_filter(component, patterns):
 _add_filter = add_filter
 
 
+def _invalidate():
+    global _INDEX
+    _CACHE.clear()
+    _MATCHERS.clear()
+    _INDEX = None
+
+
 def get_filters(component):
     """
     Get the set of filters for the given datasource.
@@ -141,21 +168,91 @@ def get_filters(component):
             filters |= inner(d, filters)
         return filters
 
+    if _INDEX is not None and component in _INDEX:
+        return _INDEX[component] if ENABLED else _EMPTY
+
     if component not in _CACHE:
         _CACHE[component] = inner(component)
     return _CACHE[component]
 
 
+def get_matcher(component):
+    """
+    Returns a compiled regular expression whose ``search`` method finds any
+    of the filters of the datasource in a line, or ``None`` if it has no
+    filters.
+    """
+    if component not in _MATCHERS:
+        filters = get_filters(component)
+        _MATCHERS[component] = re.compile("|".join(re.escape(f) for f in sorted(filters))) if filters else None
+    return _MATCHERS[component]
+
+
+def _source_digest():
+    # digest of the filters an index is compiled from
+    d = dict((k if isinstance(k, six.string_types) else dr.get_name(k), sorted(v))
+             for k, v in FILTERS.items() if v)
+    return hashlib.sha1(json.dumps(d, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compile_index():
+    """
+    Computes the filters of every filterable datasource with
+    :func:`get_filters` and freezes them into the index it answers from until
+    a filter is added.
+    """
+    global _INDEX, _INDEX_SOURCE
+    index = {}
+    for component in list(dr.DELEGATES):
+        if plugins.is_datasource(component):
+            filters = get_filters(component)
+            if filters or getattr(dr.get_delegate(component), "filterable", False):
+                index[component] = frozenset(filters)
+    _MATCHERS.clear()
+    _INDEX = index
+    _INDEX_SOURCE = _source_digest()
+
+
+def dumps_index():
+    """
+    Returns a string representation of the index, compiling it first if
+    necessary.
+    """
+    if _INDEX is None:
+        compile_index()
+    index = dict((dr.get_name(k), sorted(v)) for k, v in _INDEX.items())
+    return json.dumps({"source": _INDEX_SOURCE, "filters": index}, sort_keys=True)
+
+
+def loads_index(string):
+    """
+    Replaces the index with the one in the given string if it was compiled
+    from the filters that are loaded now. Returns ``True`` if it was.
+    """
+    global _INDEX, _INDEX_SOURCE
+    d = json.loads(string)
+    if not isinstance(d, dict) or d.get("source") != _source_digest():
+        log.debug("Ignoring a filter index compiled from other filters.")
+        return False
+    index = dict(((dr.get_component(k) or k), frozenset(v)) for k, v in d["filters"].items())
+    _CACHE.clear()
+    _MATCHERS.clear()
+    _INDEX = index
+    _INDEX_SOURCE = d["source"]
+    return True
+
+
 def apply_filters(target, lines):
     """
     Applys filters to the lines of a datasource. This function is used only in
     integration tests. Filters are applied in an equivalent but more performant
     way at run time.
     """
-    filters = get_filters(target)
-    if filters:
+    matcher = get_matcher(target)
+    if matcher is not None:
+        search = matcher.search
         for l in lines:
-            if any(f in l for f in filters):
+            if search(l):
                 yield l
     else:
         for l in lines:
@@ -163,6 +260,7 @@ def apply_filters(target, lines):
 
 
 _filename = ".".join(["filters", ser.__name__])
+_index_filename = "filters_index.json"
 _dumps = ser.dump
 _loads = ser.safe_load
 
@@ -207,3 +305,35 @@ def dump(stream=None):
         path = os.path.join(os.path.dirname(insights.__file__), _filename)
         with open(path, "w") as f:
             f.write(dumps())
+
+
+def dump_index(stream=None):
+    """
+    Dumps a string representation of the index to a stream, normally an open
+    file. If none is passed, it's dumped to a default location within the
+    project, next to the component manifest.
+    """
+    if stream:
+        stream.write(dumps_index())
+    else:
+        path = os.path.join(os.path.dirname(insights.__file__), _index_filename)
+        with open(path, "w") as f:
+            f.write(dumps_index())
+
+
+def load_index(stream=None):
+    """
+    Loads the index from a stream, normally an open file. If one is not
+    passed, it's loaded from a default location within the project. Returns
+    ``True`` if an index was loaded. Load the filters first: an index compiled
+    from different ones isn't loaded.
+    """
+    if stream:
+        return loads_index(stream.read())
+    try:
+        data = pkgutil.get_data(insights.__name__, _index_filename)
+    except (IOError, OSError):
+        return False
+    if not data:
+        return False
+    return loads_index(data.decode("utf-8"))
@@ -0,0 +1,107 @@
+"""
+Limits on what a collection takes from the host it runs on.
+
+A :class:`Governor` set with :func:`set_governor` runs commands at a lower
+CPU and I/O priority, caps how many of them run at once, and skips
+datasources that haven't run yet once the collection has gone on for too
+long. The ``governor`` section of the collection manifest configures one for
+:func:`insights.collect.collect`.
+
+.. code-block:: python
+
+    governor = Governor(nice=10, ionice=3, max_commands=2, deadline=600,
+                        essential=["insights.specs.Specs.hostname"])
+    set_governor(governor)
+    try:
+        dr.run(broker=broker)
+    finally:
+        set_governor(None)
+    governor.stats()
+"""
+import logging
+import threading
+import time
+
+from insights.core import dr
+from insights.util.subproc import CommandLimits, set_command_limits
+
+log = logging.getLogger(__name__)
+
+
+class Governor(object):
+    """
+    Args:
+        nice (int): adjustment ``nice`` runs commands with. Higher values
+            give commands a smaller share of the CPU.
+        ionice (int): ``ionice`` scheduling class of commands: 1 for
+            realtime, 2 for best-effort and 3 for idle.
+        max_commands (int): the most commands that run at once.
+        deadline (int): seconds after which datasources that haven't run are
+            skipped, counted from when the governor is created.
+        essential (list): names matched against the start of the fully
+            qualified name of a datasource, or of a spec it implements, to
+            collect even after the deadline.
+    """
+    def __init__(self, nice=None, ionice=None, max_commands=None, deadline=None, essential=None):
+        self.limits = CommandLimits(nice=nice, ionice=ionice, max_commands=max_commands)
+        self.deadline = deadline
+        self.essential = essential or []
+        self.expires = time.time() + deadline if deadline else None
+        self.skipped = set()
+        self._lock = threading.Lock()
+
+    def _names(self, ds):
+        from insights.core.spec_factory import RegistryPoint
+
+        yield dr.get_name(ds)
+        for c in dr.get_dependents(ds):
+            if isinstance(c, RegistryPoint):
+                yield dr.get_name(c)
+
+    def _essential(self, ds):
+        return any(n.startswith(e) for n in self._names(ds) for e in self.essential)
+
+    def check(self, ds):
+        """
+        Raises :class:`insights.core.dr.SkipComponent` if the deadline has
+        passed and the datasource ``ds`` isn't essential.
+        """
+        from insights.core.spec_factory import RegistryPoint
+
+        # a spec only passes on the value of the datasource implementing it
+        if self.expires is None or time.time() < self.expires or isinstance(ds, RegistryPoint):
+            return
+        if self._essential(ds):
+            return
+        name = dr.get_name(ds)
+        with self._lock:
+            self.skipped.add(name)
+        log.debug("Skipping %s: the collection deadline has passed", name)
+        raise dr.SkipComponent()
+
+    def stats(self):
+        """
+        Returns a dictionary of the deadline and the sorted names of the
+        datasources skipped because of it.
+        """
+        with self._lock:
+            skipped = sorted(self.skipped)
+        return {"deadline": self.deadline, "skipped": skipped}
+
+
+_GOVERNOR = None
+
+
+def set_governor(governor):
+    """
+    Sets the :class:`Governor` datasources and commands run under, or
+    removes it if ``governor`` is ``None``.
+    """
+    global _GOVERNOR
+    _GOVERNOR = governor
+    set_command_limits(governor.limits if governor is not None else None)
+
+
+def get_governor():
+    """ Returns the :class:`Governor` datasources run under, if any. """
+    return _GOVERNOR
@@ -7,6 +7,7 @@ from insights.core.context import (ClusterArchiveContext,
                                    ExecutionContextMeta,
                                    HostArchiveContext,
                                    SerializedArchiveContext)
+from insights.util.paths import PathIndex
 
 log = logging.getLogger(__name__)
 
@@ -41,31 +42,54 @@ def identify(files):
     return common_path, HostArchiveContext
 
 
-def create_context(path, context=None):
-    top = os.listdir(path)
-    arc = [os.path.join(path, f) for f in top
-           if f.endswith(archives.COMPRESSION_TYPES) and
-           os.path.isfile(os.path.join(path, f))]
+def create_context(path, context=None, index=None):
+    """
+    Returns the context for the archive extracted into ``path``. ``index``
+    is the :class:`insights.util.paths.ArchiveIndex` of an archive read in
+    place, whose files are listed from its members instead of ``path``.
+    """
+    if index is not None:
+        top = [n for n, is_dir in index.listdir(path) if not is_dir]
+    else:
+        top = [f for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))]
+    arc = [os.path.join(path, f) for f in top if f.endswith(archives.COMPRESSION_TYPES)]
     if arc:
+        if index is not None:
+            # the archives inside are extracted on their own
+            for f in arc:
+                index.materialize(f)
         return ClusterArchiveContext(path, all_files=arc)
 
-    all_files = list(get_all_files(path))
+    # spec lookups are answered from the listings made while finding the files
+    index = index or PathIndex(path)
+    all_files = index.files
     if not all_files:
         raise archives.InvalidArchive("No files in archive")
 
     common_path, ctx = identify(all_files)
     context = context or ctx
-    return context(common_path, all_files=all_files)
+    ctx = context(common_path, all_files=all_files)
+    ctx.path_resolver = index
+    return ctx
 
 
-def initialize_broker(path, context=None, broker=None):
-    ctx = create_context(path, context=context)
+def initialize_broker(path, context=None, broker=None, index=None, components=None):
+    """
+    Returns the context of the archive extracted into ``path`` and a broker
+    holding it. Components saved in a serialized archive are added to the
+    broker too, only those in ``components`` if it's given, and each is
+    deserialized the first time the broker is asked for it.
+    """
+    ctx = create_context(path, context=context, index=index)
     broker = broker or dr.Broker()
     if isinstance(ctx, ClusterArchiveContext):
         return ctx, broker
 
     broker[ctx.__class__] = ctx
     if isinstance(ctx, SerializedArchiveContext):
+        # serialized datasources are read by path, without the context
+        for f in ctx.all_files:
+            ctx.path_resolver.materialize(f)
         h = Hydration(ctx.root)
-        broker = h.hydrate(broker=broker)
+        broker = h.hydrate(broker=broker, components=components, lazy=True)
     return ctx, broker
@@ -0,0 +1,239 @@
+"""
+The component manifest records the module, type, group, tags and
+dependencies of every loaded component by name, so tools can select
+components and work out what they depend on without importing the modules
+that define them. Only the modules of components that are actually needed get
+imported, with :func:`load_components`.
+
+The manifest is generated at build time with ``insights-manifest``, which
+loads the given packages and calls :func:`dump` to write it to a default
+location within the project. :func:`load` reads it back unless a package it
+describes has changed since, judged by a fingerprint of the size and
+modification time of each of its modules. Callers then import everything as
+they would without a manifest.
+
+.. code-block:: python
+
+    from insights.core import manifest
+
+    if manifest.load():
+        names = manifest.select(["insights.plugins"], lambda e: "security" in e["tags"])
+        rules = manifest.load_components(names)
+"""
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import sys
+
+import insights
+from insights.core import dr
+
+MANIFEST = {}
+"""Component name -> entry with keys "module", "type", "group", "tags" and "dependencies"."""
+
+PACKAGES = set()
+"""Packages whose components the manifest describes."""
+
+FINGERPRINTS = {}
+"""Package -> its :func:`fingerprint` when the manifest was built."""
+
+log = logging.getLogger(__name__)
+
+_filename = "components.json"
+_fingerprints = {}
+
+
+def _module_files(package):
+    module = sys.modules.get(package)
+    path = getattr(module, "__file__", None) or pkgutil.get_loader(package).get_filename(package)
+    if not os.path.basename(path).startswith("__init__."):
+        return os.path.dirname(path), [path]
+    root = os.path.dirname(path)
+    files = []
+    for d, dirs, names in os.walk(root):
+        dirs[:] = [n for n in dirs if n != "__pycache__"]
+        files.extend(os.path.join(d, n) for n in names if n.endswith(".py"))
+    return root, files
+
+
+def fingerprint(package):
+    """
+    Returns a digest of the size and modification time of every module of
+    ``package``, or ``None`` if it can't be found. It's computed once per
+    process.
+    """
+    if package not in _fingerprints:
+        try:
+            root, files = _module_files(package)
+            h = hashlib.sha1()
+            for f in sorted(files):
+                st = os.stat(f)
+                h.update(("%s %d %d\n" % (os.path.relpath(f, root), st.st_size, int(st.st_mtime))).encode("utf-8"))
+            _fingerprints[package] = h.hexdigest()
+        except Exception as ex:
+            log.debug("Can't fingerprint %s: %s", package, ex)
+            _fingerprints[package] = None
+    return _fingerprints[package]
+
+
+def current():
+    """
+    Returns ``True`` if none of the packages the manifest describes have
+    changed since it was built.
+    """
+    return all(FINGERPRINTS.get(p) is not None and FINGERPRINTS[p] == fingerprint(p) for p in PACKAGES)
+
+
+def entry(component):
+    """ Returns the manifest entry for a loaded component. """
+    delegate = dr.get_delegate(component)
+    return {
+        "module": component.__module__,
+        "type": dr.get_name(delegate.type),
+        "group": delegate.group,
+        "tags": sorted(dr.get_tags(component)),
+        "dependencies": sorted(dr.get_name(d) for d in delegate.get_dependencies()),
+    }
+
+
+def build(packages=()):
+    """
+    Replaces the manifest with entries for every component in
+    :data:`insights.core.dr.DELEGATES`. ``packages`` are recorded as the
+    packages the manifest covers.
+    """
+    MANIFEST.clear()
+    PACKAGES.clear()
+    PACKAGES.update(packages)
+    FINGERPRINTS.clear()
+    FINGERPRINTS.update((p, fingerprint(p)) for p in PACKAGES)
+    for component in dr.DELEGATES:
+        MANIFEST[dr.get_name(component)] = entry(component)
+
+
+def covers(package):
+    """ Returns ``True`` if the manifest was built with ``package`` loaded. """
+    return any(package == p or package.startswith(p + ".") for p in PACKAGES)
+
+
+def select(prefixes, predicate=None):
+    """
+    Returns the sorted names of components whose modules start with one of
+    ``prefixes`` and whose entries pass ``predicate``, if it's given.
+    """
+    prefixes = tuple(prefixes)
+    return sorted(name for name, e in MANIFEST.items()
+                  if e["module"].startswith(prefixes) and (predicate is None or predicate(e)))
+
+
+def get_dependency_graph(name):
+    """
+    Like :func:`insights.core.dr.get_dependency_graph` but with names, and
+    computed from the manifest without importing anything.
+    """
+    graph = {}
+    stack = [name]
+    while stack:
+        n = stack.pop()
+        if n in graph:
+            continue
+        deps = MANIFEST[n]["dependencies"] if n in MANIFEST else []
+        graph[n] = set(deps)
+        stack.extend(deps)
+    return graph
+
+
+def get_modules(names):
+    """
+    Returns the sorted modules that must be imported for the named components
+    and everything they depend on to be loaded.
+    """
+    modules = set()
+    for name in names:
+        for n in get_dependency_graph(name):
+            if n in MANIFEST:
+                modules.add(MANIFEST[n]["module"])
+    return sorted(modules)
+
+
+def load_components(names):
+    """
+    Imports only the modules needed by the named components and their
+    dependencies, and returns the components.
+    """
+    for module in get_modules(names):
+        importlib.import_module(module)
+    return [dr.get_component(n) for n in names]
+
+
+def load_component(name, packages=()):
+    """
+    Returns the named component after importing only the modules it and its
+    dependencies need, if the manifest describes it and covers every package
+    in ``packages``. Returns ``None`` without importing anything otherwise.
+    """
+    if name in MANIFEST and all(covers(p) for p in packages):
+        return load_components([name])[0]
+
+
+def dumps():
+    """ Returns a string representation of the manifest. """
+    doc = {"packages": sorted(PACKAGES), "fingerprints": FINGERPRINTS, "components": MANIFEST}
+    return json.dumps(doc, sort_keys=True)
+
+
+def dump(stream=None):
+    """
+    Dumps a string representation of the manifest to a stream, normally an
+    open file. If none is passed, it's dumped to a default location within the
+    project.
+    """
+    if stream:
+        stream.write(dumps())
+    else:
+        path = os.path.join(os.path.dirname(insights.__file__), _filename)
+        with open(path, "w") as f:
+            f.write(dumps())
+
+
+def _clear():
+    MANIFEST.clear()
+    PACKAGES.clear()
+    FINGERPRINTS.clear()
+
+
+def loads(string):
+    """
+    Loads the manifest from a string. Returns ``True`` if it was loaded, or
+    ``False`` if a package it describes has changed since it was built.
+    """
+    doc = json.loads(string)
+    _clear()
+    MANIFEST.update(doc["components"])
+    PACKAGES.update(doc["packages"])
+    FINGERPRINTS.update(doc.get("fingerprints", {}))
+    if not current():
+        log.debug("Ignoring the component manifest: the packages it describes have changed.")
+        _clear()
+        return False
+    return True
+
+
+def load(stream=None):
+    """
+    Loads the manifest from a stream, normally an open file. If one is not
+    passed, it's loaded from a default location within the project. Returns
+    ``True`` if a manifest was loaded.
+    """
+    if stream:
+        return loads(stream.read())
+    try:
+        data = pkgutil.get_data(insights.__name__, _filename)
+    except (IOError, OSError):
+        return False
+    if not data:
+        return False
+    return loads(data.decode("utf-8"))
@@ -32,7 +32,9 @@ import traceback
 from pprint import pformat
 from six import StringIO
 
-from insights.core import dr
+from insights.core import dr, profiling
+from insights.core.governor import get_governor
+from insights.core.serde import deserializer, serializer
 from insights.util.subproc import CalledProcessError
 from insights import settings
 
@@ -86,6 +88,9 @@ class datasource(PluginType):
     filterable = False
 
     def invoke(self, broker):
+        governor = get_governor()
+        if governor is not None:
+            governor.check(self.component)
         try:
             return self.component(broker)
         except ContentException as ce:
@@ -141,9 +146,10 @@ class parser(PluginType):
             raise dr.SkipComponent()
 
         results = []
-        for d in dep_value:
+        for i, d in enumerate(dep_value):
             try:
-                r = self.component(d)
+                with profiling.element_span(broker, self.component, i, d):
+                    r = self.component(d)
                 if r is not None:
                     results.append(r)
             except dr.SkipComponent:
@@ -674,3 +680,21 @@ class make_none(Response):
 
     def __init__(self):
         super(make_none, self).__init__(key="NONE_KEY")
+
+
+def _serialize_response(obj, root=None):
+    return dict(obj)
+
+
+def _deserialize_response(_type, data, root=None):
+    # the response was validated when it was made
+    obj = _type.__new__(_type)
+    dict.update(obj, data)
+    return obj
+
+
+# _make_skip isn't included: the components it's missing aren't serializable
+for _type in (make_response, make_fail, make_pass, make_info, make_fingerprint,
+              make_metadata_key, make_metadata, make_none):
+    serializer(_type)(_serialize_response)
+    deserializer(_type)(_deserialize_response)
@@ -0,0 +1,265 @@
+"""
+Opt-in instrumentation for component evaluation.
+
+Attach a :class:`Profiler` to a :class:`insights.core.dr.Broker` and every
+component the broker evaluates is recorded as a span with its monotonic
+start and end times, the CPU time it used, the growth of the process's peak
+resident set size, and optionally the bytes it allocated. Parsers over
+multi-output datasources get a nested span for each element of the list.
+
+.. code-block:: python
+
+    broker = dr.Broker()
+    broker.profiler = Profiler(trace_memory=True)
+    dr.run(broker=broker)
+    broker.profiler.dump_chrome_trace("trace.json")
+    broker.profiler.dump_collapsed("trace.json.folded")
+
+The Chrome trace loads in ``chrome://tracing`` or https://ui.perfetto.dev, and
+the collapsed stacks feed flamegraph.pl or speedscope.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from insights.core import dr
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+_clock = getattr(time, "perf_counter", time.time)
+_cpu_clock = getattr(time, "thread_time", None) or getattr(time, "process_time", time.time)
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS.
+_RSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss():
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_SCALE
+
+
+def _element_name(index, element):
+    path = getattr(element, "relative_path", None) or getattr(element, "path", None)
+    return "%s[%d]" % (path, index) if path else "[%d]" % index
+
+
+class Span(object):
+    """
+    The measurements for one component, or one element of a multi-output
+    parser.
+
+    Attributes:
+        component: the component that was evaluated.
+        element (str): the element of the datasource list or ``None``.
+        start (float): monotonic start time in seconds.
+        end (float): monotonic end time in seconds.
+        cpu (float): CPU seconds used by the evaluating thread.
+        rss (int): growth in the process's peak RSS in bytes.
+        alloc (int): net bytes allocated when memory tracing is on.
+        tid (int): the thread that evaluated the component.
+        parent (Span): the enclosing span or ``None``.
+    """
+    def __init__(self, component, element=None, parent=None):
+        self.component = component
+        self.element = element
+        self.parent = parent
+        self.tid = threading.current_thread().ident
+        self.start = self.end = 0.0
+        self.cpu = 0.0
+        self.rss = 0
+        self.alloc = 0
+        self.children = 0.0
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        return max(self.duration - self.children, 0.0)
+
+    @property
+    def category(self):
+        delegate = dr.get_delegate(self.component)
+        return delegate.type.__name__ if delegate is not None else "component"
+
+    @property
+    def name(self):
+        name = dr.get_name(self.component)
+        return name if self.element is None else "%s %s" % (name, self.element)
+
+    @property
+    def stack(self):
+        frames = [self.category, dr.get_name(self.component)]
+        if self.element is not None:
+            frames.append(self.element)
+        return frames
+
+
+class _SpanContext(object):
+    def __init__(self, profiler, component, element):
+        self.profiler = profiler
+        self.component = component
+        self.element = element
+
+    def __enter__(self):
+        p = self.profiler
+        parent = p._current()
+        self.span = Span(self.component, self.element, parent)
+        p._push(self.span)
+        self.rss = _peak_rss()
+        self.alloc = p._traced()
+        self.cpu = _cpu_clock()
+        self.span.start = _clock()
+        return self.span
+
+    def __exit__(self, *exc):
+        span = self.span
+        span.end = _clock()
+        span.cpu = _cpu_clock() - self.cpu
+        span.alloc = self.profiler._traced() - self.alloc
+        span.rss = _peak_rss() - self.rss
+        self.profiler._pop(span)
+        return False
+
+
+class _NullContext(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullContext()
+
+
+class Profiler(object):
+    """
+    Collects :class:`Span` objects for components evaluated by a broker. It's
+    safe to share one profiler between the threads of
+    :func:`insights.core.dr.run_parallel`.
+
+    Args:
+        trace_memory (bool): record allocated bytes with :mod:`tracemalloc`.
+            This slows evaluation down noticeably, so it's off by default.
+    """
+    def __init__(self, trace_memory=False):
+        self.spans = []
+        self.origin = _clock()
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def span(self, component, element=None):
+        """
+        Returns a context manager that records a :class:`Span` for the
+        component, or for an element of its input if ``element`` is given.
+        """
+        return _SpanContext(self, component, element)
+
+    def stop(self):
+        """ Stops memory tracing if this profiler started it. """
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _traced(self):
+        return tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _current(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def _push(self, span):
+        self._stack().append(span)
+
+    def _pop(self, span):
+        self._stack().pop()
+        if span.parent is not None:
+            span.parent.children += span.duration
+        with self._lock:
+            self.spans.append(span)
+
+    def chrome_trace(self):
+        """
+        Returns the spans as a dict in the Chrome trace event format. Times
+        are in microseconds relative to the creation of the profiler.
+        """
+        pid = os.getpid()
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            events.append({
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": round((s.start - self.origin) * 1e6, 3),
+                "dur": round(s.duration * 1e6, 3),
+                "pid": pid,
+                "tid": s.tid,
+                "args": {
+                    "cpu_us": round(s.cpu * 1e6, 3),
+                    "rss_delta_bytes": s.rss,
+                    "alloc_bytes": s.alloc,
+                },
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def collapsed(self):
+        """
+        Returns flamegraph "collapsed stack" lines of the form
+        ``type;component[;element] self_microseconds``, with identical stacks
+        summed.
+        """
+        totals = {}
+        for s in self.spans:
+            key = ";".join(f.replace(";", ":").replace(" ", "_") for f in s.stack)
+            totals[key] = totals.get(key, 0) + s.self_time
+        return ["%s %d" % (k, round(v * 1e6)) for k, v in sorted(totals.items())]
+
+    def dump_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def dump_collapsed(self, path):
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+
+    def dump(self, path):
+        """
+        Writes the Chrome trace to ``path`` and the collapsed stacks to
+        ``path + ".folded"``.
+        """
+        self.dump_chrome_trace(path)
+        self.dump_collapsed(path + ".folded")
+
+
+def element_span(broker, component, index, element):
+    """
+    Returns a span context for element ``index`` of the list a parser is
+    processing if ``broker`` has a profiler attached and a no-op context
+    otherwise.
+    """
+    profiler = getattr(broker, "profiler", None)
+    if profiler is None:
+        return _NULL
+    return profiler.span(component, _element_name(index, element))
@@ -5,12 +5,24 @@ serializer and deserializer functions for types. It also provides a
 load objects from the file system. The Hydration class includes a
 :py:func`Hydration.make_persister` method that returns a function appropriate
 to register as an observer on a :py:class:`Broker`.
+
+By default each component is saved to its own json file in ``meta_data``. A
+Hydration created with ``pack=True`` saves them all to a single
+``meta_data.pack`` file instead: a header, a record per component with its
+name and optionally compressed json document, a table of contents mapping
+names to record offsets, and a trailer locating the table. Hydrating from a
+pack reads just the records of the components asked for. A pack whose table
+of contents was never written, because collection was interrupted, is read
+by scanning its records.
 """
 import json as ser
 import logging
 import os
+import struct
+import threading
 import time
 import traceback
+import zlib
 from glob import glob
 from functools import partial
 
@@ -115,6 +127,122 @@ def marshal(v, root=None, pool=None):
     return call_serializer(f, v)
 
 
+PACK_NAME = "meta_data.pack"
+_PACK_MAGIC = b"INSIGHTS-PACK\x00\x01"
+# name length, flags and data length of a record
+_RECORD = struct.Struct(">HBI")
+# offset and length of the table of contents
+_TRAILER = struct.Struct(">QI")
+_COMPRESSED = 1
+
+
+class PackWriter(object):
+    """
+    Writes component documents to a pack file as they're added. Adding is
+    thread safe. The table of contents is written by :meth:`close`.
+    """
+    def __init__(self, path, compress=True):
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._toc = {}
+        self._f = open(path, "wb")
+        self._f.write(_PACK_MAGIC)
+
+    def add(self, name, data):
+        """ Appends ``data``, the serialized document of ``name``. """
+        flags = 0
+        if self.compress:
+            data = zlib.compress(data)
+            flags |= _COMPRESSED
+        encoded = name.encode("utf-8")
+        record = _RECORD.pack(len(encoded), flags, len(data)) + encoded + data
+        with self._lock:
+            self._toc[name] = self._f.tell()
+            self._f.write(record)
+
+    def close(self):
+        with self._lock:
+            if self._f.closed:
+                return
+            toc = ser.dumps(self._toc).encode("utf-8")
+            offset = self._f.tell()
+            self._f.write(toc + _TRAILER.pack(offset, len(toc)) + _PACK_MAGIC)
+            self._f.close()
+
+
+class PackReader(object):
+    """
+    Reads component documents from a pack file by name.
+
+    Attributes:
+        toc (dict): record offsets by component name.
+
+    Raises:
+        ValueError: if ``path`` isn't a pack.
+    """
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._f = open(path, "rb")
+        if self._f.read(len(_PACK_MAGIC)) != _PACK_MAGIC:
+            self._f.close()
+            raise ValueError("%s isn't a component pack" % path)
+        self.toc = self._read_toc()
+        if self.toc is None:
+            log.warning("%s has no table of contents. Scanning it.", path)
+            self.toc = self._scan()
+
+    def _read_toc(self):
+        end = _TRAILER.size + len(_PACK_MAGIC)
+        try:
+            self._f.seek(-end, os.SEEK_END)
+            trailer = self._f.read(end)
+            if trailer[_TRAILER.size:] != _PACK_MAGIC:
+                return None
+            offset, length = _TRAILER.unpack(trailer[:_TRAILER.size])
+            self._f.seek(offset)
+            return ser.loads(self._f.read(length).decode("utf-8"))
+        except (IOError, OSError, ValueError, struct.error):
+            return None
+
+    def _scan(self):
+        # record offsets up to the first incomplete record
+        toc = {}
+        offset = len(_PACK_MAGIC)
+        self._f.seek(0, os.SEEK_END)
+        size = self._f.tell()
+        while offset + _RECORD.size <= size:
+            self._f.seek(offset)
+            name_len, _, data_len = _RECORD.unpack(self._f.read(_RECORD.size))
+            end = offset + _RECORD.size + name_len + data_len
+            if end > size:
+                break
+            toc[self._f.read(name_len).decode("utf-8")] = offset
+            offset = end
+        return toc
+
+    def read(self, name):
+        """ Returns the document of ``name`` as a dictionary. """
+        with self._lock:
+            self._f.seek(self.toc[name])
+            name_len, flags, data_len = _RECORD.unpack(self._f.read(_RECORD.size))
+            self._f.seek(name_len, os.SEEK_CUR)
+            data = self._f.read(data_len)
+        if flags & _COMPRESSED:
+            data = zlib.decompress(data)
+        return ser.loads(data.decode("utf-8"))
+
+    def close(self):
+        self._f.close()
+
+
+class SavedError(Exception):
+    """
+    Stands in for an error saved with a component by :class:`Hydration`. Its
+    traceback in the broker the component is loaded into is the saved one.
+    """
+    pass
+
+
 def unmarshal(data, root=None):
     if data is None:
         return
@@ -129,14 +257,37 @@ class Hydration(object):
     components. It puts metadata about a component's evaluation in a metadata
     file for the component and allows the serializer for a component to put raw
     data beneath a working directory.
+
+    Args:
+        pack (bool): save components to a single ``meta_data.pack`` file
+            instead of a file each. Call :meth:`close` once everything is
+            saved to finish it.
+        compress (bool): compress the components saved to a pack.
+        writers (int): save components in this many background threads
+            instead of in the observer that :meth:`make_persister` returns.
+            The observer only records what a component's document needs from
+            the broker, so serializing, running commands for output that
+            wasn't read, and writing files overlap with evaluation. Call
+            :meth:`close` to wait for everything to be saved.
+        max_pending (int): most components waiting to be saved by the
+            writers before the observer blocks. Defaults to four per writer.
     """
-    def __init__(self, root=None, meta_data="meta_data", data="data", pool=None):
+    def __init__(self, root=None, meta_data="meta_data", data="data", pool=None, pack=False, compress=True,
+                 writers=0, max_pending=None):
         self.root = root
         self.meta_data = os.path.join(root, meta_data) if root else None
         self.data = os.path.join(root, data) if root else None
+        self.pack = os.path.join(root, PACK_NAME) if root and pack else None
+        self.compress = compress
         self.ser_name = dr.get_base_module_name(ser)
         self.created = False
         self.pool = pool
+        self._writer = None
+        self._lock = threading.Lock()
+        self.writers = writers
+        self.max_pending = max_pending or 4 * writers
+        self._executor = None
+        self._slots = None
 
     def _hydrate_one(self, doc):
         """ Returns (component, results, errors, duration) """
@@ -150,71 +301,205 @@ class Hydration(object):
         results = unmarshal(doc["results"], root=self.data)
         return (key, results, exec_time, ser_time)
 
-    def hydrate(self, broker=None):
+    def _load_json(self, path):
+        with open(path) as f:
+            return ser.load(f)
+
+    def _documents(self, names, keep_open=False):
+        # (name, function reading and parsing the document) of each saved
+        # component in names, or every one if names is None. With keep_open,
+        # a pack stays open for the functions to be called later, until
+        # they're all gone.
+        pack = os.path.join(self.root, PACK_NAME) if self.root else None
+        if pack and os.path.exists(pack):
+            reader = PackReader(pack)
+            try:
+                for name in list(reader.toc):
+                    if names is None or name in names:
+                        yield name, partial(reader.read, name)
+            finally:
+                if not keep_open:
+                    reader.close()
+            return
+
+        for path in glob(os.path.join(self.meta_data, "*")):
+            name = os.path.basename(path).rsplit(".", 1)[0]
+            if names is None or name in names:
+                yield name, partial(self._load_json, path)
+
+    def _record_errors(self, doc, broker):
+        # the errors saved with a component are recorded like those it raised
+        key = dr.get_component_by_name(doc["name"])
+        if key is None:
+            return
+        for tb in doc.get("errors") or []:
+            lines = tb.strip().splitlines()
+            broker.add_exception(key, SavedError(lines[-1] if lines else ""), tb)
+
+    def _load_pending(self, key, load, broker):
+        # reads and loads a component added to a broker with add_pending,
+        # recording the errors saved with it, and logging failures like
+        # hydrate does and recording them in the broker
+        from insights.core.spec_factory import ContentException
+
+        try:
+            doc = load()
+            self._record_errors(doc, broker)
+            if not doc["results"]:
+                return None
+            broker.exec_times[key] = doc["exec_time"] + doc["ser_time"]
+            return unmarshal(doc["results"], root=self.data) or None
+        except ContentException as ex:
+            log.debug(ex)
+        except Exception as ex:
+            log.warning(ex)
+            broker.add_exception(key, ex, traceback.format_exc())
+
+    def hydrate(self, broker=None, components=None, lazy=False):
         """
         Loads a Broker from a previously saved one. A Broker is created if one
-        isn't provided.
+        isn't provided. If ``components`` is given, only those of them that
+        were saved are loaded.
+
+        With ``lazy``, a component's document isn't read and its saved
+        results aren't deserialized until the broker is first asked for it.
+        Its execution time and errors are recorded in the broker then.
+
+        The errors saved with a component are recorded in the broker's
+        ``exceptions`` as :class:`SavedError` instances, with the saved text
+        as their tracebacks. So are errors loading a component.
         """
         from insights.core.spec_factory import ContentException
 
         broker = broker or dr.Broker()
-        for path in glob(os.path.join(self.meta_data, "*")):
+        names = set(dr.get_name(c) for c in components) if components is not None else None
+        for name, load in self._documents(names, keep_open=lazy):
             try:
-                with open(path) as f:
-                    doc = ser.load(f)
-                    res = self._hydrate_one(doc)
-                    comp, results, exec_time, ser_time = res
-                    if results:
-                        broker[comp] = results
-                        broker.exec_times[comp] = exec_time + ser_time
+                if lazy:
+                    key = dr.get_component_by_name(name)
+                    if key is None:
+                        raise ValueError("{} is not a loaded component.".format(name))
+                    broker.add_pending(key, partial(self._load_pending, key, load, broker))
+                    continue
+                doc = load()
+                self._record_errors(doc, broker)
+                res = self._hydrate_one(doc)
+                comp, results, exec_time, ser_time = res
+                if results:
+                    broker[comp] = results
+                    broker.exec_times[comp] = exec_time + ser_time
             except ContentException as ex:
                 log.debug(ex)
             except Exception as ex:
                 log.warning(ex)
+                comp = dr.get_component_by_name(name)
+                if comp is not None:
+                    broker.add_exception(comp, ex, traceback.format_exc())
         return broker
 
-    def dehydrate(self, comp, broker):
-        """
-        Saves a component in the given broker to the file system.
-        """
+    def _ensure_created(self):
         if not self.meta_data:
             raise Exception("Hydration meta_path not set. Can't dehydrate.")
 
-        if not self.created:
-            fs.ensure_path(self.meta_data, mode=0o770)
-            if self.data:
-                fs.ensure_path(self.data, mode=0o770)
-            self.created = True
-
-        c = comp
-        doc = None
+        with self._lock:
+            if not self.created:
+                if not self.pack:
+                    fs.ensure_path(self.meta_data, mode=0o770)
+                if self.data:
+                    fs.ensure_path(self.data, mode=0o770)
+                self.created = True
+
+    def _document(self, c, broker):
+        # the value of a component and the part of its document that comes
+        # from the broker
+        name = dr.get_name(c)
+        value = broker.get(c)
+        errors = [broker.tracebacks[e] for e in broker.exceptions.get(c, [])
+                  if broker.tracebacks.get(e)]
+        doc = {
+            "name": name,
+            "exec_time": broker.exec_times.get(c),
+            "errors": errors
+        }
+        return doc, value
+
+    def _save(self, doc, value, pool=None):
+        name = doc["name"]
+        errors = doc["errors"]
         try:
-            name = dr.get_name(c)
-            value = broker.get(c)
-            errors = [t for e in broker.exceptions.get(c, [])
-                        for t in broker.tracebacks[e]]
-            doc = {
-                "name": name,
-                "exec_time": broker.exec_times.get(c),
-                "errors": errors
-            }
             start = time.time()
-            results, ms_errors = marshal(value, root=self.data, pool=self.pool)
+            results, ms_errors = marshal(value, root=self.data, pool=pool)
             doc["results"] = results if results else None
             errors.extend(ms_errors if isinstance(ms_errors, list) else [ms_errors]) if ms_errors else None
             doc["ser_time"] = time.time() - start
         except Exception as ex:
             log.exception(ex)
-        else:
-            if doc is not None and (doc["results"] or doc["errors"]):
-                try:
-                    path = os.path.join(self.meta_data, name + "." + self.ser_name)
-                    with open(path, "w") as f:
-                        ser.dump(doc, f)
-                except Exception as boom:
-                    log.error("Could not serialize %s to %s: %r" % (name, self.ser_name, boom))
-                    if path:
-                        fs.remove(path)
+            return
+
+        if not (doc["results"] or doc["errors"]):
+            return
+        if self.pack:
+            self._dehydrate_packed(name, doc)
+            return
+        path = os.path.join(self.meta_data, name + "." + self.ser_name)
+        try:
+            with open(path, "w") as f:
+                ser.dump(doc, f)
+        except Exception as boom:
+            log.error("Could not serialize %s to %s: %r" % (name, self.ser_name, boom))
+            fs.remove(path)
+
+    def dehydrate(self, comp, broker):
+        """
+        Saves a component in the given broker to the file system.
+        """
+        self._ensure_created()
+        try:
+            doc, value = self._document(comp, broker)
+        except Exception as ex:
+            log.exception(ex)
+            return
+        self._save(doc, value, pool=self.pool)
+
+    def _dehydrate_later(self, comp, broker):
+        self._ensure_created()
+        try:
+            doc, value = self._document(comp, broker)
+        except Exception as ex:
+            log.exception(ex)
+            return
+        self._slots.acquire()
+        try:
+            # the writers don't use self.pool: it may be running the
+            # components that are waiting for a free slot
+            future = self._executor.submit(self._save, doc, value)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+
+    def _dehydrate_packed(self, name, doc):
+        try:
+            data = ser.dumps(doc).encode("utf-8")
+        except Exception as boom:
+            log.error("Could not serialize %s to %s: %r" % (name, self.ser_name, boom))
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = PackWriter(self.pack, compress=self.compress)
+        self._writer.add(name, data)
+
+    def close(self):
+        """
+        Waits for the writers to save everything they've been given, then
+        finishes the pack components are saved to. Does nothing else if
+        components are saved to a file each by the observer itself.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._writer is not None:
+            self._writer.close()
 
     def make_persister(self, to_persist):
         """
@@ -230,7 +515,70 @@ class Hydration(object):
         if not self.meta_data:
             raise Exception("Root not set. Can't create persister.")
 
+        dehydrate = self.dehydrate
+        if self.writers > 0:
+            try:
+                from concurrent.futures import ThreadPoolExecutor
+            except ImportError:
+                log.debug("concurrent.futures isn't available. Saving components in the observer.")
+            else:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.writers)
+                    self._slots = threading.BoundedSemaphore(max(self.max_pending, 1))
+                dehydrate = self._dehydrate_later
+
         def persister(c, broker):
             if c in to_persist:
-                self.dehydrate(c, broker)
+                dehydrate(c, broker)
         return persister
+
+
+SNAPSHOT_DIGESTS = "digests.json"
+
+
+def _saved(value):
+    values = value if isinstance(value, list) else [value]
+    return bool(values) and all(get_serializer(v) is not None for v in values)
+
+
+def save_snapshot(broker, path, pack=True):
+    """
+    Saves what :func:`load_snapshot` needs to pass a broker as ``prior`` to
+    :func:`insights.core.dr.run` in a later process: the digests of the
+    components in ``broker``, and the values of those that aren't datasources
+    and can be serialized along with the errors they raised. The errors of
+    those that only raised errors are saved too. Datasources are always
+    collected again.
+    """
+    from insights.core.plugins import is_datasource
+
+    hydration = Hydration(path, pack=pack)
+    for c, value in list(broker.instances.items()):
+        if c in broker.digests and not is_datasource(c) and _saved(value):
+            hydration.dehydrate(c, broker)
+    for c in list(broker.exceptions):
+        if c in broker.digests and not is_datasource(c) and c not in broker.instances:
+            hydration.dehydrate(c, broker)
+    hydration.close()
+
+    digests = dict((dr.get_name(c), d) for c, d in broker.digests.items())
+    fs.ensure_path(path, mode=0o770)
+    with open(os.path.join(path, SNAPSHOT_DIGESTS), "w") as f:
+        ser.dump(digests, f)
+
+
+def load_snapshot(path):
+    """
+    Returns a broker of what :func:`save_snapshot` saved in ``path`` to pass
+    as ``prior`` to :func:`insights.core.dr.run`. Components that are no
+    longer loaded are left out.
+    """
+    broker = Hydration(path).hydrate()
+    digests = os.path.join(path, SNAPSHOT_DIGESTS)
+    if os.path.exists(digests):
+        with open(digests) as f:
+            for name, digest in ser.load(f).items():
+                c = dr.get_component_by_name(name)
+                if c is not None:
+                    broker.digests[c] = digest
+    return broker
@@ -1,14 +1,18 @@
+import hashlib
+import io
 import itertools
+import json
 import logging
 import os
 import re
+import shutil
 import signal
 import six
+import time
 import traceback
 import codecs
 
 from collections import defaultdict
-from glob import glob
 from subprocess import call
 
 from insights.core import blacklist, dr
@@ -16,7 +20,10 @@ from insights.core.filters import _add_filter, get_filters
 from insights.core.context import ExecutionContext, FSRoots, HostContext
 from insights.core.plugins import component, datasource, ContentException, is_datasource
 from insights.util import fs, streams, which
-from insights.util.subproc import Pipeline
+from insights.util.filtering import FilterNotSupported, LineFilter, is_binary
+from insights.util.lines import MappedLines, map_lines
+from insights.util.paths import PathResolver
+from insights.util.subproc import CalledProcessError, Pipeline
 from insights.core.serde import deserializer, serializer
 import shlex
 
@@ -82,6 +89,153 @@ def mangle_command(command, name_max=255):
     return mangledname
 
 
+RPMDB_PATHS = ["/var/lib/rpm", "/usr/lib/sysimage/rpm"]
+"""
+Paths of the rpm database. A change to them invalidates the cached output of
+commands that run ``rpm``.
+"""
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size, st.st_ino]
+
+
+def _signals(path):
+    # a directory changes with the files in it, which may be modified in
+    # place without changing the directory itself
+    signals = [path, _stat(path)]
+    if os.path.isdir(path):
+        try:
+            names = sorted(os.listdir(path))
+        except OSError:
+            names = []
+        signals.extend([n, _stat(os.path.join(path, n))] for n in names)
+    return signals
+
+
+class DatasourceCache(object):
+    """
+    On-disk cache of the output of :class:`CommandOutputProvider` and
+    :class:`TextFileProvider` that lets collections on the same host reuse
+    the output of slow but rarely changing datasources instead of running
+    them again.
+
+    Entries are keyed by the command or path and the filters and redaction
+    applied to it. An entry is used until it's ``ttl`` seconds old or one of
+    its invalidation signals changes: the size, mtime and inode of the file,
+    of the paths a spec watches, and of :data:`RPMDB_PATHS` for commands that
+    run ``rpm``. Commands are only cached when they succeed, and files only
+    when they're filtered or redacted, since reading an unfiltered file costs
+    as much as reading its cached copy.
+
+    Args:
+        path (str): directory to keep the entries in.
+        ttl (int): seconds entries are used for. Datasources aren't cached
+            when it's 0 unless ``specs`` gives them a ttl.
+        specs (list): dictionaries with a ``name`` that's matched against the
+            start of the fully qualified name of the datasource, a ``ttl``
+            and an optional list of paths to ``watch``. Later entries override
+            previous ones.
+    """
+    def __init__(self, path, ttl=0, specs=None):
+        self.path = path
+        self.ttl = ttl or 0
+        self.specs = specs or []
+
+    def _settings(self, ds):
+        ttl, watch = self.ttl, []
+        name = dr.get_name(ds)
+        for spec in self.specs:
+            if name.startswith(spec["name"]):
+                ttl = spec.get("ttl", ttl) or 0
+                watch = spec.get("watch", watch) or []
+        return ttl, watch
+
+    def key(self, provider, args):
+        """
+        Returns the key of the cache entry for ``provider`` running ``args``,
+        or ``None`` if its datasource isn't cached.
+        """
+        if provider.ds is None:
+            return None
+        ttl, watch = self._settings(provider.ds)
+        if ttl <= 0:
+            return None
+
+        ident = [type(provider).__name__, provider.cmd or provider.path, args]
+        paths = list(watch)
+        if provider.cmd:
+            ident.append(sorted(provider.create_env().items()))
+            if os.path.basename(shlex.split(provider.cmd)[0]) == "rpm":
+                paths.extend(RPMDB_PATHS)
+        else:
+            paths.append(provider.path)
+        name = hashlib.sha1(json.dumps(ident).encode("utf-8")).hexdigest()
+        return name, ttl, [_signals(p) for p in paths]
+
+    def _entry(self, name):
+        return os.path.join(self.path, name)
+
+    def get(self, key):
+        """
+        Returns the ``(rc, output)`` tuple cached under ``key``, or ``None`` if
+        there isn't a fresh entry.
+        """
+        name, ttl, signals = key
+        try:
+            with open(self._entry(name) + ".json") as f:
+                meta = json.load(f)
+            if meta["signals"] != signals or not 0 <= time.time() - meta["time"] < ttl:
+                return None
+            with open(self._entry(name) + ".out", "rb") as f:
+                output = f.read()
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        # the output is checked in case another collection replaced it while
+        # it was being read
+        if hashlib.sha1(output).hexdigest() != meta.get("sha1"):
+            return None
+        return meta["rc"], output
+
+    def put(self, key, rc, output):
+        """
+        Caches the ``(rc, output)`` of a datasource under ``key``.
+        """
+        name, ttl, signals = key
+        meta = {"signals": signals, "time": time.time(), "rc": rc, "sha1": hashlib.sha1(output).hexdigest()}
+        try:
+            fs.ensure_path(self.path, mode=0o700)
+            for ext, data in ((".out", output), (".json", json.dumps(meta).encode("utf-8"))):
+                path = self._entry(name) + ext
+                tmp = "%s.%d.tmp" % (path, os.getpid())
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.rename(tmp, path)
+        except (IOError, OSError) as ex:
+            log.debug("Can't cache %s: %s", name, ex)
+
+
+_DATASOURCE_CACHE = None
+
+
+def set_datasource_cache(cache):
+    """
+    Sets the :class:`DatasourceCache` providers use, or stops caching if
+    ``cache`` is ``None``.
+    """
+    global _DATASOURCE_CACHE
+    _DATASOURCE_CACHE = cache
+
+
+def get_datasource_cache():
+    """ Returns the :class:`DatasourceCache` providers use, if any. """
+    return _DATASOURCE_CACHE
+
+
 class ContentProvider(object):
     def __init__(self):
         self.cmd = None
@@ -92,10 +246,38 @@ class ContentProvider(object):
         self.loaded = False
         self._content = None
         self._exception = None
+        self._digest = None
 
     def load(self):
         raise NotImplementedError()
 
+    @property
+    def digest(self):
+        """
+        Hex digest of the provider's content, or ``None`` if the content can't
+        be read. :func:`insights.core.dr.run` uses it to tell whether the
+        components that depend on the provider need to run again.
+        """
+        if self._digest is None:
+            try:
+                h = hashlib.sha1()
+                self._update_digest(h)
+                self._digest = h.hexdigest()
+            except Exception as ex:
+                log.debug("Can't digest %s: %s", self, ex)
+        return self._digest
+
+    def _update_digest(self, h):
+        content = self.content
+        if isinstance(content, bytes):
+            h.update(content)
+            return
+        errors = "surrogateescape" if six.PY3 else "strict"
+        for line in content:
+            if isinstance(line, six.text_type):
+                line = line.encode("utf-8", errors)
+            h.update(line + b"\n")
+
     def stream(self):
         """
         Returns a generator of lines instead of a list of lines.
@@ -107,6 +289,17 @@ class ContentProvider(object):
     def _stream(self):
         raise NotImplementedError()
 
+    def release(self):
+        """
+        Drops the loaded content so it's loaded again the next time it's
+        asked for. Mapped content is unmapped, so parsers still holding it
+        can't use it anymore.
+        """
+        content, self._content = self._content, None
+        self.loaded = False
+        if isinstance(content, MappedLines):
+            content.close()
+
     @property
     def path(self):
         return os.path.join(self.root, self.relative_path)
@@ -156,8 +349,7 @@ class DatasourceProvider(ContentProvider):
         with open(dst, "wb") as f:
             f.write("\n".join(self.content).encode("utf-8"))
 
-        self.loaded = False
-        self._content = None
+        self.release()
 
     def load(self):
         return self.content
@@ -179,17 +371,29 @@ class FileProvider(ContentProvider):
             log.warning("WARNING: Skipping file %s", "/" + self.relative_path)
             raise dr.SkipComponent()
 
-        if not os.path.exists(self.path):
+        paths = self.ctx.path_resolver if isinstance(self.ctx, ExecutionContext) else PathResolver()
+        if not paths.exists(self.path):
             raise ContentException("%s does not exist." % self.path)
 
-        resolved = os.path.realpath(self.path)
-        if not resolved.startswith(os.path.realpath(self.root)):
+        resolved = paths.realpath(self.path)
+        if not resolved.startswith(paths.realpath(self.root)):
             msg = "Relative path points outside the root: %s -> %s."
             raise Exception(msg % (self.path, resolved))
 
-        if not os.access(self.path, os.R_OK):
+        if not paths.readable(self.path):
             raise ContentException("Cannot access %s" % self.path)
 
+    def _materialize(self):
+        # members of an archive read in place are written out when first read
+        if isinstance(self.ctx, ExecutionContext):
+            self.ctx.path_resolver.materialize(self.path)
+
+    def _update_digest(self, h):
+        self._materialize()
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+
     def __repr__(self):
         return '%s("%r")' % (self.__class__.__name__, self.path)
 
@@ -202,10 +406,12 @@ class RawFileProvider(FileProvider):
 
     def load(self):
         self.loaded = True
+        self._materialize()
         with open(self.path, 'rb') as f:
             return f.read()
 
     def write(self, dst):
+        self._materialize()
         fs.ensure_path(os.path.dirname(dst))
         call([which("cp", env=SAFE_ENV), self.path, dst], env=SAFE_ENV)
 
@@ -239,14 +445,92 @@ class TextFileProvider(FileProvider):
             args.append(sed)
         return args
 
+    def _update_digest(self, h):
+        # filtering and redaction change the content parsers see
+        rules = [sorted(get_filters(self.ds)) if self.ds else [],
+                 sorted(blacklist.get_disallowed_patterns()),
+                 sorted(blacklist.get_disallowed_keywords())]
+        h.update(repr(rules).encode("utf-8"))
+        super(TextFileProvider, self)._update_digest(h)
+
+    def _line_filter(self):
+        """
+        Returns the :class:`insights.util.filtering.LineFilter` that filters
+        the file like the ``create_args`` pipeline, or ``None`` if the
+        pipeline has to run instead.
+        """
+        if type(self).create_args is not TextFileProvider.create_args:
+            return None
+        try:
+            return LineFilter(get_filters(self.ds) if self.ds else None,
+                              blacklist.get_disallowed_patterns(),
+                              blacklist.get_disallowed_keywords())
+        except FilterNotSupported as ex:
+            log.debug("Filtering %s with grep and sed: %s", self.path, ex)
+            return None
+
+    def _filter(self):
+        """
+        Filters the file in process and returns an ``(rc, output)`` tuple
+        identical to what the ``create_args`` pipeline would produce, or
+        ``None`` if the pipeline has to run instead.
+        """
+        line_filter = self._line_filter()
+        if line_filter is None:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                return line_filter.filter(f)
+        except FilterNotSupported as ex:
+            log.debug("Filtering %s with grep and sed: %s", self.path, ex)
+            return None
+
+    def _stream_filter(self, args):
+        """
+        Returns the line filter to stream the file through instead of
+        running ``args``, or ``None`` if it's filtered some other way. Cached
+        datasources aren't streamed, since their output is kept whole.
+        """
+        cache = _DATASOURCE_CACHE
+        if cache is not None and cache.key(self, args) is not None:
+            return None
+        return self._line_filter()
+
+    def _filtered(self, args):
+        """
+        Returns the ``(rc, output)`` of filtering the file with ``args`` from
+        the datasource cache or :meth:`_filter`, or ``None`` if the pipeline
+        has to run instead. A cached file that can't be filtered in process is
+        filtered with the pipeline here so its output can be kept.
+        """
+        cache = _DATASOURCE_CACHE
+        key = cache.key(self, args) if cache is not None else None
+        filtered = cache.get(key) if key is not None else None
+        if filtered is None:
+            filtered = self._filter()
+            if key is not None:
+                if filtered is None:
+                    filtered = Pipeline(*args, env=SAFE_ENV)(keep_rc=True)
+                cache.put(key, *filtered)
+        return filtered
+
     def load(self):
         self.loaded = True
+        self._materialize()
         args = self.create_args()
         if args:
+            filtered = self._filtered(args)
+            if filtered is not None:
+                self.rc, out = filtered
+                return out.decode("utf-8", "ignore").splitlines()
             rc, out = self.ctx.shell_out(args, keep_rc=True, env=SAFE_ENV)
             self.rc = rc
             return out
         if six.PY3:
+            # large files are mapped instead of read into a list
+            lines = map_lines(self.path)
+            if lines is not None:
+                return lines
             with open(self.path, "r", encoding="utf-8", errors="surrogateescape") as f:
                 return [l.rstrip("\n") for l in f]
         else:
@@ -263,8 +547,23 @@ class TextFileProvider(FileProvider):
             if self._content:
                 yield self._content
             else:
+                self._materialize()
                 args = self.create_args()
-                if args:
+                line_filter = self._stream_filter(args) if args and six.PY3 else None
+                # grep's output for binary content is left to grep, and that
+                # has to be known before the first line is handed out
+                if line_filter is not None and (line_filter.select or line_filter.reject) and is_binary(self.path):
+                    line_filter = None
+                filtered = self._filtered(args) if args and six.PY3 and line_filter is None else None
+                if line_filter is not None:
+                    with open(self.path, "rb") as f:
+                        # the same lines load returns, so streaming parsers
+                        # see what they would have seen in content
+                        yield (l for line in line_filter.lines(f)
+                               for l in line.decode("utf-8", "ignore").splitlines())
+                elif filtered is not None:
+                    yield filtered[1].decode("utf-8", "ignore").splitlines()
+                elif args:
                     with streams.connect(*args, env=SAFE_ENV) as s:
                         yield s
                 else:
@@ -281,9 +580,24 @@ class TextFileProvider(FileProvider):
             raise ContentException(str(ex))
 
     def write(self, dst):
+        self._materialize()
         fs.ensure_path(os.path.dirname(dst))
         args = self.create_args()
-        if args:
+        line_filter = self._stream_filter(args) if args else None
+        if line_filter is not None:
+            try:
+                with open(self.path, "rb") as f:
+                    with open(dst, "wb") as out:
+                        out.writelines(line_filter.lines(f))
+                return
+            except FilterNotSupported as ex:
+                # the pipeline writes dst again from the start
+                log.debug("Filtering %s with grep and sed: %s", self.path, ex)
+        filtered = self._filtered(args) if args and line_filter is None else None
+        if filtered is not None:
+            with open(dst, "wb") as f:
+                f.write(filtered[1])
+        elif args:
             p = Pipeline(*args, env=SAFE_ENV)
             p.write(dst)
         else:
@@ -357,11 +671,69 @@ class CommandOutputProvider(ContentProvider):
                 env[e] = os.environ[e]
         return env
 
+    def _pipeline_args(self):
+        # what shell_out and write pass to Pipeline, so both can find a
+        # prefetched result under the same key
+        return dict(timeout=self.timeout or self.ctx.timeout, signum=self.signum, env=self.create_env())
+
+    def prefetch(self):
+        """
+        Starts the command in the command pool of the context if it has one.
+        """
+        pool = getattr(self.ctx, "command_pool", None)
+        if pool is not None:
+            args = self.create_args()
+            cache = _DATASOURCE_CACHE
+            key = cache.key(self, args) if cache is not None else None
+            if key is None or cache.get(key) is None:
+                pool.submit(args, **self._pipeline_args())
+
+    def _prefetched(self, args):
+        pool = getattr(self.ctx, "command_pool", None)
+        if pool is None:
+            return None
+        return pool.take(args, **self._pipeline_args())
+
+    def _output(self, args):
+        """
+        Returns the ``(rc, file)`` of running ``args`` from the datasource
+        cache or the command pool, or ``None`` if the command has to run now.
+        The file holds the output and has to be closed by the caller. A cached
+        command that wasn't prefetched is run here so its output can be kept.
+        """
+        cache = _DATASOURCE_CACHE
+        key = cache.key(self, args) if cache is not None else None
+        output = cache.get(key) if key is not None else None
+        if output is not None:
+            return output[0], io.BytesIO(output[1])
+
+        output = self._prefetched(args)
+        if key is not None:
+            if output is None:
+                rc, raw = Pipeline(*args, **self._pipeline_args())(keep_rc=True)
+                output = rc, io.BytesIO(raw)
+            if output[0] == 0:
+                f = output[1]
+                cache.put(key, output[0], f.read())
+                f.seek(0)
+        return output
+
     def load(self):
         command = self.create_args()
 
-        raw = self.ctx.shell_out(command, split=self.split, keep_rc=self.keep_rc,
-                timeout=self.timeout, env=self.create_env(), signum=self.signum)
+        result = self._output(command)
+        if result is not None:
+            rc, f = result
+            with f:
+                raw = f.read()
+            if rc and not self.keep_rc:
+                raise CalledProcessError(rc, command[0], raw)
+            output = raw.decode("utf-8", "ignore")
+            output = output.splitlines() if self.split else output
+            raw = (rc, output) if self.keep_rc else output
+        else:
+            raw = self.ctx.shell_out(command, split=self.split, keep_rc=self.keep_rc,
+                    timeout=self.timeout, env=self.create_env(), signum=self.signum)
         if self.keep_rc:
             self.rc, output = raw
         else:
@@ -375,12 +747,22 @@ class CommandOutputProvider(ContentProvider):
         if self._exception:
             raise self._exception
         try:
-            if self._content:
+            if self._content is not None:
                 yield self._content
             else:
                 args = self.create_args()
-                with self.ctx.connect(*args, env=self.create_env(), timeout=self.timeout) as s:
-                    yield s
+                result = self._output(args)
+                if result is not None:
+                    rc, f = result
+                    with f:
+                        if rc and not self.keep_rc:
+                            raise CalledProcessError(rc, args[0], "")
+                        yield (line.decode("utf-8", "ignore").rstrip("\r\n") for line in f)
+                else:
+                    # the output of a command streamed here couldn't be read
+                    # again, so reading the content later would run it a
+                    # second time. It's loaded instead and kept.
+                    yield self.content
         except StopIteration:
             raise
         except Exception as ex:
@@ -390,6 +772,15 @@ class CommandOutputProvider(ContentProvider):
     def write(self, dst):
         args = self.create_args()
         fs.ensure_path(os.path.dirname(dst))
+        result = self._output(args) if args else None
+        if result is not None:
+            rc, f = result
+            with f:
+                if rc and not self.keep_rc:
+                    raise CalledProcessError(rc, args[0], "")
+                with open(dst, "wb") as out:
+                    shutil.copyfileobj(f, out)
+            return rc if self.keep_rc else None
         if args:
             timeout = self.timeout or self.ctx.timeout
             p = Pipeline(*args, timeout=timeout, signum=self.signum, env=self.create_env())
@@ -601,11 +992,12 @@ class glob_file(object):
     def __call__(self, broker):
         ctx = _get_context(self.context, broker)
         root = ctx.root
+        paths = ctx.path_resolver
         results = []
         for pattern in self.patterns:
             pattern = ctx.locate_path(pattern)
-            for path in sorted(glob(os.path.join(root, pattern.lstrip('/')))):
-                if self.ignore_func(path) or os.path.isdir(path):
+            for path in sorted(paths.glob(os.path.join(root, pattern.lstrip('/')))):
+                if self.ignore_func(path) or paths.isdir(path):
                     continue
                 try:
                     results.append(self.kind(path[len(root):], root=root, ds=self, ctx=ctx))
@@ -698,7 +1090,8 @@ class listdir(object):
         ctx = _get_context(self.context, broker)
         p = os.path.join(ctx.root, self.path.lstrip('/'))
         p = ctx.locate_path(p)
-        result = sorted(os.listdir(p)) if os.path.isdir(p) else sorted(glob(p))
+        paths = ctx.path_resolver
+        result = sorted(n for n, _ in paths.listdir(p)) if paths.isdir(p) else sorted(paths.glob(p))
 
         if result:
             return [os.path.basename(r) for r in result if not self.ignore_func(r)]
@@ -797,13 +1190,14 @@ class command_with_args(object):
         ctx = broker[self.context]
         if not isinstance(source, (str, tuple)):
             raise ContentException("The provider can only be a single string or a tuple of strings, but got '%s'." % source)
+        cmd = self.cmd
         try:
-            self.cmd = self.cmd % source
-            return CommandOutputProvider(self.cmd, ctx, split=self.split,
+            cmd = self.cmd % source
+            return CommandOutputProvider(cmd, ctx, split=self.split,
                     keep_rc=self.keep_rc, ds=self, timeout=self.timeout, inherit_env=self.inherit_env, signum=self.signum)
         except:
             log.debug(traceback.format_exc())
-        raise ContentException("No results found for [%s]" % self.cmd)
+        raise ContentException("No results found for [%s]" % cmd)
 
 
 class foreach_execute(object):
@@ -907,14 +1301,15 @@ class foreach_collect(object):
         source = broker[self.provider]
         ctx = _get_context(self.context, broker)
         root = ctx.root
+        paths = ctx.path_resolver
         if isinstance(source, ContentProvider):
             source = source.content
         if not isinstance(source, (list, set)):
             source = [source]
         for e in source:
             pattern = ctx.locate_path(self.path % e)
-            for p in glob(os.path.join(root, pattern.lstrip('/'))):
-                if self.ignore_func(p) or os.path.isdir(p):
+            for p in paths.glob(os.path.join(root, pattern.lstrip('/'))):
+                if self.ignore_func(p) or paths.isdir(p):
                     continue
                 try:
                     result.append(self.kind(p[len(root):], root=root, ds=self, ctx=ctx))
@@ -1010,6 +1405,54 @@ class find(object):
         return dict(results)
 
 
+def _prefetch(spec, broker):
+    # evaluates spec in a copy of broker that's then discarded, so no output
+    # is taken from the pool before the real evaluation
+    try:
+        value = dr.get_delegate(spec).process(dr.Broker(broker))
+    except Exception as ex:
+        log.debug("Not prefetching %s: %r", dr.get_name(spec), ex)
+        return
+    for p in (value if isinstance(value, list) else [value]):
+        if isinstance(p, CommandOutputProvider):
+            p.prefetch()
+
+
+def prefetch_commands(broker):
+    """
+    Starts the commands of every enabled :class:`simple_command`,
+    :class:`command_with_args` and :class:`foreach_execute` datasource in the
+    command pool of their context, so a later evaluation with ``broker`` finds
+    their output ready instead of running them one at a time.
+
+    Datasources whose dependencies are all in ``broker`` already are
+    prefetched right away. The others, like those running a command for
+    each value of another datasource, are prefetched by an observer added to
+    ``broker`` as soon as their last dependency is evaluated. Either way
+    they're evaluated in a copy of the broker that's then discarded, so
+    nothing else runs twice. Contexts without a command pool are left alone,
+    and commands that aren't prefetched still run when they're needed.
+    """
+    specs = [c for c in dr.DELEGATES
+             if isinstance(c, (simple_command, command_with_args, foreach_execute)) and dr.is_enabled(c)]
+    # dependency -> specs waiting for it
+    waiting = defaultdict(list)
+    for spec in specs:
+        missing = [d for d in dr.get_dependencies(spec) if d not in broker]
+        for d in missing:
+            waiting[d].append(spec)
+        if not missing:
+            _prefetch(spec, broker)
+
+    def observer(component, broker):
+        for spec in waiting.get(component, []):
+            if all(d in broker for d in dr.get_dependencies(spec)):
+                _prefetch(spec, broker)
+
+    if waiting:
+        broker.add_observer(observer)
+
+
 @serializer(CommandOutputProvider)
 def serialize_command_output(obj, root):
     rel = os.path.join("insights_commands", mangle_command(obj.cmd))
@@ -123,7 +123,7 @@ class AuditLog(LogFileOutput):
             same format they were supplied.
         """
         search_by_expression = self._valid_search(s)
-        for line in self.lines:
+        for line in (self._candidates(s) if s else self.lines):
             # If `s` is not None, keywords must be found in the line
             if s and not search_by_expression(line):
                 continue
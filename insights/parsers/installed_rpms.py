@@ -76,7 +76,7 @@ import six
 import warnings
 
 from ..util import rsplit
-from .. import parser, get_active_lines, CommandParser
+from .. import parser, CommandParser
 from .rpm_vercmp import rpm_version_compare
 from insights.specs import Specs
 
@@ -224,6 +224,8 @@ class InstalledRpms(CommandParser, RpmList):
     A parser for working with data containing a list of installed RPM files on the system and
     related information.
     """
+    streaming = True
+
     def __init__(self, *args, **kwargs):
         self.errors = list()
         """list: List of input lines that indicate an error acquiring the data on the client."""
@@ -245,7 +247,9 @@ class InstalledRpms(CommandParser, RpmList):
 
     def parse_content(self, content):
         packages = defaultdict(list)
-        for line in get_active_lines(content, comment_char='COMMAND>'):
+        # what get_active_lines returns, without building a list of it
+        lines = (l.split('COMMAND>', 1)[0].strip() for l in content)
+        for line in (l for l in lines if l):
             if line.startswith('error:') or line.startswith('warning:'):
                 self.errors.append(line)
             else:
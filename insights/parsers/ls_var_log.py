@@ -30,6 +30,7 @@ class LsVarLog(CommandParser, FileListing):
     """
     A parser for accessing "ls -laR /var/log".
     """
+    streaming = True
 
     def get_filepermissions(self, dir_name_where_to_search, dir_or_file_name_to_get):
         """
@@ -59,6 +59,7 @@ Examples:
     'abrt-watc'
 
 """
+from itertools import chain
 
 from insights.core.dr import SkipComponent
 from .. import add_filter, Scannable, parser, CommandParser
@@ -75,6 +76,7 @@ class Lsof(CommandParser, Scannable):
     dictionary keyed on the column name and found by the locations of each
     column.  Leading and trailing spaces are stripped from data.
     """
+    streaming = True
 
     def _calc_indexes(self, line):
         self.headings = [c.strip() for c in line.split(None)]
@@ -89,19 +91,14 @@ class Lsof(CommandParser, Scannable):
         Consumes lines from content until the HEADER is found and processed.
         Returns an iterator over the remaining lines.
         """
-        start = len(content)
-        for n, line in enumerate(content):
-            if 'COMMAND ' in line:
-                start = n + 1
-                break
-
-        if start >= len(content):
+        content = iter(content)
+        header = next((line for line in content if 'COMMAND ' in line), None)
+        first = next(content, None)
+        if header is None or first is None:
             raise SkipComponent
 
-        content = iter(content[start:])
-
-        self._calc_indexes(line)
-        return content
+        self._calc_indexes(header)
+        return chain([first], content)
 
     def _parse_line(self, line):
         """
@@ -179,9 +179,12 @@ class LsPciVmmkn(CommandParser, list):
 
     """
     def parse_content(self, content):
-        # Remove the white-trailing of the output
-        while content and not content[-1].strip():
-            content.pop(-1)
+        # Remove the white-trailing of the output, without changing the
+        # content other parsers share
+        end = len(content)
+        while end and not content[end - 1].strip():
+            end -= 1
+        content = content[:end]
 
         dev = {}
         self.append(dev)
@@ -28,6 +28,7 @@ ProcNsat - File ``/proc/net/netstat``
 """
 
 from collections import defaultdict
+from itertools import chain, islice
 from insights.parsers import keyword_search
 from insights.specs import Specs
 from insights import Parser
@@ -446,13 +447,18 @@ class Netstat(CommandParser):
         '/run/systemd/shutdownd'
     """
 
+    streaming = True
+
     def parse_content(self, content):
-        if not content:
+        content = iter(content)
+        head = list(islice(content, 3))
+        if not head:
             raise ParseException("Input content is empty")
 
-        if len(content) < 3:
+        if len(head) < 3:
             raise ParseException("Input content is not empty but there is no useful parsed data.")
 
+        content = chain(head, content)
         sections = []
         cur_section = None
         is_meta_data = False
@@ -5,7 +5,7 @@ Ps - command ``ps auxww`` and others
 This module provides processing for the various outputs of the ``ps`` command.
 """
 from .. import parser, CommandParser
-from . import ParseException, parse_delimited_table, keyword_search
+from . import ParseException, keyword_search
 from insights.specs import Specs
 from insights.core.filters import add_filter
 
@@ -52,6 +52,8 @@ class Ps(CommandParser):
     the subclass must override it correspondingly
     '''
 
+    streaming = True
+
     def __init__(self, *args, **kwargs):
         self.data = []
         self.running = set()
@@ -62,19 +64,23 @@ class Ps(CommandParser):
 
     def parse_content(self, content):
         raw_line_key = "_line"
+        content = iter(content)
         header_line = next((l for l in content if are_present(tags=[self.user_name, self.command_name], line=l)), None)
         if header_line is not None:
-            # parse_delimited_table allows short lines, but we specifically
-            # want to ignore them.
-            self.data = [
-                row
-                for row in parse_delimited_table(
-                    content, heading_ignore=[header_line], max_splits=self.max_splits,
-                    raw_line_key=raw_line_key
-                )
-                # skip the insights-client self grep process "grep -F .."
-                if self.command_name in row and not row[self.command_name].startswith('grep -F ')
-            ]
+            # content is an iterator over the lines after the header, so the
+            # rows are split here the way parse_delimited_table would
+            headings = [c.strip() for c in header_line.split(None)]
+            for line in content:
+                row = line.strip()
+                if not row:
+                    continue
+                row = dict(zip(headings, [i.strip() for i in row.split(None, self.max_splits)]))
+                # parse_delimited_table allows short lines, but we specifically
+                # want to ignore them, and skip the insights-client self grep
+                # process "grep -F .."
+                if self.command_name in row and not row[self.command_name].startswith('grep -F '):
+                    row[raw_line_key] = line
+                    self.data.append(row)
             # The above list comprehension assures all rows have a command.
             for proc in self.data:
                 cmd = proc[self.command_name]
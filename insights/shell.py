@@ -282,7 +282,7 @@ class Models(dict):
             self._dump_diagnostics(comp)
             return
 
-        val = dr.run(comp, broker=self._broker).get(comp)
+        val = self._broker.resolve(comp)
 
         if comp not in self._broker:
             if comp in self._broker.exceptions or comp in self._broker.missing_requirements:
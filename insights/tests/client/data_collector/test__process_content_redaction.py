@@ -1,4 +1,5 @@
-from insights.client.data_collector import _process_content_redaction
+from insights.client.data_collector import _process_content_redaction, _sed_literals, _unchanged_by_redaction
+from insights.util.filtering import FilterNotSupported
 from insights.client.constants import InsightsConstants as constants
 from mock.mock import patch, Mock, call
 from tempfile import NamedTemporaryFile
@@ -90,3 +91,64 @@ def test_returnvalue():
     # exclude regex
     retval = _process_content_redaction(test_file.name, ['[[:digit:]]+', 'a*(b|c)'], True)
     assert retval == 'test\npassword: ********\n'.encode('utf-8')
+
+
+def _pipeline(filepath, exclude, regex):
+    with patch('insights.client.data_collector._Redactor.redact', Mock(side_effect=FilterNotSupported('test'))):
+        return _process_content_redaction(filepath, exclude, regex)
+
+
+@patch('insights.client.data_collector.constants.default_sed_file', mock_sed_file.name)
+def test_same_as_pipeline():
+    '''
+    Verify that redacting in process gives the sed and grep output
+    '''
+    contents = ['', 'test\n', 'test', 'abcd\n1234\n', 'password: p4ssw0rd\nabc\n', 'caf\xe9\nabc\n',
+                'ab\x00cd\ntest\n', 'no newline\nat the end']
+    excludes = [(None, False), (['test', 'abc'], False), (['caf\xe9'], False), (['[[:digit:]]+', 'a*(b|c)'], True),
+                (['^no', '\\<the\\>'], True), (['(a)\\1'], True), ([''], False)]
+    for content in contents:
+        with NamedTemporaryFile() as f:
+            f.write(content.encode('utf-8'))
+            f.flush()
+            for exclude, regex in excludes:
+                expected = _pipeline(f.name, exclude, regex)
+                assert _process_content_redaction(f.name, exclude, regex) == expected
+
+
+@patch('insights.client.data_collector.Popen')
+@patch('insights.client.data_collector.constants.default_sed_file', mock_sed_file.name)
+def test_untouched_without_subprocess(Popen):
+    '''
+    Verify that files sed can't change are redacted without
+    running anything, and are found unchanged if nothing is removed
+    '''
+    with NamedTemporaryFile() as f:
+        f.write(b'test\nabcd\n1234\n')
+        f.flush()
+        assert _process_content_redaction(f.name, None, False) == b'test\nabcd\n1234\n'
+        assert _process_content_redaction(f.name, ['nothing'], False) == b'test\nabcd\n1234\n'
+        assert _unchanged_by_redaction(f.name, None, False)
+        assert _unchanged_by_redaction(f.name, ['nothing'], False)
+        assert not _unchanged_by_redaction(f.name, ['test'], False)
+        assert _process_content_redaction(f.name, ['test'], False) == b'abcd\n1234\n'
+        assert _process_content_redaction(f.name, ['^[a-z]+$'], True) == b'1234\n'
+    Popen.assert_not_called()
+
+
+def test_sed_literals():
+    '''
+    Verify that a literal is found for each substitution, and none
+    when the script can't be checked
+    '''
+    assert _sed_literals(mock_sed_file.name) == [b'password', b'password']
+    for script, expected in [('s/ab+c/x/g\n# comment\ns|[/]de\\.f|x|', [b'a', b'de.f']),
+                             ('s/(ab|cd)/x/', None),
+                             ('s/x*/y/', None),
+                             ('s/abc/x/p', None),
+                             ('/abc/d', None)]:
+        with NamedTemporaryFile() as f:
+            f.write(script.encode('utf-8'))
+            f.flush()
+            assert _sed_literals(f.name) == expected
+    assert _sed_literals('/nonexistent/.exp.sed') is None
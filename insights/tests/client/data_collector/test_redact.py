@@ -89,6 +89,7 @@ def test_redact_call_walk_core(walk):
     walk.assert_called_once_with(os.path.join(arch.archive_dir, 'data'))
 
 
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=False))
 @patch('insights.client.data_collector._process_content_redaction')
 def test_redact_call_process_redaction(_process_content_redaction):
     '''
@@ -123,6 +124,7 @@ def test_redact_call_process_redaction(_process_content_redaction):
         mock_open.return_value.__enter__.return_value.write.assert_called_once_with(_process_content_redaction.return_value)
 
 
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=False))
 @patch('insights.client.data_collector._process_content_redaction')
 def test_redact_exclude_regex(_process_content_redaction):
     '''
@@ -152,6 +154,7 @@ def test_redact_exclude_regex(_process_content_redaction):
         _process_content_redaction.assert_called_once_with(test_file, ['12.*4', '^abcd'], True)
 
 
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=False))
 @patch('insights.client.data_collector._process_content_redaction')
 def test_redact_exclude_no_regex(_process_content_redaction):
     '''
@@ -181,6 +184,7 @@ def test_redact_exclude_no_regex(_process_content_redaction):
         _process_content_redaction.assert_called_once_with(test_file, ['1234', 'abcd'], False)
 
 
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=False))
 @patch('insights.client.data_collector._process_content_redaction')
 def test_redact_exclude_empty(_process_content_redaction):
     '''
@@ -210,6 +214,7 @@ def test_redact_exclude_empty(_process_content_redaction):
         _process_content_redaction.assert_called_once_with(test_file, [], False)
 
 
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=False))
 @patch('insights.client.data_collector._process_content_redaction')
 def test_redact_exclude_none(_process_content_redaction):
     '''
@@ -258,3 +263,31 @@ def test_redact_bad_location(_process_content_redaction, walk):
             dc.redact(rm_conf)
         walk.assert_not_called()
         _process_content_redaction.assert_not_called()
+
+
+@patch('insights.client.data_collector._process_content_redaction')
+@patch('insights.client.data_collector._unchanged_by_redaction', Mock(return_value=True))
+def test_redact_unchanged_not_written(_process_content_redaction):
+    '''
+    Verify that redact() doesn't rewrite files whose redacted
+    content is unchanged
+    '''
+    conf = InsightsConfig(core_collect=False)
+    arch = InsightsArchive(conf)
+    arch.create_archive_dir()
+
+    test_file = os.path.join(arch.archive_dir, 'test.file')
+    with open(test_file, 'w') as t:
+        t.write(test_file_data)
+
+    dc = DataCollector(conf, arch)
+
+    if six.PY3:
+        open_name = 'builtins.open'
+    else:
+        open_name = '__builtin__.open'
+
+    with patch(open_name, create=True) as mock_open:
+        dc.redact({})
+        mock_open.assert_not_called()
+        _process_content_redaction.assert_not_called()
@@ -0,0 +1,215 @@
+import gzip
+import io
+import os
+import random
+import stat
+import tarfile
+import zipfile
+
+import pytest
+
+from insights.core import dr
+from insights.core.archives import create_tar, extract, open_archive
+from insights.core.context import HostArchiveContext
+from insights.core.hydration import create_context, initialize_broker
+from insights.core.spec_factory import SpecSet, glob_file, simple_file
+from insights.util import seekable_gzip
+from insights.util.paths import ArchiveIndex, PathIndex
+from insights.util.seekable_gzip import SeekableGzip
+
+FILES = {
+    "archive/insights_commands/hostname": "host.example.com\n",
+    "archive/etc/redhat-release": "Red Hat Enterprise Linux release 8.6\n",
+    "archive/etc/a.d/x.conf": "x = 1\n",
+    "archive/etc/a.d/y.conf": "y = 2\n",
+    "archive/etc/a.d/.hidden.conf": "",
+    "archive/etc/b.d/sub/z.conf": "z = 3\n",
+}
+LINKS = {
+    "archive/etc/c.d": "a.d",
+    "archive/etc/release": "redhat-release",
+    "archive/etc/chain": "c.d/x.conf",
+    "archive/dangling": "etc/missing",
+    "archive/absolute": "/nonexistent/path",
+    "archive/loop": "loop",
+}
+DIRS = ["archive/empty"]
+
+
+def _tar(path, mode):
+    with tarfile.open(path, mode) as tar:
+        for name in DIRS:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            tar.addfile(info)
+        for name, content in sorted(FILES.items()):
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        for name, target in sorted(LINKS.items()):
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.SYMTYPE
+            info.linkname = target
+            tar.addfile(info)
+
+
+def _zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for name in DIRS:
+            info = zipfile.ZipInfo(name + "/")
+            info.external_attr = (stat.S_IFDIR | 0o755) << 16
+            z.writestr(info, b"")
+        for name, content in sorted(FILES.items()):
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (stat.S_IFREG | 0o644) << 16
+            z.writestr(info, content)
+        for name, target in sorted(LINKS.items()):
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (stat.S_IFLNK | 0o777) << 16
+            z.writestr(info, target)
+
+
+@pytest.fixture(params=["tar", "tar.gz", "zip"])
+def archive(request, tmpdir):
+    path = str(tmpdir.join("archive." + request.param))
+    if request.param == "zip":
+        _zip(path)
+    else:
+        _tar(path, "w:gz" if request.param == "tar.gz" else "w")
+    return path
+
+
+NAMES = ["", "archive", "archive/etc", "archive/etc/a.d/x.conf", "archive/etc/c.d", "archive/etc/c.d/y.conf",
+         "archive/etc/release", "archive/etc/chain", "archive/dangling", "archive/absolute", "archive/loop",
+         "archive/empty", "archive/nothing", "archive/etc/redhat-release/x", "archive/etc/c.d/../release"]
+PATTERNS = ["*", "archive/*", "archive/etc/*.d/*.conf", "archive/etc/*/.*", "archive/etc/c.d/*",
+            "archive/*/*/*/*", "archive/etc/[rc]*", "archive/empty/*", "archive/*/"]
+
+
+def test_same_as_extracted(archive):
+    with extract(archive) as ex, open_archive(archive) as arc:
+        assert arc.index is not None
+        disk = PathIndex(ex.tmp_dir)
+        virtual = arc.index
+
+        def rel(path, root):
+            return os.path.relpath(path, root)
+
+        assert sorted(rel(f, ex.tmp_dir) for f in disk.files) == sorted(rel(f, arc.tmp_dir) for f in virtual.files)
+        for pattern in PATTERNS:
+            expected = sorted(rel(p, ex.tmp_dir) for p in disk.glob(os.path.join(ex.tmp_dir, pattern)))
+            assert sorted(rel(p, arc.tmp_dir) for p in virtual.glob(os.path.join(arc.tmp_dir, pattern))) == expected
+        for name in NAMES:
+            d, v = os.path.join(ex.tmp_dir, name), os.path.join(arc.tmp_dir, name)
+            for check in ["lexists", "exists", "isdir", "readable"]:
+                assert getattr(virtual, check)(v) == getattr(disk, check)(d), (check, name)
+            if disk.exists(d):
+                real_root = os.path.realpath(arc.tmp_dir)
+                assert rel(virtual.realpath(v), real_root) == rel(disk.realpath(d), os.path.realpath(ex.tmp_dir))
+
+        # nothing's been written out yet
+        assert os.listdir(arc.tmp_dir) == []
+
+
+def test_materialize(archive):
+    with open_archive(archive) as arc:
+        index = arc.index
+        path = os.path.join(arc.tmp_dir, "archive/etc/chain")
+        index.materialize(path)
+        with open(path) as f:
+            assert f.read() == FILES["archive/etc/a.d/x.conf"]
+        written = [os.path.relpath(os.path.join(r, n), arc.tmp_dir)
+                   for r, ds, fs in os.walk(arc.tmp_dir) for n in ds + fs]
+        assert sorted(written) == ["archive", "archive/etc", "archive/etc/a.d", "archive/etc/a.d/x.conf",
+                                   "archive/etc/c.d", "archive/etc/chain"]
+
+        # paths that don't exist or leave the archive aren't written
+        for name in ["archive/absolute", "archive/loop", "archive/nothing"]:
+            index.materialize(os.path.join(arc.tmp_dir, name))
+        assert not os.path.exists(os.path.join(arc.tmp_dir, "archive/nothing"))
+    assert not os.path.exists(arc.tmp_dir)
+
+
+def test_outside_root(tmpdir):
+    tmpdir.join("secret").write("secret")
+    root = tmpdir.mkdir("root")
+    index = ArchiveIndex(str(root), [("a", "link", "../secret"), ("b", "link", "/etc/hostname")], None)
+    for name in ["a", "b"]:
+        path = str(root.join(name))
+        assert index.lexists(path)
+        assert not index.exists(path)
+
+
+class Specs(SpecSet):
+    hostname = simple_file("insights_commands/hostname")
+    confs = glob_file(["etc/c.d/*.conf", "etc/b.d/*/*.conf"])
+
+
+def test_providers(archive):
+    with open_archive(archive) as arc:
+        ctx = create_context(arc.tmp_dir, index=arc.index)
+        assert isinstance(ctx, HostArchiveContext)
+        assert ctx.path_resolver is arc.index
+
+        ctx, broker = initialize_broker(arc.tmp_dir, index=arc.index)
+        broker = dr.run([Specs.hostname, Specs.confs], broker=broker)
+        assert broker[Specs.hostname].content == ["host.example.com"]
+        assert [p.content for p in broker[Specs.confs]] == [["x = 1"], ["y = 2"], ["z = 3"]]
+        # only what's been read is on disk
+        assert sorted(os.listdir(os.path.join(arc.tmp_dir, "archive/etc"))) == ["a.d", "b.d", "c.d"]
+
+
+def test_unsupported_is_extracted(tmpdir):
+    path = str(tmpdir.join("archive.tar.bz2"))
+    _tar(path, "w:bz2")
+    with open_archive(path) as arc:
+        assert arc.index is None
+        assert os.path.isfile(os.path.join(arc.tmp_dir, "archive/etc/a.d/x.conf"))
+
+
+def test_seekable_gzip(tmpdir, monkeypatch):
+    monkeypatch.setattr(seekable_gzip, "CHUNK", 512)
+    rand = random.Random(0)
+    data = b"".join(str(rand.random()).encode("ascii") for _ in range(20000))
+    path = str(tmpdir.join("data.gz"))
+    # two members and trailing padding, like some tools write
+    half = len(data) // 2
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data[:half]) + gzip.compress(data[half:]) + b"\0" * 100)
+
+    with SeekableGzip(path, span=4096) as g:
+        assert g.read() == data
+        assert len(g._points) > 10
+        for _ in range(200):
+            offset, size = rand.randrange(len(data) + 10), rand.randrange(5000)
+            g.seek(offset)
+            assert g.read(size) == data[offset:offset + size]
+            assert g.tell() == min(offset + size, max(offset, len(data)))
+        assert g.seek(-10, 2) == len(data) - 10
+        assert g.read() == data[-10:]
+
+
+@pytest.mark.parametrize("compressor", ["gz", "xz", "bz2", "none"])
+def test_create_tar(tmpdir, compressor):
+    path = str(tmpdir.join("archive.tar"))
+    _tar(path, "w")
+    src = tmpdir.mkdir("src")
+    with tarfile.open(path) as tar:
+        tar.extractall(str(src))
+
+    dst = str(tmpdir.join("out"))
+    create_tar(str(src), dst, compressor, arcname=".", remove=True)
+    with tarfile.open(dst) as tar:
+        names = tar.getnames()
+        assert sorted(n for n in names if n.startswith("./archive/etc/a.d/")) == [
+            "./archive/etc/a.d/.hidden.conf", "./archive/etc/a.d/x.conf", "./archive/etc/a.d/y.conf"]
+        assert tar.getmember("./archive/etc/c.d").issym()
+        assert tar.getmember("./archive/empty").isdir()
+        for name, content in FILES.items():
+            assert tar.extractfile("./" + name).read() == content.encode("utf-8")
+
+    # the files are gone, the directories are left
+    left = [os.path.join(r, n) for r, ds, fs in os.walk(str(src)) for n in fs]
+    assert left == []
+    assert os.path.isdir(str(src.join("archive/etc/b.d/sub")))
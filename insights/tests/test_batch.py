@@ -0,0 +1,70 @@
+import json
+import sys
+
+import pytest
+from mock.mock import patch
+from six import StringIO
+
+from insights import batch, dr, load_default_plugins, rule, make_fail, run
+from insights.combiners.hostname import Hostname
+from insights.formats._json import JsonFormatterAdapter
+
+
+@rule(Hostname)
+def report(hn):
+    return make_fail("BATCH", hostname=hn.fqdn)
+
+
+class Args(object):
+    plugins = ""
+    missing = False
+    fail_only = False
+    show_rules = None
+
+
+def _archive(tmpdir, name, hostname):
+    d = tmpdir.mkdir(name)
+    d.mkdir("insights_commands").join("hostname_-f").write(hostname + "\n")
+    return str(d)
+
+
+def test_find_archives(tmpdir):
+    a = _archive(tmpdir, "a", "a.example.com")
+    b = _archive(tmpdir, "b", "b.example.com")
+    tmpdir.join("c.tar.gz").write("")
+    tmpdir.join("notes.txt").write("")
+    assert batch.find_archives(str(tmpdir)) == [a, b, str(tmpdir.join("c.tar.gz"))]
+
+    listing = tmpdir.join("list.txt")
+    listing.write("# archives\n%s\n\n%s\n" % (b, a))
+    assert batch.find_archives(str(listing)) == [b, a]
+
+
+def test_run_batch(tmpdir):
+    load_default_plugins()
+    archives = [_archive(tmpdir, n, "%s.example.com" % n) for n in ("a", "b", "c")]
+    archives.append(str(tmpdir.join("missing")))
+    stream = StringIO()
+    failed = batch.run_batch(archives, dr.get_dependency_graph(report), JsonFormatterAdapter(Args()),
+                             jobs=2, max_per_worker=1, stream=stream)
+    assert failed == 1
+
+    records = dict((r["archive"], r) for r in map(json.loads, stream.getvalue().splitlines()))
+    assert sorted(records) == sorted(archives)
+    for name, path in zip(("a", "b", "c"), archives):
+        assert records[path]["reports"][0]["details"]["hostname"] == "%s.example.com" % name
+    assert "error" in records[archives[-1]]
+
+
+def test_run_batch_format(tmpdir, capfd):
+    archive = _archive(tmpdir, "a", "a.example.com")
+    testargs = ["insights-run", "-p", "insights.plugins", "--batch", str(tmpdir), "-j", "1"]
+    with patch.object(sys, "argv", testargs):
+        run(print_summary=True)
+    record = json.loads(capfd.readouterr().out)
+    assert record["archive"] == archive
+
+    with patch.object(sys, "argv", testargs + ["-f", "text"]):
+        with pytest.raises(SystemExit):
+            run(print_summary=True)
+    assert "--batch needs one of these formats" in capfd.readouterr().err
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from insights.core import CommandParser, dr
+from insights.core.context import HostContext
+from insights.core.plugins import datasource, parser
+from insights.core.spec_factory import (SpecSet, command_with_args, foreach_execute,
+                                        prefetch_commands, simple_command)
+from insights.util.subproc import CalledProcessError, CommandPool
+
+
+@datasource(HostContext)
+def items(broker):
+    return ["one", "two", "three"]
+
+
+@datasource(items)
+def first_item(broker):
+    return broker[items][0]
+
+
+class Specs(SpecSet):
+    echo = simple_command("/bin/echo hello")
+    echo_rc = simple_command("/bin/sh -c 'echo fail; exit 3'", keep_rc=True)
+    each = foreach_execute(items, "/bin/echo %s")
+    first = command_with_args("/bin/echo %s", first_item)
+    slow = simple_command("/bin/sleep 5", timeout=1)
+
+
+COMMANDS = [Specs.echo, Specs.echo_rc, Specs.each, Specs.first, Specs.slow]
+
+
+def test_pool_take():
+    pool = CommandPool(2)
+    try:
+        pool.submit([["echo", "hi"]], timeout=5)
+        assert pool.take([["echo", "hi"]], timeout=10) is None
+        # the output can be taken more than once
+        for _ in range(2):
+            rc, f = pool.take([["echo", "hi"]], timeout=5)
+            with f:
+                assert (rc, f.read()) == (0, b"hi\n")
+    finally:
+        pool.shutdown()
+    assert not os.path.exists(pool._dir)
+
+
+def run(ctx, prefetch):
+    broker = dr.Broker()
+    broker[HostContext] = ctx
+    if prefetch:
+        prefetch_commands(broker)
+    return dr.run(COMMANDS + [items, first_item], broker=broker)
+
+
+def test_prefetch(monkeypatch):
+    ctx = HostContext(command_workers=2)
+    taken = []
+    take = ctx.command_pool.take
+
+    def counting_take(cmds, **kwargs):
+        result = take(cmds, **kwargs)
+        taken.append(result is not None)
+        return result
+
+    monkeypatch.setattr(ctx.command_pool, "take", counting_take)
+    try:
+        broker = run(ctx, True)
+        serial = run(HostContext(), False)
+        assert broker[Specs.echo].content == serial[Specs.echo].content == ["hello"]
+        assert broker[Specs.echo_rc].content == serial[Specs.echo_rc].content == ["fail"]
+        assert broker[Specs.echo_rc].rc == serial[Specs.echo_rc].rc == 3
+        assert [p.content for p in broker[Specs.each]] == [p.content for p in serial[Specs.each]]
+        assert broker[Specs.first].content == serial[Specs.first].content == ["one"]
+        with pytest.raises(CalledProcessError):
+            broker[Specs.slow].content
+        # each and first depend on other datasources, so they're prefetched
+        # once those are evaluated
+        assert taken == [True] * 7
+    finally:
+        ctx.command_pool.shutdown()
+
+
+def test_prefetch_write(tmpdir):
+    ctx = HostContext(command_workers=2)
+    try:
+        broker = run(ctx, True)
+        serial = run(HostContext(), False)
+        for spec in [Specs.echo, Specs.echo_rc]:
+            a, b = str(tmpdir.join("a")), str(tmpdir.join("b"))
+            assert broker[spec].write(a) == serial[spec].write(b)
+            with open(a, "rb") as fa, open(b, "rb") as fb:
+                assert fa.read() == fb.read()
+    finally:
+        ctx.command_pool.shutdown()
+
+
+def test_no_pool():
+    broker = dr.Broker()
+    broker[HostContext] = HostContext()
+    prefetch_commands(broker)
+    assert HostContext().command_pool is None
+
+
+calls = []
+
+
+@datasource(HostContext)
+def counted(broker):
+    calls.append("counted")
+    return "eth0"
+
+
+class Counted(SpecSet):
+    echo = simple_command("/bin/sh -c 'echo run >> \"$COUNT_FILE\"; echo hi'", inherit_env=["COUNT_FILE"])
+
+
+@parser(Counted.echo)
+class CountedParser(CommandParser):
+    def parse_content(self, content):
+        calls.append("parser")
+
+
+def test_prefetch_runs_once(tmpdir, monkeypatch):
+    count = tmpdir.join("count")
+    monkeypatch.setenv("COUNT_FILE", str(count))
+    del calls[:]
+    ctx = HostContext(command_workers=2)
+    try:
+        broker = dr.Broker()
+        broker[HostContext] = ctx
+        prefetch_commands(broker)
+        assert calls == []
+        broker = dr.run([counted, Counted.echo, CountedParser], broker=broker)
+        broker[Counted.echo].write(str(tmpdir.join("out")))
+    finally:
+        ctx.command_pool.shutdown()
+    assert sorted(calls) == ["counted", "parser"]
+    assert count.read() == "run\n"
+    assert tmpdir.join("out").read() == "hi\n"
@@ -0,0 +1,125 @@
+import pytest
+
+from insights import add_filter
+from insights.core import dr, spec_factory
+from insights.core.context import HostContext
+from insights.core.spec_factory import (CommandOutputProvider, DatasourceCache, SpecSet,
+                                        TextFileProvider, set_datasource_cache, simple_command,
+                                        simple_file)
+from insights.util.subproc import CalledProcessError
+
+
+class Specs(SpecSet):
+    cat = simple_command("/bin/cat")
+    fail = simple_command("/bin/false")
+    text = simple_file("/etc/datasource_cache_test", filterable=True)
+    plain = simple_file("/etc/datasource_cache_plain")
+
+
+add_filter(Specs.text, ["keep"])
+
+
+@pytest.fixture
+def cache(tmpdir):
+    c = DatasourceCache(str(tmpdir.join("cache")), specs=[{"name": dr.get_name(Specs.cat), "ttl": 60}])
+    set_datasource_cache(c)
+    yield c
+    set_datasource_cache(None)
+
+
+def command(path, ds=Specs.cat):
+    return CommandOutputProvider("/bin/cat %s" % path, HostContext(), ds=ds)
+
+
+def test_command(cache, tmpdir):
+    data = tmpdir.join("data")
+    data.write("one\n")
+    assert command(data).content == ["one"]
+
+    data.write("two\n")
+    assert command(data).content == ["one"]
+    dst = str(tmpdir.join("out"))
+    command(data).write(dst)
+    with open(dst) as f:
+        assert f.read() == "one\n"
+
+    # not cached without a ttl
+    assert command(data, ds=None).content == ["two"]
+    cache.specs = []
+    assert command(data).content == ["two"]
+
+
+def test_ttl(cache, tmpdir, monkeypatch):
+    data = tmpdir.join("data")
+    data.write("one\n")
+    assert command(data).content == ["one"]
+    data.write("two\n")
+    now = spec_factory.time.time()
+    monkeypatch.setattr(spec_factory.time, "time", lambda: now + 61)
+    assert command(data).content == ["two"]
+
+
+def test_watch(cache, tmpdir):
+    watched = tmpdir.mkdir("watched")
+    watched.join("db").write("a")
+    cache.specs[0]["watch"] = [str(watched)]
+    data = tmpdir.join("data")
+    data.write("one\n")
+    assert command(data).content == ["one"]
+    data.write("two\n")
+    assert command(data).content == ["one"]
+
+    # modified in place, the directory itself doesn't change
+    watched.join("db").write("ab")
+    assert command(data).content == ["two"]
+
+
+def test_failures_not_cached(tmpdir):
+    cache = DatasourceCache(str(tmpdir.join("cache")), ttl=60)
+    set_datasource_cache(cache)
+    try:
+        p = CommandOutputProvider("/bin/false", HostContext(), ds=Specs.fail)
+        with pytest.raises(CalledProcessError):
+            p.content
+        assert not tmpdir.join("cache").check()
+    finally:
+        set_datasource_cache(None)
+
+
+def test_text_file(tmpdir):
+    cache = DatasourceCache(str(tmpdir.join("cache")), ttl=60)
+    set_datasource_cache(cache)
+    try:
+        path = tmpdir.join("text")
+        path.write("keep one\ndrop\n")
+        assert TextFileProvider(str(path), root="/", ds=Specs.text, ctx=HostContext()).content == ["keep one"]
+        # a change to the file invalidates its output
+        path.write("keep one\nkeep two\n")
+        p = TextFileProvider(str(path), root="/", ds=Specs.text, ctx=HostContext())
+        assert p.content == ["keep one", "keep two"]
+        assert len(tmpdir.join("cache").listdir()) == 2
+
+        # unfiltered files aren't cached
+        plain = tmpdir.join("plain")
+        plain.write("drop\n")
+        assert TextFileProvider(str(plain), root="/", ds=Specs.plain, ctx=HostContext()).content == ["drop"]
+        assert len(tmpdir.join("cache").listdir()) == 2
+    finally:
+        set_datasource_cache(None)
+
+
+def test_prefetch_skips_cached(cache, tmpdir):
+    data = tmpdir.join("data")
+    data.write("one\n")
+    assert command(data).content == ["one"]
+
+    ctx = HostContext(command_workers=1)
+    submitted = []
+    ctx.command_pool.submit = lambda cmds, **kwargs: submitted.append(cmds)
+    try:
+        p = CommandOutputProvider("/bin/cat %s" % data, ctx, ds=Specs.cat)
+        p.prefetch()
+        assert submitted == []
+        assert p.content == ["one"]
+    finally:
+        ctx.command_pool.shutdown()
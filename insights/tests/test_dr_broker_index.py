@@ -0,0 +1,60 @@
+from insights.core import dr
+
+
+class indexed(dr.ComponentType):
+    pass
+
+
+class unused(dr.ComponentType):
+    pass
+
+
+@indexed("a")
+def first(a):
+    return a
+
+
+@indexed("b")
+def second(b):
+    return b
+
+
+@indexed(first, second)
+def pair(f, s):
+    return (f, s)
+
+
+def seeded():
+    broker = dr.Broker()
+    broker["a"] = 1
+    broker["b"] = 2
+    return broker
+
+
+def test_broker_get_by_type():
+    broker = dr.run(dr.get_dependency_graph(pair), seeded())
+    assert broker.get_by_type(indexed) == dict((c, broker[c]) for c in (first, second, pair))
+    assert broker.get_by_type(unused) == {}
+
+    del broker[second]
+    assert second not in broker.get_by_type(indexed)
+
+    copy = dr.Broker(broker)
+    copy[second] = 2
+    assert second in copy.get_by_type(indexed)
+    assert second not in broker.get_by_type(indexed)
+
+
+def test_broker_observer_dispatch():
+    all_seen = []
+    indexed_seen = []
+    broker = seeded()
+    broker.add_observer(lambda c, b: all_seen.append(c))
+    dr.run(dr.get_dependency_graph(first), broker)
+    assert all_seen == [first]
+
+    broker.add_observer(lambda c, b: indexed_seen.append(c), indexed)
+    broker.add_observer(lambda c, b: indexed_seen.append(c), unused)
+    dr.run(dr.get_dependency_graph(second), broker)
+    assert all_seen == [first, second]
+    assert indexed_seen == [second]
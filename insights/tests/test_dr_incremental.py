@@ -0,0 +1,208 @@
+from insights import make_pass
+from insights.core import dr, serde
+from insights.core.plugins import rule
+from insights.core.spec_factory import DatasourceProvider, TextFileProvider
+
+
+class incremental(dr.ComponentType):
+    pass
+
+
+CONTENT = {"first": ["a"], "second": ["b"]}
+CALLS = []
+
+
+@incremental("ctx")
+def first_input(ctx):
+    return DatasourceProvider(CONTENT["first"], "/first")
+
+
+@incremental("ctx")
+def second_input(ctx):
+    return DatasourceProvider(CONTENT["second"], "/second")
+
+
+@incremental(first_input)
+def first_parsed(ds):
+    CALLS.append(first_parsed)
+    return ds.content
+
+
+@incremental(second_input)
+def second_parsed(ds):
+    CALLS.append(second_parsed)
+    return ds.content
+
+
+@incremental(first_parsed, second_parsed)
+def both(a, b):
+    CALLS.append(both)
+    return a + b
+
+
+def _incremental(prior):
+    broker = dr.Broker()
+    broker["ctx"] = object()
+    return dr.run(dr.get_dependency_graph(both), broker, prior=prior)
+
+
+def test_run_prior_reuses_unchanged():
+    del CALLS[:]
+    first = _incremental(dr.Broker())
+    assert CALLS == [first_parsed, second_parsed, both] or CALLS == [second_parsed, first_parsed, both]
+    assert first[both] == ["a", "b"]
+    assert not first.reused
+
+    del CALLS[:]
+    second = _incremental(first)
+    assert CALLS == []
+    assert second[both] == ["a", "b"]
+    assert second.reused == set([first_parsed, second_parsed, both])
+    assert second.digests[both] == first.digests[both]
+
+    try:
+        CONTENT["second"] = ["c"]
+        del CALLS[:]
+        third = _incremental(second)
+        assert sorted(CALLS, key=dr.get_name) == sorted([second_parsed, both], key=dr.get_name)
+        assert third[both] == ["a", "c"]
+        assert third.reused == set([first_parsed])
+    finally:
+        CONTENT["second"] = ["b"]
+
+
+@incremental(both)
+def both_response(b):
+    CALLS.append(both_response)
+    return make_pass("BOTH", items=b)
+
+
+def _from_snapshot(path):
+    broker = dr.Broker()
+    broker["ctx"] = object()
+    return dr.run(dr.get_dependency_graph(both_response), broker, prior=serde.load_snapshot(path))
+
+
+def test_run_prior_from_snapshot(tmpdir):
+    path = str(tmpdir.join("snapshot"))
+    del CALLS[:]
+    broker = dr.Broker()
+    broker["ctx"] = object()
+    first = dr.run(dr.get_dependency_graph(both_response), broker, prior=dr.Broker())
+    serde.save_snapshot(first, path)
+
+    del CALLS[:]
+    second = _from_snapshot(path)
+    assert CALLS == []
+    assert second.reused == set([both_response])
+    assert second[both_response] == make_pass("BOTH", items=["a", "b"])
+    # the parsers' values couldn't be saved, so they're only evaluated if
+    # something that changed needs them
+    assert both in second.pending
+    assert second[both] == ["a", "b"]
+    assert both in CALLS
+
+    try:
+        CONTENT["second"] = ["c"]
+        del CALLS[:]
+        third = _from_snapshot(path)
+        assert third[both_response] == make_pass("BOTH", items=["a", "c"])
+        assert set(CALLS) == set([first_parsed, second_parsed, both, both_response])
+        assert not third.reused
+    finally:
+        CONTENT["second"] = ["b"]
+
+
+def _common(value):
+    broker = dr.Broker()
+    broker["common"] = value
+    return broker
+
+
+@incremental("common")
+def from_common(common):
+    return common
+
+
+def test_run_prior_needs_digests():
+    # "common" isn't a content provider, so nothing downstream of it has a
+    # digest and it's always evaluated.
+    graph = dr.get_dependency_graph(from_common)
+    prior = dr.run(graph, _common("x"), prior=dr.Broker())
+    assert from_common not in prior.digests
+    broker = dr.run(graph, _common("x"), prior=prior)
+    assert not broker.reused
+    assert broker[from_common] == "x"
+
+
+def test_text_file_provider_digest(tmpdir):
+    tmpdir.join("one").write("a\nb\n")
+    tmpdir.join("two").write("a\nb\n")
+    tmpdir.join("three").write("a\nc\n")
+    root = str(tmpdir)
+    one, two, three = [TextFileProvider(p, root=root) for p in ("one", "two", "three")]
+    assert one.digest == two.digest
+    assert one.digest != three.digest
+
+
+@rule(first_parsed)
+def fails_on_first(a):
+    CALLS.append(fails_on_first)
+    raise ValueError("fails on %s" % a)
+
+
+def _failing(prior):
+    broker = dr.Broker()
+    broker["ctx"] = object()
+    return dr.run(dr.get_dependency_graph(fails_on_first), broker, prior=prior)
+
+
+def test_run_prior_reuses_errors():
+    del CALLS[:]
+    first = _failing(dr.Broker())
+    assert CALLS == [first_parsed, fails_on_first]
+    assert isinstance(first.exceptions[fails_on_first][0], ValueError)
+
+    del CALLS[:]
+    second = _failing(first)
+    assert CALLS == []
+    assert fails_on_first not in second
+    assert fails_on_first in second.reused
+    ex = second.exceptions[fails_on_first][0]
+    assert isinstance(ex, ValueError)
+    assert second.tracebacks[ex] == first.tracebacks[ex]
+
+
+def test_run_prior_errors_from_snapshot(tmpdir):
+    path = str(tmpdir.join("snapshot"))
+    del CALLS[:]
+    serde.save_snapshot(_failing(dr.Broker()), path)
+
+    del CALLS[:]
+    broker = _failing(serde.load_snapshot(path))
+    assert CALLS == []
+    assert fails_on_first in broker.reused
+    ex = broker.exceptions[fails_on_first][0]
+    assert isinstance(ex, serde.SavedError)
+    assert "fails on ['a']" in broker.tracebacks[ex]
+
+    try:
+        CONTENT["first"] = ["c"]
+        del CALLS[:]
+        broker = _failing(serde.load_snapshot(path))
+        assert CALLS == [first_parsed, fails_on_first]
+        assert "fails on ['c']" in str(broker.exceptions[fails_on_first][0])
+    finally:
+        CONTENT["first"] = ["a"]
+
+
+def test_run_prior_evaluates_leaves_without_outcome():
+    # nothing was kept for the rule, so it's evaluated rather than left
+    # pending where nothing would load it
+    prior = _failing(dr.Broker())
+    del prior.exceptions[fails_on_first]
+    del CALLS[:]
+    broker = _failing(prior)
+    assert CALLS == [fails_on_first]
+    assert fails_on_first not in broker.pending
+    assert isinstance(broker.exceptions[fails_on_first][0], ValueError)
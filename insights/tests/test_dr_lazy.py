@@ -0,0 +1,84 @@
+from insights import run
+from insights.core import dr
+from insights.plugins import always_fires, never_fires
+from insights.specs import Specs
+
+
+class lazy_type(dr.ComponentType):
+    pass
+
+
+@lazy_type("host")
+def hostname(host):
+    return host.upper()
+
+
+@lazy_type("os")
+def release(os):
+    return os
+
+
+@lazy_type("host")
+def never_needed(host):
+    raise Exception("never_needed shouldn't be evaluated")
+
+
+@lazy_type("unavailable", optional=[release])
+def optional_release(u, r):
+    return u
+
+
+@lazy_type(hostname, release)
+def facts(h, r):
+    return (h, r)
+
+
+@lazy_type(facts, optional=[optional_release])
+def report(f, o):
+    return f
+
+
+@lazy_type(hostname)
+def broken(h):
+    raise Exception("broken")
+
+
+def host_and_os(lazy=False):
+    broker = dr.Broker(lazy=lazy)
+    broker["host"] = "box"
+    broker["os"] = "rhel"
+    return broker
+
+
+def test_run_lazy():
+    broker = dr.run_lazy([report], host_and_os())
+
+    assert broker[report] == ("BOX", "rhel")
+    assert never_needed not in broker.tried
+    assert never_needed not in broker.exceptions
+    assert set(broker.tried) == set([report, facts, hostname, release, optional_release])
+
+    # release isn't tried for optional_release since "unavailable" isn't there.
+    assert broker.missing_requirements[optional_release] == (["unavailable"], [])
+
+    # components are only tried once
+    broker.resolve(report)
+    broker.resolve(optional_release)
+    assert len(broker.exec_times) == 5
+
+
+def test_lazy_broker_resolves_on_access():
+    broker = host_and_os(lazy=True)
+    assert hostname not in broker
+    assert broker[facts] == ("BOX", "rhel")
+    assert hostname in broker
+    assert broker.get(broken) is None
+    assert broker.get(broken) is None
+    assert len(broker.exceptions[broken]) == 1
+
+
+def test_run_lazy_command():
+    broker = run([always_fires.report, never_fires.report], lazy=True)
+    assert broker[always_fires.report]["pass_key"] == "ALWAYS_FIRES"
+    assert broker[never_fires.report]["reason"] == "MISSING_REQUIREMENTS"
+    assert Specs.redhat_release not in broker.tried
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from insights.core import dr
+
+
+class step(dr.ComponentType):
+    pass
+
+
+@step("left")
+def read_left(left):
+    return left * 2
+
+
+@step("right")
+def read_right(right):
+    return right * 3
+
+
+@step("left", "absent")
+def needs_absent(left, absent):
+    return left
+
+
+@step(read_left)
+def fails(l):
+    raise Exception("fails")
+
+
+@step(fails)
+def after_failure(f):
+    return f
+
+
+@step(read_left, read_right)
+def combined(l, r):
+    return l + r
+
+
+GRAPH = {}
+for _c in (needs_absent, after_failure, combined):
+    GRAPH.update(dr.get_dependency_graph(_c))
+
+
+def broker_with_inputs():
+    broker = dr.Broker()
+    broker["left"] = 1
+    broker["right"] = 10
+    return broker
+
+
+def test_run_parallel_matches_run():
+    serial = dr.run(GRAPH, broker_with_inputs())
+    broker = dr.run_parallel(GRAPH, broker_with_inputs(), max_workers=4)
+
+    assert broker.instances == serial.instances
+    assert broker[combined] == 32
+    assert set(broker.missing_requirements) == set([needs_absent, after_failure])
+    assert list(broker.exceptions) == [fails]
+    assert broker.tracebacks[broker.exceptions[fails][0]]
+    assert set(broker.exec_times) == set(serial.exec_times)
+
+
+def test_run_parallel_observers_follow_dependencies():
+    seen = []
+    broker = broker_with_inputs()
+    broker.add_observer(lambda c, b: seen.append(c), step)
+    dr.run_parallel(GRAPH, broker)
+
+    assert len(seen) == len(set(seen))
+    assert seen.index(read_left) < seen.index(combined)
+    assert seen.index(read_right) < seen.index(combined)
+    assert seen.index(read_left) < seen.index(fails) < seen.index(after_failure)
+
+
+def test_run_parallel_with_pool():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        broker = dr.run_parallel(GRAPH, broker_with_inputs(), pool=pool)
+    assert broker[read_right] == 30
+    assert broker[combined] == 32
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+from insights.core import dr
+
+
+class deferred(dr.ComponentType):
+    pass
+
+
+@deferred("dep1")
+def from_dep1(dep1):
+    return dep1
+
+
+@deferred("common")
+def from_common(common):
+    return common
+
+
+def test_pending_loaded_on_access():
+    loaded = []
+
+    def pending(value):
+        def load():
+            loaded.append(value)
+            return value
+        return load
+
+    broker = dr.Broker()
+    broker.add_pending("dep1", pending(None))
+    broker.add_pending("dep2", pending(2))
+    broker.add_pending("common", pending(3))
+    with pytest.raises(KeyError):
+        broker["common"] = 4
+
+    graph = dr.get_dependency_graph(from_common)
+    graph.update(dr.get_dependency_graph(from_dep1))
+    broker = dr.run(graph, broker)
+    assert broker[from_common] == 3
+    assert from_dep1 in broker.missing_requirements
+    assert "dep1" not in broker
+    assert sorted(loaded, key=str) == [3, None]
+
+    # everything is loaded to list the broker
+    assert set(broker.keys()) == set(["dep2", "common", from_common])
+    assert not broker.pending
+
+
+def test_pending_lock_only_for_pending():
+    waiting = threading.Event()
+    release = threading.Event()
+
+    def load():
+        waiting.set()
+        release.wait(5)
+        return 1
+
+    broker = dr.Broker()
+    broker.add_pending("dep1", load)
+    broker.add_pending("common", lambda: 3)
+    loader = threading.Thread(target=lambda: broker.get("dep1"))
+    loader.start()
+    try:
+        assert waiting.wait(5)
+        # the loader holds the lock, and asking for anything else doesn't wait
+        start = time.time()
+        assert "dep2" not in broker
+        assert broker.get("dep2") is None
+        assert time.time() - start < 1
+    finally:
+        release.set()
+        loader.join(5)
+    # it stays pending until it's loaded, so this waited for it
+    assert "dep1" in broker and broker["dep1"] == 1
+
+
+def test_pending_loaded_concurrently():
+    waiting = threading.Event()
+    release = threading.Event()
+
+    def load():
+        waiting.set()
+        release.wait(5)
+        return 1
+
+    broker = dr.Broker()
+    broker.add_pending("dep1", load)
+    broker.add_pending("common", lambda: 3)
+    loader = threading.Thread(target=lambda: broker.get("dep1"))
+    loader.start()
+    try:
+        assert waiting.wait(5)
+        # another pending component loads while the first one is loading
+        start = time.time()
+        assert broker["common"] == 3
+        assert time.time() - start < 1
+    finally:
+        release.set()
+        loader.join(5)
+    assert broker["dep1"] == 1
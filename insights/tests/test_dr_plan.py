@@ -0,0 +1,61 @@
+from insights.core import dr
+
+
+class planned(dr.ComponentType):
+    pass
+
+
+@planned("name")
+def greeting(name):
+    return "hello " + name
+
+
+@planned("name")
+def length(name):
+    return len(name)
+
+
+@planned(greeting, length)
+def summary(g, n):
+    return (g, n)
+
+
+def named(name="world"):
+    broker = dr.Broker()
+    broker["name"] = name
+    return broker
+
+
+def test_plan_reused_across_brokers():
+    plan = dr.get_plan(summary)
+    assert dr.get_plan(summary) is plan
+    assert plan.order.index(greeting) < plan.order.index(summary)
+
+    deps = set(plan.order[i] for i in plan.dependencies[plan.order.index(summary)])
+    assert deps == set([greeting, length])
+
+    assert dr.run(plan, named())[summary] == ("hello world", 5)
+    assert dr.run(plan, named("dr"))[summary] == ("hello dr", 2)
+
+
+def test_plan_invalidated_by_registry_changes():
+    plan = dr.get_plan(summary)
+    dr.set_enabled(length, False)
+    try:
+        assert plan.stale
+        assert dr.get_plan(summary) is not plan
+        broker = dr.run(plan, named())
+        assert not plan.stale
+        assert length not in broker
+        assert summary in broker.missing_requirements
+    finally:
+        dr.set_enabled(length)
+
+    plan = dr.get_plan(summary)
+
+    @planned("name")
+    def late(name):
+        return name
+
+    assert plan.stale
+    assert dr.run(plan, named())[summary] == ("hello world", 5)
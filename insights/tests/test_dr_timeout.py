@@ -0,0 +1,133 @@
+import os
+import time
+
+from insights.core import dr
+from insights.core.plugins import datasource
+from insights.util import subproc
+
+
+class budgeted(dr.ComponentType):
+    pass
+
+
+class unbudgeted(dr.ComponentType):
+    pass
+
+
+@budgeted("start")
+def sleeper(start):
+    # a component that swallows what it can is still interrupted
+    for _ in range(100):
+        try:
+            time.sleep(0.05)
+        except Exception:
+            pass
+    return start
+
+
+@budgeted(sleeper)
+def after_sleeper(s):
+    return s
+
+
+@unbudgeted("start", optional=[sleeper])
+def optional_sleeper(start, s):
+    return s
+
+
+@datasource("start")
+def resolves_sleeper(broker):
+    # sleeper is only resolved while this is running
+    return broker[sleeper]
+
+
+GRAPH = dr.get_dependency_graph(after_sleeper)
+GRAPH.update(dr.get_dependency_graph(optional_sleeper))
+
+
+def started():
+    broker = dr.Broker()
+    broker["start"] = time.time()
+    return broker
+
+
+def test_component_timeout():
+    dr.set_timeout(sleeper, 0.2)
+    try:
+        assert dr.get_timeout(sleeper) == 0.2
+        assert dr.get_timeout(after_sleeper) is None
+        broker = dr.run(GRAPH, started())
+    finally:
+        dr.set_timeout(sleeper, None)
+
+    assert sleeper not in broker
+    assert isinstance(broker.exceptions[sleeper][0], dr.TimeoutSkip)
+    assert broker.exec_times[sleeper] < 2
+    assert after_sleeper in broker.missing_requirements
+    assert broker[optional_sleeper] is None
+
+
+def test_type_timeout_parallel():
+    dr.set_timeout(budgeted, 0.2)
+    try:
+        assert dr.get_timeout(after_sleeper) == 0.2
+        start = time.time()
+        broker = dr.run_parallel(GRAPH, started())
+        elapsed = time.time() - start
+    finally:
+        dr.set_timeout(budgeted, None)
+
+    assert isinstance(broker.exceptions[sleeper][0], dr.TimeoutSkip)
+    assert after_sleeper in broker.missing_requirements
+    assert broker[optional_sleeper] is None
+    assert elapsed < 2
+
+
+def test_timeout_lazy_dependency():
+    dr.set_timeout(resolves_sleeper, 0.2)
+    try:
+        start = time.time()
+        broker = dr.run_lazy([resolves_sleeper], started())
+        elapsed = time.time() - start
+    finally:
+        dr.set_timeout(resolves_sleeper, None)
+
+    ex = broker.exceptions[resolves_sleeper][0]
+    assert isinstance(ex, dr.TimeoutSkip) and ex.component is resolves_sleeper
+    assert sleeper not in broker.exceptions
+    assert resolves_sleeper not in broker and sleeper not in broker
+    assert elapsed < 2
+
+
+@budgeted("pidfile")
+def runs_command(pidfile):
+    # the shell leaves its pid behind and becomes the sleep
+    return subproc.call([["sh", "-c", "echo $$ > %s; exec sleep 30" % pidfile]], timeout=60)
+
+
+def running(pid):
+    try:
+        with open("/proc/%s/stat" % pid) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except IOError:
+        return False
+
+
+def test_timeout_kills_commands(tmpdir):
+    pidfile = str(tmpdir.join("pid"))
+    broker = dr.Broker()
+    broker["pidfile"] = pidfile
+    dr.set_timeout(runs_command, 0.5)
+    try:
+        broker = dr.run(dr.get_dependency_graph(runs_command), broker)
+    finally:
+        dr.set_timeout(runs_command, None)
+
+    assert isinstance(broker.exceptions[runs_command][0], dr.TimeoutSkip)
+    assert os.path.exists(pidfile)
+    with open(pidfile) as f:
+        pid = int(f.read())
+    deadline = time.time() + 5
+    while running(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not running(pid)
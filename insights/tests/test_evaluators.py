@@ -126,6 +126,27 @@ def test_insights_evaluator_attrs_serial():
         assert result["system"]["metadata"]["release"] == "Red Hat Enterprise Linux Server release 7.4 (Maipo)"
 
 
+def test_single_evaluator_lazy():
+    broker = dr.Broker()
+    result1 = SingleEvaluator(broker).process(dr.get_dependency_graph(report))
+    result2 = SingleEvaluator(dr.Broker(), lazy=True).process(dr.get_dependency_graph(report))
+    assert result1["reports"] == result2["reports"]
+
+
+def test_insights_evaluator_attrs_lazy_process():
+    broker = dr.Broker()
+    broker[Specs.hostname] = context_wrap("www.example.com")
+    broker[Specs.machine_id] = context_wrap("12345")
+    broker[Specs.redhat_release] = context_wrap("Red Hat Enterprise Linux Server release 7.4 (Maipo)")
+    e = InsightsEvaluator(broker, lazy=True)
+    e.process(components)
+    result = e.get_response()
+    assert result["system"]["hostname"] == "www.example.com"
+    assert result["system"]["system_id"] == "12345"
+    assert [r["rule_id"] for r in result["reports"]] == ["test_evaluators|FAIL", "test_evaluators|FAIL2"]
+    assert boom in broker.exceptions
+
+
 def test_insights_evaluator_attrs_serial_process():
     broker = dr.Broker()
     broker[Specs.hostname] = context_wrap("www.example.com")
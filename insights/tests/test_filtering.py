@@ -0,0 +1,142 @@
+import pytest
+
+from insights import add_filter
+from insights.core import blacklist
+from insights.core.context import HostContext
+from insights.core.spec_factory import SAFE_ENV, SpecSet, TextFileProvider, simple_file
+from insights.util import streams
+from insights.util.filtering import FilterNotSupported, LineFilter
+from insights.util.subproc import Pipeline
+
+CONTENT = (
+    b"alpha one\n"
+    b"beta secret=1 two\n"
+    b"\n"
+    b"gamma a.b three\r\n"
+    b"delta \xc3\xa9t\xc3\xa9 four\n"
+    b"password: alpha"
+)
+
+
+class Specs(SpecSet):
+    filtered = simple_file("/etc/filtering_test", filterable=True)
+
+
+add_filter(Specs.filtered, ["alpha", "gamma", u"\xe9t\xe9", "a.b"])
+
+
+@pytest.fixture
+def path(tmpdir):
+    p = tmpdir.join("data")
+    p.write_binary(CONTENT)
+    return str(p)
+
+
+def provider(path, ds=None):
+    return TextFileProvider(path, root="/", ds=ds, ctx=HostContext())
+
+
+def pipeline(p):
+    return Pipeline(*p.create_args(), env=SAFE_ENV)(keep_rc=True)
+
+
+@pytest.mark.parametrize("ds", [None, Specs.filtered])
+@pytest.mark.parametrize("patterns", [set(), set(["secret", "password"]), set(["nomatch"])])
+@pytest.mark.parametrize("keywords", [set(), set(["alpha", "a/b", u"\xe9"])])
+def test_matches_pipeline(path, ds, patterns, keywords, monkeypatch, tmpdir):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", patterns)
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", keywords)
+    p = provider(path, ds)
+    if not p.create_args():
+        return
+
+    rc, expected = pipeline(p)
+    assert p._filter() == (rc, expected)
+
+    assert p.load() == expected.decode("utf-8", "ignore").splitlines()
+    assert p.rc == rc
+
+    with streams.connect(*p.create_args(), env=SAFE_ENV) as s:
+        assert list(p.stream()) == [l.rstrip("\n") for l in s]
+
+    dst = str(tmpdir.join("out", "data"))
+    p.write(dst)
+    with open(dst, "rb") as f:
+        assert f.read() == expected
+
+
+def test_nothing_selected(tmpdir, monkeypatch):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", set(["secret"]))
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", set())
+    p = tmpdir.join("secrets")
+    p.write("secret one\nsecret two\n")
+    p = provider(str(p))
+    assert pipeline(p) == (1, b"")
+    assert p.load() == []
+    assert p.rc == 1
+
+
+def test_invalid_utf8(tmpdir, monkeypatch):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", set(["secret"]))
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", set())
+    p = tmpdir.join("latin1")
+    p.write_binary(b"caf\xe9 ok\nsecret \xe9\n\xff")
+    p = provider(str(p))
+    rc, expected = pipeline(p)
+    assert p.load() == expected.decode("utf-8", "ignore").splitlines() == [u"caf ok", u""]
+
+
+def test_falls_back(path, monkeypatch):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", set())
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", set(["al.ha"]))
+    p = provider(path)
+    assert p._filter() is None
+    assert p.load() == pipeline(p)[1].decode("utf-8", "ignore").splitlines()
+
+
+def test_unsupported():
+    with pytest.raises(FilterNotSupported):
+        LineFilter(keywords=["pass.*"])
+    with pytest.raises(FilterNotSupported):
+        LineFilter(filters=["a", ""])
+    with pytest.raises(FilterNotSupported):
+        LineFilter(patterns=["a"])(b"a\0b\n")
+    assert not LineFilter()
+
+
+def test_keywords_without_grep():
+    f = LineFilter(keywords=["b"])
+    assert f(b"abc\nb") == (0, b"akeywordc\nkeyword")
+
+
+def test_write_and_stream_line_by_line(path, monkeypatch, tmpdir):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", set(["secret"]))
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", set(["alpha"]))
+    p = provider(path, Specs.filtered)
+    rc, expected = pipeline(p)
+
+    def whole(self):
+        raise AssertionError("read the whole file")
+
+    monkeypatch.setattr(TextFileProvider, "_filter", whole)
+    dst = str(tmpdir.join("out"))
+    p.write(dst)
+    with open(dst, "rb") as f:
+        assert f.read() == expected
+    assert list(p.stream()) == expected.decode("utf-8", "ignore").splitlines()
+
+
+def test_binary_uses_pipeline(tmpdir, monkeypatch):
+    monkeypatch.setattr(blacklist, "_PATTERN_FILTERS", set(["secret"]))
+    monkeypatch.setattr(blacklist, "_KEYWORD_FILTERS", set())
+    src = tmpdir.join("binary")
+    src.write_binary(b"one\nsecret\ntwo \0 three\nfour\n")
+    p = provider(str(src))
+    rc, expected = pipeline(p)
+
+    dst = str(tmpdir.join("out"))
+    p.write(dst)
+    with open(dst, "rb") as f:
+        assert f.read() == expected
+    with streams.connect(*p.create_args(), env=SAFE_ENV) as s:
+        assert list(p.stream()) == [l.rstrip("\n") for l in s]
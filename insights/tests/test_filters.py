@@ -1,5 +1,6 @@
+import json
 from collections import defaultdict
-from insights.core import filters
+from insights.core import dr, filters
 
 from insights.parsers.ps import PsAux, PsAuxcww
 from insights.specs import Specs
@@ -20,6 +21,10 @@ def setup_function(func):
     if func is test_filter_dumps_loads:
         filters.add_filter(Specs.ps_aux, "COMMAND")
 
+    if func in (test_compile_index, test_index_dumps_loads, test_stale_index):
+        filters.add_filter(Specs.ps_aux, "COMMAND")
+        filters.add_filter(DefaultSpecs.ps_aux, "MEM")
+
 
 def teardown_function(func):
     if func is test_get_filter:
@@ -38,6 +43,11 @@ def teardown_function(func):
     if func is test_add_filter_to_parser_patterns_list:
         del filters.FILTERS[Specs.ps_aux]
 
+    if func in (test_compile_index, test_index_dumps_loads, test_stale_index):
+        del filters.FILTERS[Specs.ps_aux]
+        del filters.FILTERS[DefaultSpecs.ps_aux]
+        filters._invalidate()
+
 
 @pytest.mark.skipif(sys.version_info < (2, 7), reason='Playbook verifier code uses oyaml library which is incompatable with this test')
 def test_filter_dumps_loads():
@@ -115,3 +125,47 @@ def test_add_filter_exception_raw():
 def test_add_filter_exception_empty():
     with pytest.raises(Exception):
         filters.add_filter(Specs.ps_aux, "")
+
+
+def test_compile_index():
+    filters.compile_index()
+    assert filters.get_filters(DefaultSpecs.ps_aux) >= set(["COMMAND", "MEM"])
+    assert "COMMAND" in filters.get_filters(Specs.ps_aux)
+    assert "MEM" not in filters.get_filters(Specs.ps_aux)
+    assert filters.get_matcher(DefaultSpecs.ps_aux).search("USER MEM")
+    assert filters.get_matcher(Specs.ps_auxcww) is None
+    assert list(filters.apply_filters(Specs.ps_aux, ["COMMAND", "MEM"])) == ["COMMAND"]
+
+    filters.add_filter(PsAux, "bash")
+    assert filters._INDEX is None
+    assert filters.get_filters(DefaultSpecs.ps_aux) >= set(["COMMAND", "MEM", "bash"])
+    assert "bash" in filters.get_filters(Specs.ps_aux)
+
+
+def test_index_dumps_loads():
+    expected = filters.get_filters(DefaultSpecs.ps_aux)
+    s = filters.dumps_index()
+    filters._invalidate()
+    assert filters.loads_index(s)
+    assert filters._INDEX is not None
+    assert filters.get_filters(DefaultSpecs.ps_aux) == expected
+    assert filters.get_filters(Specs.ps_auxcww) == set()
+
+
+def test_stale_index():
+    s = filters.dumps_index()
+
+    # the filters changed since the index was compiled
+    filters.add_filter(Specs.ps_aux, "bash")
+    assert not filters.loads_index(s)
+    assert filters._INDEX is None
+    assert "bash" in filters.get_filters(DefaultSpecs.ps_aux)
+    filters.FILTERS[Specs.ps_aux].discard("bash")
+    filters._invalidate()
+
+    # datasources the index doesn't know about are resolved from the filters
+    d = json.loads(s)
+    del d["filters"][dr.get_name(DefaultSpecs.ps_aux)]
+    assert filters.loads_index(json.dumps(d))
+    assert DefaultSpecs.ps_aux not in filters._INDEX
+    assert filters.get_filters(DefaultSpecs.ps_aux) >= set(["COMMAND", "MEM"])
@@ -0,0 +1,53 @@
+import time
+
+from insights.core import dr
+from insights.core.context import HostContext
+from insights.core.governor import Governor, get_governor, set_governor
+from insights.core.plugins import datasource
+from insights.core.spec_factory import RegistryPoint, SpecSet
+from insights.util import subproc
+
+
+class Specs(SpecSet):
+    essential = RegistryPoint()
+    optional = RegistryPoint()
+
+
+class DefaultSpecs(Specs):
+    @datasource(HostContext)
+    def essential(broker):
+        return "essential"
+
+    @datasource(HostContext)
+    def optional(broker):
+        return "optional"
+
+
+def run_governed(governor):
+    broker = dr.Broker()
+    broker[HostContext] = HostContext()
+    set_governor(governor)
+    try:
+        assert subproc.get_command_limits() is governor.limits
+        return dr.run([Specs.essential, Specs.optional], broker=broker)
+    finally:
+        set_governor(None)
+
+
+def test_before_deadline():
+    governor = Governor(deadline=600)
+    broker = run_governed(governor)
+    assert broker[Specs.essential] == "essential"
+    assert broker[Specs.optional] == "optional"
+    assert governor.stats() == {"deadline": 600, "skipped": []}
+
+
+def test_after_deadline():
+    governor = Governor(deadline=1, essential=[dr.get_name(Specs.essential)])
+    governor.expires = time.time() - 1
+    broker = run_governed(governor)
+    assert broker[Specs.essential] == "essential"
+    assert Specs.optional not in broker
+    assert governor.stats()["skipped"] == [dr.get_name(DefaultSpecs.optional)]
+    assert get_governor() is None
+    assert subproc.get_command_limits() is None
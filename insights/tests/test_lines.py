@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import datetime
+import pickle
+
+import pytest
+
+from insights.core import CommandParser, LogFileOutput, Syslog, YAMLParser
+from insights.core.context import HostContext
+from insights.core.plugins import ContentException
+from insights.core.spec_factory import TextFileProvider
+from insights.parsers.lspci import LsPciVmmkn
+from insights.tests import context_wrap
+from insights.tests.test_syslog import MSGINFO
+from insights.util import lines as lines_mod
+from insights.util.lines import MappedLines, map_lines
+
+CONTENT = b"first line\n\nsecond \xc3\xa9t\xc3\xa9 line\ninvalid \xff byte\nlast line without newline"
+
+
+def write(tmpdir, data, name="data"):
+    p = tmpdir.join(name)
+    p.write_binary(data)
+    return str(p)
+
+
+def expected(path):
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        return [l.rstrip("\n") for l in f]
+
+
+@pytest.mark.parametrize("data", [CONTENT, CONTENT + b"\n", b"\n", b"\n\n", b"one"])
+def test_same_as_text_mode(tmpdir, data):
+    path = write(tmpdir, data)
+    exp = expected(path)
+    assert list(MappedLines(path)) == exp
+
+    lines = MappedLines(path)
+    assert len(lines) == len(exp)
+    assert [lines[i] for i in range(-len(exp), len(exp))] == exp + exp
+    assert list(reversed(lines)) == exp[::-1]
+    assert list(lines) == exp
+    assert lines == exp
+    with pytest.raises(IndexError):
+        lines[len(exp)]
+
+
+def test_slices(tmpdir):
+    path = write(tmpdir, CONTENT)
+    exp = expected(path)
+    lines = MappedLines(path)
+    for s in [slice(1, None), slice(None, -1), slice(2, 4), slice(3, 1), slice(None, None, -1), slice(0, None, 2)]:
+        assert list(lines[s]) == exp[s]
+    assert lines[1:][1:3] == exp[1:][1:3]
+    assert list(reversed(lines[1:4])) == exp[1:4][::-1]
+    assert lines[1:] + ["x"] == exp[1:] + ["x"]
+    assert ["x"] + lines[:1] == ["x"] + exp[:1]
+    assert lines.index("") == 1
+    assert "first line" in lines and "first" not in lines
+
+
+def test_search(tmpdir):
+    path = write(tmpdir, CONTENT)
+    exp = expected(path)
+    lines = MappedLines(path)
+    for s in ["line", u"\xe9t\xe9", "\udcff", "nowhere", "", "line\nsecond"]:
+        assert list(lines.search(s)) == [l for l in exp if s in l]
+        assert list(lines.search(s, reverse=True)) == [l for l in exp if s in l][::-1]
+        assert list(lines[2:4].search(s)) == [l for l in exp[2:4] if s in l]
+        assert list(lines[2:4].search(s, True)) == [l for l in exp[2:4] if s in l][::-1]
+
+
+def test_pickle(tmpdir):
+    path = write(tmpdir, CONTENT)
+    lines = MappedLines(path)
+    assert pickle.loads(pickle.dumps(lines)) == lines
+    assert pickle.loads(pickle.dumps(lines[1:3])) == lines[1:3]
+
+
+def test_map_lines(tmpdir, monkeypatch):
+    path = write(tmpdir, CONTENT)
+    assert map_lines(path) is None
+    assert map_lines(path, threshold=0) == expected(path)
+    assert map_lines(write(tmpdir, b"", "empty"), threshold=0) is None
+    assert map_lines(write(tmpdir, b"a\r\nb\n", "crlf"), threshold=0) is None
+
+    monkeypatch.setattr(lines_mod, "THRESHOLD", 1)
+    p = TextFileProvider(path, root="/", ctx=HostContext())
+    assert isinstance(p.content, MappedLines)
+    assert p.content == expected(path)
+    assert list(p.stream()) == expected(path)
+
+    content = p.content
+    p.release()
+    assert content.closed
+    assert p.content == expected(path) and not p.content.closed
+
+
+def test_close(tmpdir):
+    path = write(tmpdir, CONTENT)
+    with MappedLines(path) as lines:
+        view = lines[1:]
+        assert view[0] == ""
+    assert lines.closed and view.closed
+    with pytest.raises(ValueError):
+        lines[0]
+    lines.close()
+
+
+class FakeLog(LogFileOutput):
+    pass
+
+
+FakeLog.token_scan("has_wrapper", "Wrapper")
+FakeLog.keep_scan("crond", ["CROND", "sa1"])
+FakeLog.keep_scan("last_yum", "yum", num=1, reverse=True)
+FakeLog.last_scan("last_root", ["root", "LIST"], check=any)
+
+
+def test_log_file_output(tmpdir):
+    path = write(tmpdir, MSGINFO.encode("utf-8"))
+    listed = FakeLog(context_wrap(MSGINFO))
+    mapped = FakeLog(context_wrap(map_lines(path, threshold=0)))
+    assert isinstance(mapped.lines, MappedLines)
+
+    for attr in ["has_wrapper", "crond", "last_yum", "last_root"]:
+        assert getattr(mapped, attr) == getattr(listed, attr)
+    for s in ["CROND", ["yum", "Installed"], "nothing", ["lynx", "sos"]]:
+        for reverse in (False, True):
+            assert mapped.get(s, reverse=reverse) == listed.get(s, reverse=reverse)
+            assert mapped.get(s, check=any, num=1, reverse=reverse) == listed.get(s, check=any, num=1, reverse=reverse)
+        assert (s in mapped) == (s in listed)
+    after = datetime.datetime(1900, 5, 9)
+    assert list(mapped.get_after(after)) == list(listed.get_after(after))
+
+
+def test_syslog(tmpdir):
+    path = write(tmpdir, MSGINFO.encode("utf-8"))
+    listed = Syslog(context_wrap(MSGINFO))
+    mapped = Syslog(context_wrap(map_lines(path, threshold=0)))
+    for proc in ["crontab", "systemd", "CROND", "", "missing"]:
+        assert list(mapped.get_logs_by_procname(proc)) == list(listed.get_logs_by_procname(proc))
+    assert mapped.get("yum") == listed.get("yum")
+
+
+class FakeCommand(CommandParser):
+    def parse_content(self, content):
+        self.first = content[0]
+        self.count = len(content)
+
+
+def test_command_parser(tmpdir):
+    mapped = FakeCommand(context_wrap(map_lines(write(tmpdir, b"one\ntwo\n"), threshold=0)))
+    assert (mapped.first, mapped.count) == ("one", 2)
+    with pytest.raises(ContentException):
+        FakeCommand(context_wrap(map_lines(write(tmpdir, b"one\nMissing Dependencies: foo\n", "bad"), threshold=0)))
+
+
+class FakeYaml(YAMLParser):
+    pass
+
+
+def test_yaml_parser(tmpdir):
+    mapped = FakeYaml(context_wrap(map_lines(write(tmpdir, b"a: 1\nb:\n  - c\n"), threshold=0)))
+    assert mapped.data == {"a": 1, "b": ["c"]}
+
+
+def test_content_not_changed(tmpdir):
+    content = map_lines(write(tmpdir, b"Slot:\t00:00.0\nClass:\tHost bridge\n\n\n"), threshold=0)
+    lspci = LsPciVmmkn(context_wrap(content))
+    assert lspci[0]["Slot"] == "00:00.0"
+    assert len(content) == 4
+
+    listed = ["Slot:\t00:00.0", "", ""]
+    LsPciVmmkn(context_wrap(listed))
+    assert listed == ["Slot:\t00:00.0", "", ""]
@@ -0,0 +1,140 @@
+import json
+import sys
+
+from six import StringIO
+
+from insights import rule, make_fail
+from insights.core import dr, manifest
+from insights.core.plugins import component
+
+
+@component()
+def one():
+    return 1
+
+
+@component(one)
+def two(o):
+    return o + 1
+
+
+@rule(two, optional=[one], tags=["fast"])
+def report(t, o):
+    return make_fail("MANIFEST", value=t)
+
+
+@rule(one)
+def untagged(o):
+    return make_fail("UNTAGGED")
+
+
+MODULE = __name__
+NAMES = [dr.get_name(c) for c in (one, two, report, untagged)]
+
+
+def setup_function(func):
+    manifest.build([MODULE])
+
+
+def teardown_function(func):
+    manifest.MANIFEST.clear()
+    manifest.PACKAGES.clear()
+
+
+def test_entry():
+    e = manifest.MANIFEST[dr.get_name(report)]
+    assert e["module"] == MODULE
+    assert e["type"] == "insights.core.plugins.rule"
+    assert e["tags"] == ["fast"]
+    assert e["dependencies"] == sorted([dr.get_name(one), dr.get_name(two)])
+
+
+def test_roundtrip():
+    stream = StringIO()
+    manifest.dump(stream)
+    doc = json.loads(stream.getvalue())
+    assert doc["packages"] == [MODULE]
+
+    manifest.MANIFEST.clear()
+    manifest.PACKAGES.clear()
+    stream.seek(0)
+    assert manifest.load(stream)
+    assert manifest.covers(MODULE)
+    assert not manifest.covers("insights.parsers")
+    for name in NAMES:
+        assert name in manifest.MANIFEST
+
+
+def test_select():
+    assert manifest.select([MODULE]) == sorted(NAMES)
+    assert manifest.select([MODULE], lambda e: "fast" in e["tags"]) == [dr.get_name(report)]
+    assert manifest.select(["insights.nothing"]) == []
+
+
+def test_dependency_graph():
+    name = dr.get_name(report)
+    graph = manifest.get_dependency_graph(name)
+    expected = dr.get_dependency_graph(report)
+    assert graph == dict((dr.get_name(k), set(dr.get_name(d) for d in v)) for k, v in expected.items())
+    assert manifest.get_modules([name]) == [MODULE]
+
+
+def test_load_components():
+    assert manifest.load_components([dr.get_name(report), dr.get_name(one)]) == [report, one]
+
+
+def test_load_component():
+    name = dr.get_name(report)
+    assert manifest.load_component(name) is report
+    assert manifest.load_component(name, [MODULE]) is report
+    assert manifest.load_component(name, ["insights.parsers"]) is None
+    assert manifest.load_component("insights.nothing.here") is None
+
+
+def test_stale():
+    stream = StringIO()
+    manifest.dump(stream)
+    doc = json.loads(stream.getvalue())
+    assert doc["fingerprints"] == {MODULE: manifest.fingerprint(MODULE)}
+
+    doc["fingerprints"][MODULE] = "changed"
+    assert not manifest.loads(json.dumps(doc))
+    assert not manifest.MANIFEST and not manifest.PACKAGES
+
+    del doc["fingerprints"]
+    assert not manifest.loads(json.dumps(doc))
+
+
+def test_fingerprint(tmpdir, monkeypatch):
+    pkg = tmpdir.mkdir("fingerprinted")
+    pkg.join("__init__.py").write("")
+    pkg.join("mod.py").write("x = 1\n")
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.setattr(manifest, "_fingerprints", {})
+    before = manifest.fingerprint("fingerprinted")
+    assert before is not None
+
+    pkg.join("mod.py").write("x = 10\n")
+    manifest._fingerprints.clear()
+    assert manifest.fingerprint("fingerprinted") != before
+    assert manifest.fingerprint("insights.nothing") is None
+
+
+def test_cat_loads_plugins_without_manifest(monkeypatch):
+    from insights.tools import cat
+
+    loaded = []
+    ran = []
+    monkeypatch.setattr(manifest, "load", lambda: True)
+    monkeypatch.setattr(cat, "load_default_plugins", lambda: loaded.append(True))
+    monkeypatch.setattr(cat, "run", lambda spec, **kwargs: ran.append(spec))
+    monkeypatch.setattr(sys, "argv", ["insights-cat", dr.get_name(two)])
+
+    # the spec implementations aren't covered, so everything is loaded
+    cat.main()
+    assert loaded == [True] and ran == [two]
+
+    del loaded[:]
+    manifest.PACKAGES.add("insights.specs")
+    cat.main()
+    assert loaded == [] and ran == [two, two]
@@ -0,0 +1,124 @@
+import pytest
+
+from insights.core import CommandParser, Parser
+from insights.core.context import HostContext
+from insights.core.plugins import ContentException
+from insights.core.spec_factory import CommandOutputProvider
+from insights.parsers.installed_rpms import InstalledRpms
+from insights.parsers.ls_var_log import LsVarLog
+from insights.parsers.lsof import Lsof
+from insights.parsers.netstat import Netstat
+from insights.parsers.ps import PsAuxww, PsEo
+from insights.parsers.tests.test_installed_rpms import ERROR_DB, RPMS_JSON, RPMS_LINE
+from insights.parsers.tests.test_ls_var_log import LS_1
+from insights.parsers.tests.test_lsof import LSOF, LSOF_GOOD_V1
+from insights.parsers.tests.test_netstat import NETSTAT
+from insights.parsers.tests.test_ps import PS_AUXWW_WITH_LATE_HEADER, PS_AUXWWW, PS_EO_NORMAL
+from insights.tests import context_wrap
+
+
+class StreamOnly(object):
+    """ A context that fails if a parser asks it for the list of lines. """
+    def __init__(self, content):
+        self._lines = context_wrap(content)
+        self.path = self.relative_path = self._lines.path
+
+    @property
+    def content(self):
+        raise AssertionError("content read by a streaming parser")
+
+    def stream(self):
+        return iter(self._lines.content)
+
+
+def listed(cls):
+    return type(cls.__name__, (cls,), {"streaming": False})
+
+
+class Lines(Parser):
+    streaming = True
+
+    def parse_content(self, content):
+        self.was_list = isinstance(content, list)
+        self.lines = list(content)
+
+
+class Command(CommandParser):
+    streaming = True
+
+    def parse_content(self, content):
+        self.lines = list(content)
+
+
+def test_streaming_parser_gets_iterator():
+    p = Lines(StreamOnly("one\ntwo"))
+    assert not p.was_list
+    assert p.lines == ["one", "two"]
+    assert listed(Lines)(context_wrap("one\ntwo")).was_list
+
+
+@pytest.mark.parametrize("content", [
+    "Command not found: foo",
+    "one\nMissing Dependencies: foo\nthree",
+    "one\ntwo\nthree\nMISSING DEPENDENCIES: foo",
+])
+def test_command_parser_bad_lines(content):
+    with pytest.raises(ContentException) as ex:
+        Command(StreamOnly(content))
+    assert str(ex.value) == "Command: " + content.splitlines()[0]
+    with pytest.raises(ContentException):
+        listed(Command)(context_wrap(content))
+
+
+def test_command_parser_good_lines():
+    # bad single lines are fine in longer output
+    assert Command(StreamOnly("command not found\ntwo")).lines == ["command not found", "two"]
+    assert Command(StreamOnly("")).lines == []
+    p = Command(StreamOnly("one"), extra_bad_lines=["two"])
+    assert p.lines == ["one"]
+    assert "_extra_bad_lines" not in vars(p)
+    with pytest.raises(ContentException):
+        Command(StreamOnly("one\nTwo"), extra_bad_lines=["two"])
+
+
+@pytest.mark.parametrize("cls, content, attrs", [
+    (InstalledRpms, RPMS_LINE, ["packages", "errors", "unparsed"]),
+    (InstalledRpms, RPMS_JSON, ["packages", "errors", "unparsed"]),
+    (InstalledRpms, ERROR_DB, ["packages", "errors", "unparsed"]),
+    (PsAuxww, PS_AUXWWW, ["data", "running", "cmd_names", "services", "pid_info"]),
+    (PsAuxww, PS_AUXWW_WITH_LATE_HEADER, ["data", "services"]),
+    (PsEo, PS_EO_NORMAL, ["data", "pid_info"]),
+    (Netstat, NETSTAT, ["data", "lines", "datalist"]),
+    (LsVarLog, LS_1, ["listings"]),
+])
+def test_same_as_listed(cls, content, attrs):
+    streamed = cls(StreamOnly(content))
+    expected = listed(cls)(context_wrap(content))
+    for attr in attrs:
+        assert getattr(streamed, attr) == getattr(expected, attr)
+
+
+class AllLsof(Lsof):
+    pass
+
+
+ListedLsof = listed(AllLsof)
+for cls in (AllLsof, ListedLsof):
+    cls.collect("rows", lambda row: True)
+
+
+@pytest.mark.parametrize("content", [LSOF, LSOF_GOOD_V1])
+def test_lsof(content):
+    rows = AllLsof(StreamOnly(content)).rows
+    assert rows and rows == ListedLsof(context_wrap(content)).rows
+
+
+def test_command_streamed_once(tmpdir, monkeypatch):
+    count = tmpdir.join("count")
+    monkeypatch.setenv("COUNT_FILE", str(count))
+    cmd = "/bin/sh -c 'echo run >> \"$COUNT_FILE\"; echo one; echo two'"
+    provider = CommandOutputProvider(cmd, HostContext(), inherit_env=["COUNT_FILE"])
+    assert Command(provider).lines == ["one", "two"]
+    assert provider.content == ["one", "two"]
+    assert Command(provider).lines == ["one", "two"]
+    assert count.read() == "run\n"
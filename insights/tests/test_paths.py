@@ -0,0 +1,107 @@
+import os
+from glob import glob
+
+import pytest
+
+from insights.core import dr
+from insights.core.context import HostArchiveContext, HostContext
+from insights.core.hydration import create_context, get_all_files
+from insights.core.plugins import datasource
+from insights.core.spec_factory import SpecSet, foreach_collect, glob_file
+from insights.util import paths as paths_mod
+from insights.util.paths import PathIndex, PathResolver
+
+
+@pytest.fixture
+def tree(tmpdir):
+    for name in ["a/x.conf", "a/y.conf", "a/.hidden.conf", "a/sub/z.conf", "b/x.conf", "b/x.txt",
+                 "c.d/1.conf", "c.d/2.conf", ".dot/x.conf"]:
+        tmpdir.join(name).ensure()
+    tmpdir.mkdir("empty")
+    os.symlink(str(tmpdir.join("a")), str(tmpdir.join("link")))
+    os.symlink(str(tmpdir.join("missing")), str(tmpdir.join("dangling")))
+    return str(tmpdir)
+
+
+PATTERNS = [
+    "*", "*/*.conf", "a/*", "a/.*", "*/x.*", "[ab]/x.conf", "?.d/*", "a/sub/*.conf", "*/sub/z.conf",
+    "link/*.conf", "dangling", "missing/*", "a/x.conf", "a/nothing", "*/", "a/", "*/*/*", ".*/*",
+    "empty/*", "c.d/[!1].conf",
+]
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_same_as_glob(tree, pattern):
+    pattern = os.path.join(tree, pattern)
+    for resolver in (PathResolver(), PathIndex(tree)):
+        assert resolver.glob(pattern) == glob(pattern)
+        # and again from what's been listed
+        assert resolver.glob(pattern) == glob(pattern)
+
+
+@pytest.mark.parametrize("cls", [PathResolver, PathIndex])
+def test_checks(tree, cls):
+    resolver = PathResolver() if cls is PathResolver else PathIndex(tree)
+    resolver.glob(os.path.join(tree, "*"))
+    for name in ["", "a", "a/x.conf", "a/sub/z.conf", "link", "link/x.conf", "dangling", "nothing",
+                 "nothing/x.conf", "a/x.conf/y"]:
+        path = os.path.join(tree, name)
+        assert resolver.isdir(path) == os.path.isdir(path)
+        assert resolver.lexists(path) == os.path.lexists(path)
+        assert resolver.exists(path) == os.path.exists(path)
+        assert resolver.realpath(path) == os.path.realpath(path)
+        assert resolver.readable(path) == os.access(path, os.R_OK)
+
+
+def test_index_without_syscalls(tree, monkeypatch):
+    index = PathIndex(tree)
+    assert index.files == list(get_all_files(tree))
+    pattern = os.path.join(tree, "[abc]*/*.conf")
+    paths = [os.path.join(tree, p) for p in ["a/x.conf", "a/sub", "nothing", "nothing/x.conf", "c.d/3.conf"]]
+    expected = glob(pattern), [(os.path.exists(p), os.path.isdir(p), os.path.realpath(p)) for p in paths]
+
+    def fail(*args):
+        raise AssertionError("filesystem accessed")
+
+    for name in ["lexists", "exists", "isdir", "realpath"]:
+        monkeypatch.setattr(os.path, name, fail)
+    monkeypatch.setattr(os, "scandir", fail)
+    assert (index.glob(pattern), [(index.exists(p), index.isdir(p), index.realpath(p)) for p in paths]) == expected
+
+
+def test_create_context(tree):
+    ctx = create_context(tree, HostArchiveContext)
+    assert isinstance(ctx.path_resolver, PathIndex)
+    assert ctx.all_files == list(get_all_files(tree))
+
+
+@datasource(HostContext)
+def dirs(broker):
+    return ["a", "b", "nothing"]
+
+
+class Specs(SpecSet):
+    confs = glob_file(["/a/*.conf", "/*/x.conf", "/link/*.conf"])
+    each = foreach_collect(dirs, "/%s/*.conf")
+
+
+def test_shared_listings(tree, monkeypatch):
+    listed = []
+    scan = paths_mod._scan
+
+    def counting_scan(dirname):
+        listed.append(dirname)
+        return scan(dirname)
+
+    monkeypatch.setattr(paths_mod, "_scan", counting_scan)
+
+    broker = dr.Broker()
+    broker[HostContext] = HostContext(root=tree)
+    broker = dr.run([Specs.confs, dirs, Specs.each], broker=broker)
+
+    expected = []
+    for pattern in Specs.confs.patterns:
+        expected.extend(sorted(glob(tree + pattern)))
+    assert [p.path for p in broker[Specs.confs]] == expected
+    assert sorted(p.relative_path for p in broker[Specs.each]) == ["a/x.conf", "a/y.conf", "b/x.conf"]
+    assert len(listed) == len(set(listed))
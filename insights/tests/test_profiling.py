@@ -0,0 +1,103 @@
+import json
+import os
+
+from insights import dr, parser, rule, make_fail, run
+from insights.core import Parser
+from insights.core.plugins import datasource
+from insights.core.profiling import Profiler
+from insights.core.spec_factory import DatasourceProvider
+
+
+class Ctx(object):
+    pass
+
+
+@datasource(Ctx, multi_output=True)
+def many(broker):
+    return [DatasourceProvider("one", relative_path="/a"), DatasourceProvider("two", relative_path="/b")]
+
+
+@parser(many)
+class ManyParser(Parser):
+    def parse_content(self, content):
+        self.value = content
+
+
+@rule(ManyParser)
+def report(ps):
+    return make_fail("PROFILED", values=[p.value for p in ps])
+
+
+def profiled_broker(**kwargs):
+    broker = dr.Broker()
+    broker[Ctx] = Ctx()
+    broker.profiler = Profiler(**kwargs)
+    return dr.run(dr.get_dependency_graph(report), broker=broker)
+
+
+def test_spans():
+    broker = profiled_broker()
+    spans = broker.profiler.spans
+    names = [dr.get_name(s.component) for s in spans]
+    assert names.count(dr.get_name(ManyParser)) == 3
+    assert dr.get_name(many) in names
+    assert dr.get_name(report) in names
+
+    elements = [s for s in spans if s.element is not None]
+    assert [s.element for s in elements] == ["/a[0]", "/b[1]"]
+    for s in elements:
+        assert s.parent.component is ManyParser
+        assert s.parent.element is None
+        assert s.parent.start <= s.start <= s.end <= s.parent.end
+    assert all(s.duration >= 0 and s.cpu >= 0 for s in spans)
+
+
+def test_chrome_trace():
+    broker = profiled_broker(trace_memory=True)
+    broker.profiler.stop()
+    trace = broker.profiler.chrome_trace()
+    events = trace["traceEvents"]
+    assert len(events) == len(broker.profiler.spans)
+    assert all(e["ph"] == "X" for e in events)
+    assert [e["ts"] for e in events] == sorted(e["ts"] for e in events)
+    cats = set(e["cat"] for e in events)
+    assert set(["datasource", "parser", "rule"]) <= cats
+    for e in events:
+        assert set(["cpu_us", "rss_delta_bytes", "alloc_bytes"]) <= set(e["args"])
+
+
+def test_collapsed():
+    broker = profiled_broker()
+    lines = broker.profiler.collapsed()
+    stacks = dict(l.rsplit(" ", 1) for l in lines)
+    name = dr.get_name(ManyParser)
+    assert "parser;%s" % name in stacks
+    assert "parser;%s;/a[0]" % name in stacks
+    assert "parser;%s;/b[1]" % name in stacks
+    assert "rule;%s" % dr.get_name(report) in stacks
+    assert all(int(v) >= 0 for v in stacks.values())
+
+
+def test_no_profiler():
+    broker = dr.Broker()
+    broker[Ctx] = Ctx()
+    broker = dr.run(dr.get_dependency_graph(report), broker=broker)
+    assert broker.profiler is None
+    assert report in broker
+
+
+def test_run_profile(tmpdir):
+    path = os.path.join(str(tmpdir), "trace.json")
+    broker = run(report, profile=path)
+    assert broker.profiler is not None
+    with open(path) as f:
+        assert json.load(f)["traceEvents"]
+    with open(path + ".folded") as f:
+        assert f.read().strip()
+
+
+def test_run_profile_memory(tmpdir):
+    path = os.path.join(str(tmpdir), "trace.json")
+    broker = run(report, profile=path, profile_memory=True)
+    assert broker.profiler.trace_memory
+    assert not run(report, profile=path).profiler.trace_memory
@@ -1,12 +1,18 @@
 import os
+import threading
 
+import pytest
 from tempfile import mkdtemp
 from insights import dr
 from insights.core.plugins import component
 from insights.core.serde import (serializer,
                                  deserializer,
+                                 DESERIALIZERS,
                                  Hydration,
                                  marshal,
+                                 PackReader,
+                                 SavedError,
+                                 SERIALIZERS,
                                  unmarshal)
 from insights.util import fs
 
@@ -215,3 +221,162 @@ def test_round_trip():
         pass
         if os.path.exists(tmp_path):
             fs.remove(tmp_path)
+
+
+@component()
+def other():
+    return Foo()
+
+
+def _dehydrate_both(h):
+    broker = dr.Broker()
+    for i, comp in enumerate([thing, other]):
+        broker[comp] = Foo()
+        broker[comp].a = i
+        broker.exec_times[comp] = 0.5
+        h.dehydrate(comp, broker)
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+@pytest.mark.parametrize("compress", [True, False])
+def test_round_trip_pack(tmpdir, compress, lazy):
+    h = Hydration(str(tmpdir), pack=True, compress=compress)
+    _dehydrate_both(h)
+    h.close()
+    assert not tmpdir.join("meta_data").check()
+
+    broker = Hydration(str(tmpdir)).hydrate(lazy=lazy)
+    assert broker[thing].a == 0
+    assert broker[other].a == 1
+    assert broker.exec_times[thing] >= 0.5
+
+
+def test_hydrate_components(tmpdir, monkeypatch):
+    h = Hydration(str(tmpdir), pack=True)
+    _dehydrate_both(h)
+    h.close()
+
+    read = []
+    orig = PackReader.read
+    monkeypatch.setattr(PackReader, "read", lambda self, name: read.append(name) or orig(self, name))
+    broker = Hydration(str(tmpdir)).hydrate(components=[other])
+    assert other in broker and thing not in broker
+    assert read == [dr.get_name(other)]
+
+    json_dir = tmpdir.mkdir("json")
+    _dehydrate_both(Hydration(str(json_dir)))
+    broker = Hydration(str(json_dir)).hydrate(components=[thing])
+    assert thing in broker and other not in broker
+
+
+def test_pack_without_toc(tmpdir):
+    h = Hydration(str(tmpdir), pack=True)
+    _dehydrate_both(h)
+    # collection stopped before close, and the last record is incomplete
+    h._writer._f.write(b"\0\0")
+    h._writer._f.flush()
+
+    broker = Hydration(str(tmpdir)).hydrate()
+    assert broker[thing].a == 0
+    assert broker[other].a == 1
+    h.close()
+
+
+def test_hydrate_lazy(tmpdir, monkeypatch):
+    _dehydrate_both(Hydration(str(tmpdir)))
+
+    loaded = []
+
+    def load(_type, data, root=None):
+        loaded.append(data["a"])
+        return deserialize_foo(_type, data, root=root)
+
+    monkeypatch.setitem(DESERIALIZERS, dr.get_name(Foo), (Foo, load))
+    h = Hydration(str(tmpdir))
+    read = []
+    load_json = h._load_json
+    monkeypatch.setattr(h, "_load_json", lambda path: read.append(path) or load_json(path))
+    broker = h.hydrate(lazy=True)
+    assert not read
+    assert not loaded
+    assert thing not in broker.exec_times
+
+    assert broker[other].a == 1
+    assert loaded == [1]
+    assert [os.path.basename(p) for p in read] == [dr.get_name(other) + ".json"]
+    assert thing in broker.pending
+    assert broker[thing].a == 0
+    assert broker.exec_times[thing] >= 0.5
+
+
+def test_hydrate_lazy_failure(tmpdir, monkeypatch):
+    _dehydrate_both(Hydration(str(tmpdir)))
+
+    def fail(_type, data, root=None):
+        raise Exception("broken")
+
+    monkeypatch.setitem(DESERIALIZERS, dr.get_name(Foo), (Foo, fail))
+    broker = Hydration(str(tmpdir)).hydrate(lazy=True)
+    assert thing not in broker
+    assert thing not in broker.pending
+    assert str(broker.exceptions[thing][0]) == "broken"
+    assert "broken" in broker.tracebacks[broker.exceptions[thing][0]]
+
+    broker = Hydration(str(tmpdir)).hydrate()
+    assert thing not in broker
+    assert str(broker.exceptions[thing][0]) == "broken"
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_hydrate_saved_errors(tmpdir, lazy):
+    h = Hydration(str(tmpdir))
+    broker = dr.Broker()
+    broker[thing] = Foo()
+    broker.exec_times[thing] = 0.5
+    ex = Exception("failed")
+    broker.add_exception(thing, ex, "Traceback (most recent call last):\nException: failed\n")
+    h.dehydrate(thing, broker)
+
+    broker = Hydration(str(tmpdir)).hydrate(lazy=lazy)
+    # a pending component's errors are recorded when it's loaded
+    assert broker[thing].a == 1
+    saved = broker.exceptions[thing]
+    assert len(saved) == 1 and isinstance(saved[0], SavedError)
+    assert str(saved[0]) == "Exception: failed"
+    assert broker.tracebacks[saved[0]] == "Traceback (most recent call last):\nException: failed\n"
+
+
+@pytest.mark.parametrize("pack", [True, False])
+def test_dehydrate_with_writers(tmpdir, monkeypatch, pack):
+    saving = threading.Event()
+    release = threading.Event()
+    saved = []
+
+    def slow(obj, root=None):
+        saving.set()
+        release.wait(5)
+        saved.append(obj.a)
+        return {"a": obj.a, "b": obj.b}
+
+    monkeypatch.setitem(SERIALIZERS, dr.get_name(Foo), slow)
+    h = Hydration(str(tmpdir), pack=pack, writers=1, max_pending=1)
+    persister = h.make_persister(set([thing, other]))
+    broker = dr.Broker()
+    broker[thing] = Foo()
+    broker.exec_times[thing] = 0.5
+    persister(thing, broker)
+    assert saving.wait(5)
+    # the observer returns while the writer is still busy
+    assert saved == []
+
+    broker[other] = Foo()
+    broker[other].a = 2
+    release.set()
+    persister(other, broker)
+    h.close()
+    assert saved == [1, 2]
+
+    broker = Hydration(str(tmpdir)).hydrate()
+    assert broker[thing].a == 1
+    assert broker[other].a == 2
+    assert broker.exec_times[thing] >= 0.5
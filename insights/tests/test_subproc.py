@@ -1,6 +1,8 @@
 import sys
 import pytest
 import shlex
+import threading
+import time
 
 from insights.util import subproc
 
@@ -22,3 +24,42 @@ def test_call_timeout():
     if sys.platform != "darwin":
         with pytest.raises(subproc.CalledProcessError):
             subproc.call('sleep 3', timeout=1)
+
+
+def test_command_limits(monkeypatch):
+    limits = subproc.CommandLimits(nice=10, ionice=3, max_commands=1)
+    monkeypatch.setattr(subproc, "which", lambda cmd, env=None: "/usr/bin/" + cmd)
+    assert limits.wrap(["echo", "hi"]) == ["ionice", "-c", "3", "nice", "-n", "10", "echo", "hi"]
+    monkeypatch.setattr(subproc, "which", lambda cmd, env=None: None)
+    assert limits.wrap(["echo", "hi"]) == ["echo", "hi"]
+
+
+def test_command_limits_max_commands(monkeypatch):
+    running = []
+    most = []
+
+    class Popen(object):
+        def __init__(self, *args, **kwargs):
+            running.append(self)
+            most.append(len(running))
+
+        def communicate(self):
+            time.sleep(0.05)
+            running.remove(self)
+            return (b"", None)
+
+        def poll(self):
+            return 0
+
+    monkeypatch.setattr(subproc, "Popen", Popen)
+    subproc.set_command_limits(subproc.CommandLimits(max_commands=2))
+    try:
+        threads = [threading.Thread(target=subproc.call, args=("true",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        subproc.set_command_limits(None)
+    assert len(most) == 6
+    assert max(most) == 2
@@ -30,6 +30,7 @@ from contextlib import contextmanager
 
 from insights import (apply_configs, dr, extract, HostContext,
         load_default_plugins)
+from insights.core import manifest
 from insights.core.hydration import initialize_broker
 from insights.core.spec_factory import ContentProvider
 
@@ -84,10 +85,24 @@ def configure(config):
             apply_configs(yaml.safe_load(f))
 
 
+def spec_name(fqdn):
+    return fqdn if "." in fqdn else "insights.specs.Specs.%s" % fqdn
+
+
 def get_spec(fqdn):
-    if "." not in fqdn:
-        fqdn = "insights.specs.Specs.%s" % fqdn
-    return dr.get_component(fqdn)
+    return dr.get_component(spec_name(fqdn))
+
+
+def load_from_manifest(spec, raw):
+    """
+    Returns the spec with only the modules it needs imported if the component
+    manifest covers the plugins and the spec implementations, or ``None`` if
+    the plugins have to be loaded.
+    """
+    plugins = list(parse_plugins(raw)) if raw else []
+    if not manifest.load():
+        return None
+    return manifest.load_component(spec_name(spec), ["insights.specs"] + plugins)
 
 
 @contextmanager
@@ -163,10 +178,12 @@ def run(spec, archive=None, quiet=False, no_header=False):
 def main():
     args = parse_args()
     configure_logging(args.debug)
-    load_default_plugins()
-    load_plugins(args.plugins)
+    spec = load_from_manifest(args.spec[0], args.plugins)
+    if spec is None:
+        load_default_plugins()
+        load_plugins(args.plugins)
+        spec = get_spec(args.spec[0])
     configure(args.config)
-    spec = get_spec(args.spec[0])
     if not spec:
         print("Spec not found: %s" % args.spec[0], file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,62 @@
+"""
+Generates the component manifest used by :mod:`insights.core.manifest` so
+later invocations of ``insights-run``, ``insights-cat`` and
+``insights-inspect`` can select components and import only the modules they
+need. Run it at build time after installing the packages to describe, and
+again whenever they change:
+
+    insights-manifest insights.parsers insights.combiners my_rules
+
+The default specs, parsers and combiners are always included. Without
+``-o`` the manifest is written inside the insights package where
+:func:`insights.core.manifest.load` looks for it.
+
+The filters added by the loaded components and those in the packaged filters
+file are compiled into the index :func:`insights.core.filters.load_index`
+reads. It's written next to the manifest unless ``--filters`` gives another
+file.
+"""
+from __future__ import print_function
+
+import argparse
+
+from insights import load_default_plugins
+from insights.core import dr, filters, manifest
+
+DEFAULT_PACKAGES = ["insights.specs", "insights.parsers", "insights.combiners", "insights.components"]
+
+
+def main():
+    p = argparse.ArgumentParser(__doc__.strip())
+    p.add_argument("packages", nargs="*", help="Additional packages or modules to include.")
+    p.add_argument("-o", "--output", help="File to write the manifest to.")
+    p.add_argument("--filters", help="File to write the filter index to.")
+    args = p.parse_args()
+
+    load_default_plugins()
+    packages = DEFAULT_PACKAGES + args.packages
+    for pkg in packages:
+        dr.load_components(pkg)
+
+    manifest.build(packages)
+    if args.output:
+        with open(args.output, "w") as f:
+            manifest.dump(f)
+    else:
+        manifest.dump()
+    print("%d components" % len(manifest.MANIFEST))
+
+    try:
+        filters.load()
+    except IOError:
+        pass
+    filters.compile_index()
+    if args.filters:
+        with open(args.filters, "w") as f:
+            filters.dump_index(f)
+    elif not args.output:
+        filters.dump_index()
+
+
+if __name__ == "__main__":
+    main()
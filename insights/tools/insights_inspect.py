@@ -100,7 +100,7 @@ from contextlib import contextmanager
 
 from insights import (apply_configs, dr, extract, HostContext,
                       load_default_plugins)
-from insights.core import filters
+from insights.core import filters, manifest
 from insights.core.hydration import initialize_broker
 from IPython import embed
 from IPython.terminal.embed import InteractiveShellEmbed
@@ -152,6 +152,13 @@ def configure(config):
 
 
 def get_component(fqdn):
+    # the manifest imports only the modules the component needs, including
+    # the datasources implementing the specs it depends on
+    if manifest.load():
+        component = manifest.load_component(fqdn, ["insights.specs"])
+        if component is not None:
+            return component
+    load_default_plugins()
     return dr.get_component(fqdn)
 
 
@@ -221,7 +228,6 @@ def main():
     args = parse_args()
     configure_logging(args.debug)
     configure(args.config)
-    load_default_plugins()
     component = get_component(args.component[0])
     if not component:
         print("Component not found: %s" % args.component[0], file=sys.stderr)
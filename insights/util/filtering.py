@@ -0,0 +1,253 @@
+"""
+In-process replacement for the ``grep -F``, ``grep -v -F`` and ``sed``
+pipeline :class:`insights.core.spec_factory.TextFileProvider` builds to filter
+and redact files.
+
+All of the filters are compiled into one regular expression and the
+disallowed patterns into another, so each line is checked against every
+filter in a single pass without forking anything. Matching is done on bytes,
+which is what ``grep`` does with ``LC_ALL=C``, and the output is the same as
+the pipeline's byte for byte. Content the matcher can't treat exactly like
+the pipeline raises :class:`FilterNotSupported` so callers can fall back to
+it.
+
+:func:`compile_ere` does the same for the extended regular expressions of
+``grep -E``, translating the parts of POSIX syntax Python spells differently.
+"""
+import io
+import re
+
+# characters that make a sed keyword a regular expression instead of a literal
+_SED_SPECIAL = set(".[]*^$\\\n")
+
+
+class FilterNotSupported(Exception):
+    """
+    Raised when the output can't be guaranteed to match the subprocess
+    pipeline.
+    """
+    pass
+
+
+def _encode(s):
+    return s if isinstance(s, bytes) else s.encode("utf-8", "surrogateescape")
+
+
+# compiled alternations by pattern set, which is the same for every file of a
+# datasource
+_COMPILED = {}
+_MAX_COMPILED = 1024
+
+
+def _compile(strings):
+    key = frozenset(strings)
+    if key in _COMPILED:
+        return _COMPILED[key]
+    # grep -F takes one pattern per line of its argument
+    patterns = set(_encode("\n".join(strings)).split(b"\n"))
+    if b"" in patterns:
+        raise FilterNotSupported("Empty pattern")
+    if len(_COMPILED) >= _MAX_COMPILED:
+        _COMPILED.clear()
+    regex = _COMPILED[key] = re.compile(b"|".join(re.escape(p) for p in sorted(patterns)))
+    return regex
+
+
+_POSIX_CLASSES = {
+    "alpha": "a-zA-Z",
+    "digit": "0-9",
+    "alnum": "a-zA-Z0-9",
+    "upper": "A-Z",
+    "lower": "a-z",
+    "space": " \\t\\n\\r\\f\\v",
+    "blank": " \\t",
+    "punct": re.escape("!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"),
+    "xdigit": "0-9A-Fa-f",
+    "cntrl": "\\x00-\\x1f\\x7f",
+    "print": "\\x20-\\x7e",
+    "graph": "\\x21-\\x7e",
+}
+
+# escapes with the same meaning in GNU grep and python
+_ERE_ESCAPES = {"w": "\\w", "W": "\\W", "s": "\\s", "S": "\\S", "b": "\\b", "B": "\\B",
+                "<": "\\b(?=\\w)", ">": "\\b(?<=\\w)"}
+
+
+def _translate_bracket(pattern, i):
+    # the python class for the bracket expression at pattern[i], and the
+    # index after it
+    out = ["["]
+    i += 1
+    if pattern[i:i + 1] == "^":
+        out.append("^")
+        i += 1
+    first = True
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "]" and not first:
+            out.append("]")
+            return "".join(out), i + 1
+        first = False
+        if pattern.startswith("[:", i):
+            end = pattern.find(":]", i + 2)
+            name = pattern[i + 2:end] if end > 0 else None
+            if name not in _POSIX_CLASSES:
+                raise FilterNotSupported("Unknown character class in %r" % pattern)
+            out.append(_POSIX_CLASSES[name])
+            i = end + 2
+            continue
+        if pattern.startswith(("[.", "[="), i):
+            raise FilterNotSupported("Collating element in %r" % pattern)
+        # backslashes are literal in POSIX brackets
+        out.append("\\" + c if c in "\\[]&~|" else c)
+        i += 1
+    raise FilterNotSupported("Unterminated bracket in %r" % pattern)
+
+
+def _translate_ere(pattern):
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            e = pattern[i + 1:i + 2]
+            if e in _ERE_ESCAPES:
+                out.append(_ERE_ESCAPES[e])
+            elif e and not e.isalnum():
+                out.append(re.escape(e))
+            else:
+                raise FilterNotSupported("Escape \\%s in %r" % (e, pattern))
+            i += 2
+        elif c == "[":
+            cls, i = _translate_bracket(pattern, i)
+            out.append(cls)
+        elif pattern.startswith("(?", i):
+            # python extension syntax, an error to grep
+            raise FilterNotSupported("(? in %r" % pattern)
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def compile_ere(patterns):
+    """
+    Compiles the POSIX extended regular expressions ``grep -E`` would read
+    from ``patterns``, one per line, into a single python expression over
+    text. It only matches like ``grep`` on ASCII text, where the locale
+    doesn't matter.
+
+    Raises:
+        FilterNotSupported: if a pattern uses syntax that isn't translated
+            or that python rejects.
+    """
+    lines = "\n".join(patterns).split("\n")
+    if "" in lines:
+        raise FilterNotSupported("Empty pattern")
+    try:
+        return re.compile("|".join("(?:%s)" % _translate_ere(p) for p in lines))
+    except (re.error, IndexError) as ex:
+        raise FilterNotSupported("Can't compile %r: %s" % (patterns, ex))
+
+
+class LineFilter(object):
+    """
+    Keeps the lines containing one of ``filters``, drops those containing one
+    of ``patterns`` and replaces every occurrence of ``keywords`` with
+    "keyword". Each argument is optional, and leaving one out skips its stage
+    just like :meth:`TextFileProvider.create_args` does.
+
+    Raises:
+        FilterNotSupported: if a keyword would be treated as a regular
+            expression by ``sed``.
+    """
+    def __init__(self, filters=None, patterns=None, keywords=None):
+        self.select = _compile(filters) if filters and "\n".join(filters) else None
+        self.reject = _compile(patterns) if patterns and "\n".join(patterns) else None
+        self.keywords = []
+        for kw in keywords or []:
+            if not kw or _SED_SPECIAL.intersection(kw):
+                raise FilterNotSupported("Keyword is a regular expression: %r" % kw)
+            self.keywords.append(_encode(kw))
+
+    def __bool__(self):
+        return bool(self.select or self.reject or self.keywords)
+
+    __nonzero__ = __bool__
+
+    def lines(self, f):
+        """
+        Yields the filtered lines of ``f``, any iterable of lines as bytes
+        like a file opened in binary mode, reading one line at a time. A line
+        that's selected ends with a newline like ``grep`` prints it, and
+        lines that are only redacted are left as they are.
+
+        Raises:
+            FilterNotSupported: on a line with a NUL byte, which ``grep``
+                would consider binary.
+        """
+        select = self.select.search if self.select else None
+        reject = self.reject.search if self.reject else None
+        keywords = self.keywords
+        for line in f:
+            if select or reject:
+                if b"\0" in line:
+                    raise FilterNotSupported("Binary content")
+                if line.endswith(b"\n"):
+                    line = line[:-1]
+                if select and not select(line):
+                    continue
+                if reject and reject(line):
+                    continue
+                # grep terminates every line it prints
+                line += b"\n"
+            for kw in keywords:
+                line = line.replace(kw, b"keyword")
+            yield line
+
+    def filter(self, f):
+        """
+        Filters the lines of ``f`` like :meth:`lines` and returns an ``(rc,
+        output)`` tuple with the exit code the pipeline would have ended
+        with.
+        """
+        out = list(self.lines(f))
+        rc = 0 if out or self.keywords or not (self.select or self.reject) else 1
+        return rc, b"".join(out)
+
+    def __call__(self, data):
+        """
+        Filters ``data`` and returns an ``(rc, output)`` tuple with the exit
+        code the pipeline would have ended with.
+
+        Raises:
+            FilterNotSupported: if ``data`` contains NUL bytes and would be
+                considered binary by ``grep``.
+        """
+        return self.filter(io.BytesIO(data))
+
+
+def filter_file(path, filters=None, patterns=None, keywords=None):
+    """
+    Returns an ``(rc, output)`` tuple with the content of ``path`` passed
+    through a :class:`LineFilter`. The file is read a line at a time, so
+    only what's kept is held in memory.
+
+    Raises:
+        FilterNotSupported: if the pipeline must be used instead.
+    """
+    line_filter = LineFilter(filters, patterns, keywords)
+    with open(path, "rb") as f:
+        return line_filter.filter(f)
+
+
+def is_binary(path, size=1 << 16):
+    """
+    Whether the file at ``path`` has a NUL byte, which makes ``grep``
+    treat it as binary. It's read ``size`` bytes at a time.
+    """
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(size), b""):
+            if b"\0" in chunk:
+                return True
+    return False
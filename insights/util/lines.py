@@ -0,0 +1,261 @@
+"""
+Read-only sequences of the lines of large files that don't hold the lines in
+memory.
+
+:class:`MappedLines` maps a file with :mod:`mmap` and keeps only the offset of
+each line ending, so a multi-gigabyte log costs a few bytes per line instead
+of a Python string per line. Lines are decoded when they're accessed, and
+:meth:`MappedLines.search` finds lines containing a string by searching the
+raw bytes, decoding only the lines that match.
+
+The lines are the same as those of the file opened in text mode with
+``encoding="utf-8"`` and ``errors="surrogateescape"`` and stripped of their
+trailing newline. Files with carriage returns are translated differently in
+text mode, so :func:`map_lines` won't map them.
+
+A mapping is closed when the last sequence using it is garbage collected, or
+right away with :meth:`MappedLines.close` or by using a :class:`MappedLines`
+as a context manager.
+"""
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+THRESHOLD = 32 * 1024 * 1024
+"""Files smaller than this many bytes are read into lists instead of mapped."""
+
+_ENCODING = "utf-8"
+_ERRORS = "surrogateescape"
+
+
+def _encode(s):
+    return s if isinstance(s, bytes) else s.encode(_ENCODING, _ERRORS)
+
+
+class _Map(object):
+    """ The mapped file and the index of its line endings shared by views. """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        self.size = len(self.mm)
+        self._ends = None
+        self.closed = False
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.view.release()
+        try:
+            self.mm.close()
+        except BufferError:
+            # a line is still being decoded from it: the mapping is closed
+            # when it's garbage collected instead
+            pass
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    @property
+    def ends(self):
+        # offset of the newline ending each line, or the file size for a last
+        # line without one
+        if self._ends is None:
+            ends = array("q")
+            find, pos = self.mm.find, 0
+            while True:
+                pos = find(b"\n", pos)
+                if pos == -1:
+                    break
+                ends.append(pos)
+                pos += 1
+            if (ends[-1] + 1 if ends else 0) < self.size:
+                ends.append(self.size)
+            self._ends = ends
+        return self._ends
+
+    def start(self, i):
+        return self.ends[i - 1] + 1 if i else 0
+
+    def decode(self, start, end):
+        return str(self.view[start:end], _ENCODING, _ERRORS)
+
+
+class MappedLines(Sequence):
+    """
+    A sequence of the lines of the file at ``path``. It supports everything
+    :class:`collections.abc.Sequence` does, and slices with a step of 1 are
+    views of the same mapping. Concatenating with a list, and comparing with
+    one, work like they do for a list of the lines.
+    """
+    def __init__(self, path):
+        self._map = _Map(path)
+        self._lo = 0
+        self._hi = None
+
+    @property
+    def path(self):
+        return self._map.path
+
+    @property
+    def closed(self):
+        return self._map.closed
+
+    def close(self):
+        """
+        Unmaps the file. Every view of the same mapping is closed with it, and
+        using any of them afterwards raises :class:`ValueError`.
+        """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _bounds(self):
+        hi = len(self._map.ends) if self._hi is None else self._hi
+        return self._lo, hi
+
+    def _view(self, lo, hi):
+        view = MappedLines.__new__(MappedLines)
+        view._map, view._lo, view._hi = self._map, lo, hi
+        return view
+
+    def _line(self, i):
+        m = self._map
+        return m.decode(m.start(i), m.ends[i])
+
+    def __len__(self):
+        lo, hi = self._bounds()
+        return hi - lo
+
+    def __getitem__(self, index):
+        lo, hi = self._bounds()
+        if isinstance(index, slice):
+            start, stop, step = index.indices(hi - lo)
+            if step == 1:
+                return self._view(lo + start, lo + max(start, stop))
+            return [self._line(lo + i) for i in range(start, stop, step)]
+        if index < 0:
+            index += hi - lo
+        if not 0 <= index < hi - lo:
+            raise IndexError("line index out of range")
+        return self._line(lo + index)
+
+    def __iter__(self):
+        m = self._map
+        if self._lo == 0 and self._hi is None and m._ends is None:
+            # a forward pass doesn't need the index
+            find, decode, pos, size = m.mm.find, m.decode, 0, m.size
+            while pos < size:
+                end = find(b"\n", pos)
+                end = size if end == -1 else end
+                yield decode(pos, end)
+                pos = end + 1
+            return
+        lo, hi = self._bounds()
+        for i in range(lo, hi):
+            yield self._line(i)
+
+    def __reversed__(self):
+        lo, hi = self._bounds()
+        for i in range(hi - 1, lo - 1, -1):
+            yield self._line(i)
+
+    def __contains__(self, line):
+        return any(l == line for l in self.search(line))
+
+    def search(self, s, reverse=False):
+        """
+        Yields the lines that contain ``s``, last line first if ``reverse`` is
+        ``True``. Only the matching lines are decoded.
+        """
+        lo, hi = self._bounds()
+        if not s:
+            for line in (reversed(self) if reverse else self):
+                yield line
+            return
+        needle = _encode(s)
+        if lo >= hi or b"\n" in needle:
+            return
+
+        m = self._map
+        ends = m.ends
+        first, last = m.start(lo), ends[hi - 1]
+        if not reverse:
+            pos = first
+            while True:
+                pos = m.mm.find(needle, pos, last)
+                if pos == -1:
+                    return
+                i = bisect_left(ends, pos, lo, hi)
+                yield self._line(i)
+                pos = ends[i] + 1
+        else:
+            end = last
+            while True:
+                pos = m.mm.rfind(needle, first, end)
+                if pos == -1:
+                    return
+                i = bisect_left(ends, pos, lo, hi)
+                yield self._line(i)
+                end = m.start(i) - 1
+                if end < first:
+                    return
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, MappedLines)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (_unpickle, (self.path, self._lo, self._hi))
+
+    def __repr__(self):
+        return "<%s(%r, %d lines)>" % (self.__class__.__name__, self.path, len(self))
+
+
+def _unpickle(path, lo, hi):
+    lines = MappedLines(path)
+    return lines._view(lo, hi) if lo or hi is not None else lines
+
+
+def map_lines(path, threshold=None):
+    """
+    Returns a :class:`MappedLines` for the file at ``path`` if it's at least
+    ``threshold`` bytes, :data:`THRESHOLD` by default, and has no carriage
+    returns. Returns ``None`` otherwise.
+    """
+    threshold = THRESHOLD if threshold is None else threshold
+    if os.path.getsize(path) < max(threshold, 1):
+        return None
+    lines = MappedLines(path)
+    if lines._map.mm.find(b"\r") != -1:
+        lines.close()
+        return None
+    return lines
@@ -0,0 +1,504 @@
+"""
+Answers the glob patterns and file checks of datasources from cached
+directory listings and stats instead of a system call per pattern and file.
+
+A :class:`PathResolver` lists each directory at most once, with
+:func:`os.scandir` where it's available, and remembers whether paths exist,
+are directories, are readable and what they resolve to. Every datasource
+using the same :class:`insights.core.context.ExecutionContext` shares its
+resolver, so the globs of all of them are answered from the same listings.
+
+The results are a snapshot: files created or removed after a path was first
+checked aren't noticed until :meth:`PathResolver.clear` is called.
+
+A :class:`PathIndex` lists a whole extracted archive up front, so the specs
+of an archive analysis find its files without touching the filesystem. An
+:class:`ArchiveIndex` does the same from the member list of an archive that
+hasn't been extracted, and writes members out only when they're read.
+"""
+import fnmatch
+import logging
+import os
+import posixpath
+import re
+import shutil
+import threading
+
+log = logging.getLogger(__name__)
+
+_MAGIC = re.compile("[*?[]")
+
+
+def has_magic(s):
+    return _MAGIC.search(s) is not None
+
+
+def _ishidden(name):
+    return name[0] == "."
+
+
+def _scan(dirname):
+    # (name, is a directory) for every entry, following symlinks like glob
+    if hasattr(os, "scandir"):
+        entries = []
+        for entry in os.scandir(dirname):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            entries.append((entry.name, is_dir))
+        return entries
+    return [(n, os.path.isdir(os.path.join(dirname, n))) for n in os.listdir(dirname)]
+
+
+class PathResolver(object):
+    """
+    Caching replacement for :func:`glob.glob` and the :mod:`os.path` checks
+    :class:`insights.core.spec_factory.FileProvider` makes. It's safe to
+    share between threads: a race only means a path is checked twice.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """ Forgets everything that's been listed and checked. """
+        self._listings = {}
+        self._entries = {}
+        self._lexists = {}
+        self._exists = {}
+        self._isdir = {}
+        self._realpath = {}
+        self._readable = {}
+
+    def listdir(self, dirname):
+        """
+        Returns ``(name, is_dir)`` tuples for the entries of ``dirname``, or
+        an empty list if it can't be listed.
+        """
+        entries = self._listings.get(dirname)
+        if entries is None:
+            try:
+                entries = _scan(dirname or os.curdir)
+            except OSError:
+                entries = []
+            self._entries[dirname] = dict(entries)
+            self._listings[dirname] = entries
+        return entries
+
+    def _listed(self, path):
+        # (name, is_dir) from the listing of the parent of path, False if it
+        # isn't in it, or None if the parent hasn't been listed
+        dirname, name = os.path.split(path)
+        entries = self._entries.get(dirname)
+        if entries is None or not name:
+            return None
+        return (name, entries[name]) if name in entries else False
+
+    def lexists(self, path):
+        result = self._lexists.get(path)
+        if result is None:
+            entry = self._listed(path)
+            result = self._lexists[path] = bool(entry) if entry is not None else os.path.lexists(path)
+        return result
+
+    def exists(self, path):
+        result = self._exists.get(path)
+        if result is None:
+            result = self._exists[path] = os.path.exists(path)
+        return result
+
+    def isdir(self, path):
+        result = self._isdir.get(path)
+        if result is None:
+            entry = self._listed(path)
+            result = self._isdir[path] = entry[1] if entry else (entry is None and os.path.isdir(path))
+        return result
+
+    def realpath(self, path):
+        result = self._realpath.get(path)
+        if result is None:
+            result = self._realpath[path] = os.path.realpath(path)
+        return result
+
+    def readable(self, path):
+        result = self._readable.get(path)
+        if result is None:
+            result = self._readable[path] = os.access(path, os.R_OK)
+        return result
+
+    def materialize(self, path):
+        """
+        Makes sure ``path`` can be opened. Paths are expected to be on disk
+        already, so this does nothing.
+        """
+        pass
+
+    def glob(self, pattern):
+        """
+        Returns the paths matching ``pattern`` in the same order as
+        :func:`glob.glob`.
+        """
+        return list(self._iglob(pattern, False))
+
+    def _iglob(self, pathname, dironly):
+        dirname, basename = os.path.split(pathname)
+        if not has_magic(pathname):
+            if basename:
+                if self.lexists(pathname):
+                    yield pathname
+            elif self.isdir(dirname):
+                yield pathname
+            return
+        if not dirname:
+            for name in self._glob1(dirname, basename, dironly):
+                yield name
+            return
+        if dirname != pathname and has_magic(dirname):
+            dirs = self._iglob(dirname, True)
+        else:
+            dirs = [dirname]
+        glob_in_dir = self._glob1 if has_magic(basename) else self._glob0
+        for d in dirs:
+            for name in glob_in_dir(d, basename, dironly):
+                yield os.path.join(d, name)
+
+    def _glob1(self, dirname, pattern, dironly):
+        names = [n for n, is_dir in self.listdir(dirname) if is_dir or not dironly]
+        if not _ishidden(pattern):
+            names = [n for n in names if not _ishidden(n)]
+        return fnmatch.filter(names, pattern)
+
+    def _glob0(self, dirname, basename, dironly):
+        if basename:
+            if self.lexists(os.path.join(dirname, basename)):
+                return [basename]
+        elif self.isdir(dirname):
+            return [basename]
+        return []
+
+
+class PathIndex(PathResolver):
+    """
+    :class:`PathResolver` for an extracted archive. The directories under
+    ``root`` are listed once when it's created, and paths under ``root`` are
+    then found, globbed and checked for existence from memory. Symlinks
+    aren't followed while listing, so paths through a symlinked directory
+    are resolved on the filesystem like :class:`PathResolver` does.
+
+    Attributes:
+        files (list): the regular files under ``root``, in the order
+            :func:`insights.core.hydration.get_all_files` yields them.
+    """
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self._prefix = self.root.rstrip(os.sep) + os.sep
+        self._real_root = os.path.realpath(self.root)
+        super(PathIndex, self).__init__()
+
+    def clear(self):
+        """ Lists the directories under ``root`` again. """
+        super(PathIndex, self).clear()
+        self._links = set()
+        self.files = []
+        self._index(self.root)
+
+    def _index(self, dirname):
+        try:
+            if hasattr(os, "scandir"):
+                it = list(os.scandir(dirname))
+            else:
+                it = [_Entry(dirname, n) for n in os.listdir(dirname)]
+        except OSError:
+            it = []
+        entries = []
+        for entry in it:
+            try:
+                is_link = entry.is_symlink()
+            except OSError:
+                is_link = False
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                # a symlink loop
+                is_dir = False
+            entries.append((entry.name, is_dir))
+            if is_link:
+                self._links.add(entry.path)
+            elif is_dir:
+                self._index(entry.path)
+            elif entry.is_file():
+                self.files.append(entry.path)
+        self._entries[dirname] = dict(entries)
+        self._listings[dirname] = entries
+
+    def _covers(self, path):
+        # whether everything about path is known from the listings
+        if path != self.root and not path.startswith(self._prefix):
+            return False
+        if os.path.normpath(path) != path:
+            return False
+        parent = os.path.dirname(path)
+        while parent != self.root and len(parent) > len(self.root):
+            if parent in self._links:
+                return False
+            parent = os.path.dirname(parent)
+        return True
+
+    def _listed(self, path):
+        entry = super(PathIndex, self)._listed(path)
+        if entry is None and path != self.root and self._covers(path):
+            # the parent doesn't exist or isn't a directory
+            return False
+        return entry
+
+    def exists(self, path):
+        if path == self.root:
+            return True
+        entry = self._listed(path)
+        if entry is False:
+            return False
+        if entry and path not in self._links:
+            return True
+        return super(PathIndex, self).exists(path)
+
+    def realpath(self, path):
+        if path == self.root:
+            return self._real_root
+        if self._covers(path) and path not in self._links:
+            return self._real_root + path[len(self.root):]
+        return super(PathIndex, self).realpath(path)
+
+
+# resolving more symlinks than this for one path is treated as a loop, like
+# the ELOOP limit of the kernel
+_MAX_LINKS = 40
+
+
+class ArchiveIndex(PathResolver):
+    """
+    :class:`PathResolver` for an archive whose members are read on demand
+    instead of being extracted. Paths under ``root`` are found, globbed,
+    checked and resolved from the member list alone, as if the archive had
+    been extracted into ``root``.
+
+    Nothing is written under ``root`` until :meth:`materialize` is called
+    for a path, which writes out just the member it names and the
+    directories and symlinks leading to it. Symlinks are only followed
+    within the archive: an absolute target or one that leaves ``root``
+    doesn't exist.
+
+    Args:
+        root (str): an empty directory members are written into.
+        members (iterable): ``(name, kind, value)`` tuples, where ``kind`` is
+            "dir", "file" or "link". ``value`` is the link target for a
+            link and whatever ``open_member`` takes for a file. A later
+            member with the same name replaces an earlier one.
+        open_member (callable): returns a readable file object for the
+            ``value`` of a file member.
+
+    Attributes:
+        files (list): the regular files of the archive in the order they're
+            stored, as paths under ``root``.
+    """
+    def __init__(self, root, members, open_member):
+        self.root = os.path.normpath(root)
+        self._prefix = self.root.rstrip(os.sep) + os.sep
+        self._real_root = os.path.realpath(self.root)
+        self._open_member = open_member
+        self._lock = threading.Lock()
+        self._placed = set()
+        self._nodes = {"": ("dir", None)}
+        self._children = {"": []}
+        names = []
+        for name, kind, value in members:
+            if self._add(name, kind, value) and kind == "file":
+                names.append(name)
+        self.files = []
+        seen = set()
+        for name in names:
+            if name not in seen and self._nodes[name][0] == "file":
+                seen.add(name)
+                self.files.append(os.path.join(self.root, name))
+        super(ArchiveIndex, self).__init__()
+
+    def _add(self, name, kind, value):
+        parent = ""
+        for part in name.split("/")[:-1]:
+            path = posixpath.join(parent, part)
+            node = self._nodes.get(path)
+            if node is None:
+                self._nodes[path] = ("dir", None)
+                self._children[path] = []
+                self._children[parent].append(part)
+            elif node[0] != "dir":
+                # tar can't extract a member under a file either
+                return False
+            parent = path
+
+        node = self._nodes.get(name)
+        if node is None:
+            self._children[parent].append(posixpath.basename(name))
+        elif node[0] == "dir":
+            return False
+        self._nodes[name] = (kind, value)
+        if kind == "dir":
+            self._children[name] = []
+        return True
+
+    def _rel(self, path):
+        # path relative to root, or None if it isn't under it
+        if path == self.root:
+            return ""
+        if path.startswith(self._prefix):
+            return path[len(self._prefix):]
+        return None
+
+    def _resolve(self, rel, follow=True, hops=0):
+        # rel with every symlink in it followed, or None if it doesn't exist
+        # in the archive. The last part isn't followed unless follow is set.
+        parts = [p for p in rel.split("/") if p and p != "."]
+        cur = ""
+        for i, part in enumerate(parts):
+            if part == "..":
+                if not cur:
+                    return None
+                cur = posixpath.dirname(cur)
+                continue
+            path = posixpath.join(cur, part)
+            node = self._nodes.get(path)
+            if node is None:
+                return None
+            last = i == len(parts) - 1
+            if node[0] == "link" and (follow or not last):
+                hops += 1
+                if hops > _MAX_LINKS or node[1].startswith("/"):
+                    return None
+                path = self._resolve(posixpath.join(cur, node[1]), True, hops)
+                if path is None:
+                    return None
+            elif node[0] == "file" and not last:
+                return None
+            cur = path
+        return cur
+
+    def _kind(self, rel, follow=True):
+        resolved = self._resolve(rel, follow)
+        return self._nodes[resolved][0] if resolved is not None else None
+
+    def listdir(self, dirname):
+        rel = self._rel(dirname)
+        if rel is None:
+            return super(ArchiveIndex, self).listdir(dirname)
+        entries = self._listings.get(dirname)
+        if entries is None:
+            resolved = self._resolve(rel)
+            names = self._children.get(resolved, []) if resolved is not None else []
+            entries = [(n, self._kind(posixpath.join(resolved, n)) == "dir") for n in names]
+            self._listings[dirname] = entries
+        return entries
+
+    def lexists(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            return super(ArchiveIndex, self).lexists(path)
+        return self._resolve(rel, follow=False) is not None
+
+    def exists(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            return super(ArchiveIndex, self).exists(path)
+        return self._resolve(rel) is not None
+
+    def isdir(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            return super(ArchiveIndex, self).isdir(path)
+        return self._kind(rel) == "dir"
+
+    def realpath(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            return super(ArchiveIndex, self).realpath(path)
+        resolved = self._resolve(rel)
+        if resolved is None:
+            resolved = posixpath.normpath(rel).lstrip("/")
+        return os.path.join(self._real_root, resolved) if resolved not in ("", ".") else self._real_root
+
+    def readable(self, path):
+        rel = self._rel(path)
+        if rel is None:
+            return super(ArchiveIndex, self).readable(path)
+        return self._resolve(rel) is not None
+
+    def materialize(self, path):
+        """
+        Writes the member at ``path`` under ``root``, along with the
+        directories and symlinks on the way to it, if it hasn't been already.
+        Paths that aren't in the archive are left alone.
+        """
+        rel = self._rel(path)
+        if rel is not None:
+            with self._lock:
+                self._place(rel)
+
+    def _place(self, rel, hops=0):
+        parts = [p for p in rel.split("/") if p and p != "."]
+        cur = ""
+        for i, part in enumerate(parts):
+            if part == "..":
+                if not cur:
+                    return
+                cur = posixpath.dirname(cur)
+                continue
+            path = posixpath.join(cur, part)
+            node = self._nodes.get(path)
+            if node is None:
+                return
+            kind, value = node
+            dst = os.path.join(self.root, path)
+            if kind == "link":
+                if path not in self._placed:
+                    os.symlink(value, dst)
+                    self._placed.add(path)
+                if hops >= _MAX_LINKS or value.startswith("/"):
+                    return
+                rest = posixpath.join(cur, value, *parts[i + 1:])
+                return self._place(rest, hops + 1)
+            if path not in self._placed:
+                if kind == "dir":
+                    os.mkdir(dst)
+                else:
+                    self._write(value, dst)
+                self._placed.add(path)
+            if kind != "dir":
+                return
+            cur = path
+
+    def _write(self, value, dst):
+        try:
+            src = self._open_member(value)
+            try:
+                with open(dst, "wb") as f:
+                    shutil.copyfileobj(src, f)
+            finally:
+                src.close()
+        except Exception as ex:
+            log.warning("Couldn't read %s from the archive: %s", dst, ex)
+            if os.path.exists(dst):
+                os.remove(dst)
+
+
+class _Entry(object):
+    # the parts of os.DirEntry PathIndex uses, where there's no scandir
+    def __init__(self, dirname, name):
+        self.name = name
+        self.path = os.path.join(dirname, name)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def is_file(self):
+        return os.path.isfile(self.path)
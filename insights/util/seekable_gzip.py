@@ -0,0 +1,159 @@
+"""
+Random access to the uncompressed content of a gzip file.
+
+Seeking in :class:`gzip.GzipFile` means decompressing from the start of the
+file again whenever the position moves backwards. A :class:`SeekableGzip`
+saves a copy of the decompressor every ``span`` bytes of output as it reads,
+so any later seek only decompresses from the nearest saved point before the
+new position. Each point costs about 40KB, the size of the decompressor's
+state and window.
+
+Files of several concatenated gzip members are read as one stream, like
+``gzip -d`` does, and trailing padding after the last member is ignored.
+"""
+import zlib
+
+CHUNK = 1 << 16
+SPAN = 1 << 22
+
+# bytes of decompressed data that can be read before they're dropped
+_KEEP = 1 << 20
+
+
+def _decompressor():
+    # expect a gzip header and trailer
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+class SeekableGzip(object):
+    """
+    Read-only, seekable file object over the decompressed content of the
+    gzip file at ``path``.
+
+    Raises:
+        zlib.error: from :meth:`read` if the file is corrupt.
+    """
+    def __init__(self, path, span=SPAN):
+        self.name = path
+        self._f = open(path, "rb")
+        self._span = span
+        # (uncompressed offset, compressed offset, decompressor) to restart
+        # from, where no decompressor means a new member starts there
+        self._points = [(0, 0, None)]
+        self._pos = 0
+        self._restore(self._points[0])
+
+    def _restore(self, point):
+        uoff, coff, d = point
+        self._d = d.copy() if d is not None else None
+        self._f.seek(coff)
+        self._coff = coff
+        self._base = uoff
+        self._buf = bytearray()
+        self._eof = False
+
+    def _feed(self):
+        # decompresses the next chunk onto the buffer, False at the end
+        if self._eof:
+            return False
+        data = self._f.read(CHUNK)
+        if not data:
+            self._eof = True
+            return False
+        self._coff += len(data)
+        while data:
+            if self._d is None:
+                # anything but the magic number of another member is padding
+                if not data.startswith(b"\x1f\x8b"[:len(data)]):
+                    self._eof = True
+                    break
+                self._d = _decompressor()
+            d = self._d
+            self._buf += d.decompress(data)
+            data = b""
+            if d.eof:
+                data = d.unused_data
+                self._d = None
+
+        end = self._base + len(self._buf)
+        if end - self._points[-1][0] >= self._span:
+            self._points.append((end, self._coff, self._d.copy() if self._d is not None else None))
+        return True
+
+    def _advance(self, pos):
+        # decompresses until the buffer reaches pos, dropping what's skipped
+        end = self._base + len(self._buf)
+        if end >= pos:
+            return
+        point = None
+        for p in reversed(self._points):
+            if p[0] <= pos:
+                point = p if p[0] > end else None
+                break
+        if point is not None:
+            self._restore(point)
+        while self._base + len(self._buf) < pos:
+            self._base += len(self._buf)
+            del self._buf[:]
+            if not self._feed():
+                break
+
+    def read(self, size=-1):
+        pos = self._pos
+        if pos < self._base:
+            for p in reversed(self._points):
+                if p[0] <= pos:
+                    self._restore(p)
+                    break
+        elif pos - self._base > _KEEP:
+            drop = min(pos - self._base, len(self._buf))
+            del self._buf[:drop]
+            self._base += drop
+        self._advance(pos)
+
+        if size is None or size < 0:
+            while self._feed():
+                pass
+            want = self._base + len(self._buf)
+        else:
+            want = pos + size
+            while self._base + len(self._buf) < want and self._feed():
+                pass
+
+        start = pos - self._base
+        data = bytes(self._buf[start:want - self._base]) if start >= 0 else b""
+        self._pos = pos + len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            self._advance(float("inf"))
+            offset += self._base + len(self._buf)
+        if offset < 0:
+            raise ValueError("Negative seek position %d" % offset)
+        self._pos = offset
+        return offset
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._f.close()
+
+    @property
+    def closed(self):
+        return self._f.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
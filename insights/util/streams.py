@@ -9,6 +9,7 @@ from contextlib import contextmanager
 from subprocess import Popen, PIPE, STDOUT
 
 from insights.util import which
+from insights.util.subproc import command_slot, get_command_limits, kill_processes
 
 stream_options = {
     "bufsize": -1,  # use OS defaults. Non buffered if not set.
@@ -44,6 +45,15 @@ def stream(command, stdin=None, env=os.environ, timeout=None):
         The output stream for the command. It should typically be wrapped in a
         ``reader``.
     """
+    with command_slot():
+        with _stream(command, stdin=stdin, env=env, timeout=timeout) as s:
+            yield s
+
+
+@contextmanager
+def _stream(command, stdin=None, env=os.environ, timeout=None):
+    # stream without waiting for a command slot, which connect takes once
+    # for the whole pipeline
     if not isinstance(command, list):
         command = shlex.split(command)
 
@@ -59,10 +69,19 @@ def stream(command, stdin=None, env=os.environ, timeout=None):
             raise Exception("Timeout specified but timeout command not available.")
         command = timeout_command + [str(timeout)] + command
 
+    limits = get_command_limits()
+    if limits is not None:
+        command = limits.wrap(command, env=env)
+
     output = None
     try:
         output = Popen(command, env=env, stdin=stdin, **stream_options)
         yield output.stdout
+    except BaseException:
+        # the reader was interrupted, so nothing will read the rest
+        if output:
+            kill_processes([output])
+        raise
     finally:
         if output:
             output.wait()
@@ -94,12 +113,13 @@ def connect(*cmds, **kwargs):
 
     @contextmanager
     def inner(idx, inp):
-        with stream(cmds[idx], stdin=inp, env=env, timeout=timeout) as s:
+        with _stream(cmds[idx], stdin=inp, env=env, timeout=timeout) as s:
             if idx == end:
                 yield s
             else:
                 with inner(idx + 1, s) as c:
                     yield c
 
-    with inner(0, stdin) as s:
-        yield s
+    with command_slot():
+        with inner(0, stdin) as s:
+            yield s
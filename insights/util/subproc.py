@@ -1,9 +1,13 @@
 import logging
 import os
 import shlex
+import shutil
 import signal
 import six
 import sys
+import tempfile
+import threading
+from contextlib import contextmanager
 from subprocess import Popen, PIPE, STDOUT
 
 from insights.util import which
@@ -47,6 +51,115 @@ class CalledProcessError(Exception):
         return '<{}({}, {!r}, {!r})>'.format(name, rc, cmd, output)
 
 
+class CommandLimits(object):
+    """
+    Limits on the commands that :class:`Pipeline` and
+    :mod:`insights.util.streams` run while they're set with
+    :func:`set_command_limits`, so a collection doesn't compete with the
+    workload of a busy host.
+
+    Args:
+        nice (int): run commands under ``nice`` with this adjustment.
+        ionice (int): run commands under ``ionice`` in this scheduling class:
+            1 for realtime, 2 for best-effort and 3 for idle.
+        max_commands (int): the most commands or pipelines that run at once.
+            Others wait for one of them to finish.
+    """
+    def __init__(self, nice=None, ionice=None, max_commands=None):
+        self.nice = nice
+        self.ionice = ionice
+        self.max_commands = max_commands
+        self._slots = threading.BoundedSemaphore(max_commands) if max_commands else None
+
+    def wrap(self, cmd, env=None):
+        """
+        Returns the command list ``cmd`` prefixed with ``ionice`` and
+        ``nice`` as configured. A limit is ignored if its command isn't
+        available.
+        """
+        prefix = []
+        if self.ionice is not None and which("ionice", env=env):
+            prefix.extend(["ionice", "-c", str(self.ionice)])
+        if self.nice is not None and which("nice", env=env):
+            prefix.extend(["nice", "-n", str(self.nice)])
+        return prefix + list(cmd)
+
+    @contextmanager
+    def slot(self):
+        """
+        Waits until a command may start, and holds its place until the
+        block exits.
+        """
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+
+_COMMAND_LIMITS = None
+
+
+def set_command_limits(limits):
+    """
+    Sets the :class:`CommandLimits` commands are run with, or removes the
+    limits if ``limits`` is ``None``.
+    """
+    global _COMMAND_LIMITS
+    _COMMAND_LIMITS = limits
+
+
+def get_command_limits():
+    """ Returns the :class:`CommandLimits` commands are run with, if any. """
+    return _COMMAND_LIMITS
+
+
+@contextmanager
+def command_slot():
+    """
+    Holds a place for a command to run under the current
+    :class:`CommandLimits`, waiting for one if necessary.
+    """
+    limits = _COMMAND_LIMITS
+    if limits is None:
+        yield
+        return
+    with limits.slot():
+        yield
+
+
+def kill_processes(procs):
+    """
+    Kills the processes in ``procs`` that are still running and waits for
+    them. A process that leads its own process group, like ``timeout`` does,
+    has its whole group killed, so the command it runs doesn't outlive it.
+    """
+    for p in procs:
+        if p.poll() is not None:
+            continue
+        try:
+            pgid = os.getpgid(p.pid)
+            if pgid == p.pid and pgid != os.getpgrp():
+                os.killpg(pgid, signal.SIGKILL)
+            else:
+                p.kill()
+        except OSError:
+            pass
+    for p in procs:
+        p.wait()
+
+
+@contextmanager
+def _killed_on_error(procs):
+    # kills the processes of a pipeline if waiting for them is interrupted,
+    # e.g. by a component's time budget running out
+    try:
+        yield
+    except BaseException:
+        kill_processes(procs)
+        raise
+
+
 class Pipeline(object):
     """
     Connect a list of lists of commands together with the stdout of one as the
@@ -88,18 +201,28 @@ class Pipeline(object):
                 log.warn("Timeout specified but timeout command unavailable.")
         self.cmds = cmds
 
-    def _build_pipes(self, out_stream=PIPE):
-        log.debug("Executing: %s" % str(self.cmds))
-        if len(self.cmds) == 1:
-            return Popen(self.cmds[0], bufsize=self.bufsize, stderr=STDOUT, stdout=out_stream, env=self.env)
+    def _build_pipes(self, out_stream=PIPE, procs=None):
+        # procs collects every process started, so they can be killed
+        procs = procs if procs is not None else []
+        cmds = self.cmds
+        limits = _COMMAND_LIMITS
+        if limits is not None:
+            cmds = [limits.wrap(c, env=self.env) for c in cmds]
+        log.debug("Executing: %s" % str(cmds))
+        if len(cmds) == 1:
+            procs.append(Popen(cmds[0], bufsize=self.bufsize, stderr=STDOUT, stdout=out_stream, env=self.env))
+            return procs[-1]
 
-        stdout = Popen(self.cmds[0], bufsize=self.bufsize, stderr=STDOUT, stdout=PIPE, env=self.env).stdout
-        last = len(self.cmds) - 2
-        for i, arg in enumerate(self.cmds[1:]):
+        procs.append(Popen(cmds[0], bufsize=self.bufsize, stderr=STDOUT, stdout=PIPE, env=self.env))
+        last = len(cmds) - 2
+        for i, arg in enumerate(cmds[1:]):
+            stdout = procs[-1].stdout
             if i < last:
-                stdout = Popen(arg, bufsize=self.bufsize, stdin=stdout, stderr=STDOUT, stdout=PIPE, env=self.env).stdout
+                procs.append(Popen(arg, bufsize=self.bufsize, stdin=stdout, stderr=STDOUT, stdout=PIPE, env=self.env))
             else:
-                return Popen(arg, bufsize=self.bufsize, stdin=stdout, stderr=STDOUT, stdout=out_stream, env=self.env)
+                procs.append(Popen(arg, bufsize=self.bufsize, stdin=stdout, stderr=STDOUT, stdout=out_stream,
+                                   env=self.env))
+                return procs[-1]
 
     def __call__(self, keep_rc=False):
         """
@@ -112,9 +235,12 @@ class Pipeline(object):
             CalledProcessError if any return code in the pipeline is nonzero
             and keep_rc is False.
         """
-        p = self._build_pipes()
-        output = p.communicate()[0]
-        rc = p.poll()
+        procs = []
+        with command_slot():
+            with _killed_on_error(procs):
+                p = self._build_pipes(procs=procs)
+                output = p.communicate()[0]
+                rc = p.poll()
         if keep_rc:
             return (rc, output)
         if rc:
@@ -143,8 +269,11 @@ class Pipeline(object):
             already_exists = os.path.exists(output)
             try:
                 with open(output, mode) as f:
-                    p = self._build_pipes(f)
-                    rc = p.wait()
+                    procs = []
+                    with command_slot():
+                        with _killed_on_error(procs):
+                            p = self._build_pipes(f, procs=procs)
+                            rc = p.wait()
                     if keep_rc:
                         return rc
                     if rc:
@@ -154,14 +283,88 @@ class Pipeline(object):
                     os.remove(output)
                 six.reraise(be.__class__, be, sys.exc_info()[2])
         else:
-            p = self._build_pipes(output)
-            rc = p.wait()
+            procs = []
+            with command_slot():
+                with _killed_on_error(procs):
+                    p = self._build_pipes(output, procs=procs)
+                    rc = p.wait()
             if keep_rc:
                 return rc
             if rc:
                 raise CalledProcessError(rc, self.cmds[0], "")
 
 
+class CommandPool(object):
+    """
+    Runs pipelines ahead of time in a bounded pool of threads so their output
+    is ready when it's needed.
+
+    A pipeline is identified by its commands and the keyword arguments it's
+    run with, so :meth:`take` has to be called with the same arguments as
+    :meth:`submit`. Timeouts are applied the same way :class:`Pipeline` always
+    applies them. Output is written to a temporary directory rather than kept
+    in memory, and stays there until :meth:`shutdown`.
+
+    Args:
+        max_workers (int): the most pipelines that run at once.
+    """
+    def __init__(self, max_workers):
+        from concurrent.futures import ThreadPoolExecutor
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._dir = tempfile.mkdtemp(prefix="insights-commands-")
+
+    @staticmethod
+    def _key(cmds, kwargs):
+        cmds = tuple(tuple(c) if isinstance(c, list) else (c,) for c in cmds)
+        return (cmds,) + tuple(sorted((k, tuple(sorted(v.items())) if isinstance(v, dict) else v)
+                                      for k, v in kwargs.items()))
+
+    def _run(self, cmds, kwargs):
+        fd, path = tempfile.mkstemp(dir=self._dir)
+        with os.fdopen(fd, "wb") as f:
+            rc = Pipeline(*cmds, **kwargs).write(f, keep_rc=True)
+        return rc, path
+
+    def submit(self, cmds, **kwargs):
+        """
+        Starts running ``cmds`` as a :class:`Pipeline` created with
+        ``kwargs`` unless it was already submitted.
+        """
+        key = self._key(cmds, kwargs)
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = self._executor.submit(self._run, cmds, kwargs)
+
+    def take(self, cmds, **kwargs):
+        """
+        Waits for a submitted pipeline and returns its ``(exit code, file)``
+        tuple, or ``None`` if it wasn't submitted. The file is opened for
+        reading the raw output and is the caller's to close. The output can be
+        taken again, e.g. to parse and then save it, until :meth:`shutdown`.
+        """
+        with self._lock:
+            future = self._futures.get(self._key(cmds, kwargs))
+        if future is None:
+            return None
+        rc, path = future.result()
+        return rc, open(path, "rb")
+
+    def shutdown(self):
+        """
+        Cancels the pipelines that haven't started, waits for the rest and
+        removes their output.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for f in futures.values():
+            f.cancel()
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
 def call(cmd,
          timeout=None,
          signum=signal.SIGKILL,
@@ -18,6 +18,7 @@ entry_points = {
         'insights-dupkeycheck = insights.tools.dupkeycheck:main',
         'insights-inspect = insights.tools.insights_inspect:main',
         'insights-info = insights.tools.query:main',
+        'insights-manifest = insights.tools.component_manifest:main',
         'insights-ocpshell= insights.ocpshell:main',
         'mangle = insights.util.mangle:main'
     ]
@@ -84,6 +85,10 @@ testing = set([
     'mock==2.0.0',
 ])
 
+benchmark = set([
+    'pytest-benchmark; python_version >= "3"',
+])
+
 cluster = set([
     'ansible',
     'pandas',
@@ -118,7 +123,7 @@ if __name__ == "__main__":
         url="https://github.com/redhatinsights/insights-core",
         author="Red Hat, Inc.",
         author_email="insights@redhat.com",
-        packages=find_packages(),
+        packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
         install_requires=list(runtime),
         package_data={'': ['LICENSE']},
         license='Apache 2.0',
@@ -132,7 +137,8 @@ if __name__ == "__main__":
             'optional': list(optional),
             'docs': list(docs),
             'linting': list(linting | client),
-            'testing': list(testing | client)
+            'testing': list(testing | client),
+            'benchmark': list(testing | client | benchmark)
         },
         classifiers=[
             'Development Status :: 5 - Production/Stable',